@@ -1,8 +1,15 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.colors as mcolors
-from PIL import Image
+from PIL import Image, ImageDraw
+import io
 import os
+import re
+
+from formato_figuras import PilaMatrices, es_archivo_compacto, escribir_matriz, leer_matriz
+from graficos import cargar_fuente, obtener_pyplot
+from instrumentacion import etapa
+from paletas_figuras import PALETAS
+from serializacion_figuras import (escribir_corchetes, escribir_csv, escribir_json, imprimir_matriz,
+                                   vista_previa)
 
 class MatrizAImagen:
     def __init__(self):
@@ -10,86 +17,12 @@ class MatrizAImagen:
         Convertidor de matriz numérica a imagen colorida.
         Paletas simplificadas con colores básicos fundamentales.
         """
-        # Definir paletas de colores básicas
-        self.paletas = {
-            "basicos": [
-                "#FFFFFF",  # 0 - Blanco
-                "#000000",  # 1 - Negro
-                "#FF0000",  # 2 - Rojo (primario)
-                "#FFFF00",  # 3 - Amarillo (primario)
-                "#0000FF",  # 4 - Azul (primario)
-                "#00FF00",  # 5 - Verde (secundario)
-                "#FF8000",  # 6 - Naranja (secundario)
-                "#8000FF",  # 7 - Violeta (secundario)
-                "#FF0080",  # 8 - Rosa (terciario)
-                "#80FF00"   # 9 - Lima (terciario)
-            ],
-            
-            "primarios": [
-                "#FFFFFF",  # 0 - Blanco
-                "#000000",  # 1 - Negro
-                "#FF0000",  # 2 - Rojo
-                "#FFFF00",  # 3 - Amarillo
-                "#0000FF",  # 4 - Azul
-                "#808080",  # 5 - Gris
-                "#C0C0C0",  # 6 - Gris claro
-                "#404040",  # 7 - Gris oscuro
-                "#800000",  # 8 - Rojo oscuro
-                "#000080"   # 9 - Azul oscuro
-            ],
-            
-            "secundarios": [
-                "#FFFFFF",  # 0 - Blanco
-                "#000000",  # 1 - Negro
-                "#00FF00",  # 2 - Verde (amarillo + azul)
-                "#FF8000",  # 3 - Naranja (rojo + amarillo)
-                "#8000FF",  # 4 - Violeta (rojo + azul)
-                "#80FF80",  # 5 - Verde claro
-                "#FFBF80",  # 6 - Naranja claro
-                "#BF80FF",  # 7 - Violeta claro
-                "#008000",  # 8 - Verde oscuro
-                "#804000"   # 9 - Naranja oscuro
-            ],
-            
-            "rueda_color": [
-                "#FFFFFF",  # 0 - Blanco
-                "#000000",  # 1 - Negro
-                "#FF0000",  # 2 - Rojo (primario)
-                "#FF8000",  # 3 - Naranja (secundario)
-                "#FFFF00",  # 4 - Amarillo (primario)
-                "#80FF00",  # 5 - Lima (terciario)
-                "#00FF00",  # 6 - Verde (secundario)
-                "#00FF80",  # 7 - Turquesa (terciario)
-                "#0000FF",  # 8 - Azul (primario)
-                "#8000FF"   # 9 - Violeta (secundario)
-            ],
-            
-            "calidos": [
-                "#FFFFFF",  # 0 - Blanco
-                "#000000",  # 1 - Negro
-                "#FF0000",  # 2 - Rojo
-                "#FF4000",  # 3 - Rojo-naranja
-                "#FF8000",  # 4 - Naranja
-                "#FFBF00",  # 5 - Naranja-amarillo
-                "#FFFF00",  # 6 - Amarillo
-                "#BFFF00",  # 7 - Amarillo-verde
-                "#FF0040",  # 8 - Rosa-rojo
-                "#FF8040"   # 9 - Coral
-            ],
-            
-            "frios": [
-                "#FFFFFF",  # 0 - Blanco
-                "#000000",  # 1 - Negro
-                "#0000FF",  # 2 - Azul
-                "#0040FF",  # 3 - Azul-violeta
-                "#8000FF",  # 4 - Violeta
-                "#4000FF",  # 5 - Índigo
-                "#00FF00",  # 6 - Verde
-                "#0080FF",  # 7 - Azul claro
-                "#0040BF",  # 8 - Azul medio
-                "#004080"   # 9 - Azul oscuro
-            ]
-        }
+        # Paletas de colores básicas (definidas en paletas_figuras); cada instancia
+        # tiene su copia, así editar una no cambia las de otros conversores
+        self.paletas = {nombre: list(colores) for nombre, colores in PALETAS.items()}
+        
+        # Tablas RGB uint8 por paleta (se construyen al primer uso)
+        self._tablas_paleta = {}
     
     def mostrar_paletas_disponibles(self):
         """Muestra todas las paletas de colores disponibles"""
@@ -136,67 +69,213 @@ class MatrizAImagen:
     def parsear_matriz(self, texto_matriz):
         """
         Convierte texto de matriz copiado en array numpy.
-        Acepta múltiples formatos de entrada.
+        Acepta múltiples formatos de entrada: filas entre corchetes (también
+        el formato [[...], [...]] de numpy, en varias líneas o en una sola),
+        valores separados por comas o por espacios.
+        
+        La conversión a números se hace en bloque con np.loadtxt. Lanza
+        ValueError si hay filas de distinto largo, valores no enteros o
+        valores negativos.
         """
         # Limpiar el texto
         texto = texto_matriz.strip()
+        lineas = texto.split('\n')
         
-        # Caso 1: Matriz con corchetes por fila
-        if '[' in texto and ']' in texto:
-            filas = []
-            for linea in texto.split('\n'):
-                linea = linea.strip()
-                if '[' in linea and ']' in linea:
-                    # Extraer contenido entre corchetes
-                    contenido = linea[linea.find('[')+1:linea.find(']')]
-                    # Convertir a números
-                    numeros = [int(x.strip()) for x in contenido.split(',') if x.strip().isdigit()]
-                    if numeros:
-                        filas.append(numeros)
-            
-            if filas:
-                return np.array(filas)
+        # Caso 1: Matriz con corchetes (se ignora el texto fuera de ellos)
+        if '[' in texto or ']' in texto:
+            lineas = self._filas_entre_corchetes(texto)
+        
+        # Dejar solo números separados por espacios, una fila por línea
+        lineas = [linea.replace('[', ' ').replace(']', ' ').replace(',', ' ') for linea in lineas]
+        lineas = [linea for linea in lineas if linea.strip()]
+        if not lineas:
+            raise ValueError("No se pudo parsear la matriz. Verifica el formato.")
+
+        # Filas de distinto largo
+        largos = [len(linea.split()) for linea in lineas]
+        for numero, largo in enumerate(largos, start=1):
+            if largo != largos[0]:
+                raise ValueError(f"La fila {numero} tiene {largo} valores, pero la fila 1 tiene "
+                                 f"{largos[0]}. Todas las filas deben tener el mismo largo.")
+
+        try:
+            matriz = np.loadtxt(io.StringIO('\n'.join(lineas)), dtype=np.int64, ndmin=2)
+        except ValueError as e:
+            raise ValueError(f"No se pudo parsear la matriz: solo se aceptan números enteros ({e})") from None
+        
+        return self._validar_matriz(matriz)
+    
+    @staticmethod
+    def _filas_entre_corchetes(texto):
+        """
+        Filas de una matriz escrita con corchetes: cada par de corchetes sin otros
+        adentro es una fila, así "[[1, 2], [3, 4]]" da dos filas aunque esté en una
+        línea. Dentro de corchetes anidados un salto de línea es una fila larga que
+        numpy partió; con un solo nivel ("[1 2\n3 4]"), cada línea es una fila.
+        """
         filas = []
-        for linea in texto.split('\n'):
-            linea = linea.strip()
-            if not linea:
+        profundidad = 0
+        inicio = None
+        for corchete in re.finditer(r'[\[\]]', texto):
+            if corchete.group() == '[':
+                profundidad += 1
+                inicio = corchete.end()
                 continue
-            
-            # Intentar separar por comas primero, luego por espacios
-            if ',' in linea:
-                numeros = [int(x.strip()) for x in linea.split(',') if x.strip().isdigit()]
-            else:
-                numeros = [int(x) for x in linea.split() if x.isdigit()]
-            
-            if numeros:
-                filas.append(numeros)
+            if profundidad == 0:
+                raise ValueError("No se pudo parsear la matriz: hay un ']' sin su '['")
+            if inicio is not None:
+                contenido = texto[inicio:corchete.start()]
+                if profundidad > 1:
+                    filas.append(contenido.replace('\n', ' '))
+                else:
+                    filas.extend(contenido.split('\n'))
+                inicio = None
+            profundidad -= 1
+        if profundidad != 0:
+            raise ValueError("No se pudo parsear la matriz: hay un '[' sin su ']'")
+        return filas
+    
+    def _validar_matriz(self, matriz):
+        """
+        Verifica que la matriz sea 2D, de enteros no negativos, y la guarda con el
+        tipo sin signo más chico que alcanza para su máximo (uint8 para las matrices
+        de detección y cualquier índice de paleta)
+        """
+        matriz = np.asarray(matriz)
+        if matriz.ndim != 2:
+            raise ValueError(f"La matriz debe ser 2D, pero tiene forma {matriz.shape}")
+        if matriz.dtype == bool:
+            return matriz.view(np.uint8)
+        if not np.issubdtype(matriz.dtype, np.integer):
+            if not np.issubdtype(matriz.dtype, np.number) or not np.all(np.mod(matriz, 1) == 0):
+                raise ValueError("La matriz solo puede contener números enteros")
+            matriz = matriz.astype(np.int64)
+        if matriz.size and matriz.min() < 0:
+            fila, columna = np.argwhere(matriz < 0)[0]
+            raise ValueError(f"Valor negativo {matriz[fila, columna]} en la fila {fila + 1}, "
+                             f"columna {columna + 1}: los índices de la paleta empiezan en 0")
+        maximo = int(matriz.max()) if matriz.size else 0
+        return matriz.astype(np.min_scalar_type(maximo), copy=False)
+    
+    def cargar_matriz(self, entrada):
+        """
+        Obtiene la matriz desde cualquiera de las entradas aceptadas:
+        • np.ndarray (por ejemplo, el resultado de detectar_figura_optimizado)
+        • ruta a un archivo .npy, .csv o .txt
+        • ruta a un archivo compacto .fig, o "pila.figs#3" para la matriz 3 de una pila
+          (ver formato_figuras; sin "#n" se toma la primera)
+        • texto de la matriz copiada (ver parsear_matriz)
+        """
+        if isinstance(entrada, np.ndarray):
+            return self._validar_matriz(entrada)
+        
+        if isinstance(entrada, str) and "#" in entrada:
+            ruta, _, numero = entrada.rpartition("#")
+            if numero.isdigit() and es_archivo_compacto(ruta):
+                return leer_matriz(ruta, int(numero))
+        
+        if isinstance(entrada, (str, os.PathLike)) and os.path.isfile(entrada):
+            if es_archivo_compacto(entrada):
+                return leer_matriz(entrada)
+            extension = os.path.splitext(str(entrada))[1].lower()
+            if extension == '.npy':
+                return self._validar_matriz(np.load(entrada, allow_pickle=False))
+            if extension == '.csv':
+                try:
+                    matriz = np.loadtxt(entrada, delimiter=',', dtype=np.int64, ndmin=2)
+                except ValueError as e:
+                    raise ValueError(f"No se pudo leer el CSV {entrada}: {e}") from None
+                return self._validar_matriz(matriz)
+            with open(entrada, encoding='utf-8') as archivo:
+                return self.parsear_matriz(archivo.read())
+        
+        return self.parsear_matriz(entrada)
+    
+    def guardar_matriz(self, matriz, ruta, rle="auto"):
+        """
+        Guarda la matriz según la extensión de la ruta:
+        • .txt / .csv / .json: como texto (filas entre corchetes, CSV o lista JSON),
+          que cargar_matriz vuelve a leer
+        • .npy: array de numpy
+        • .figs: la agrega al final de esa pila compacta
+        • cualquier otra: formato compacto .fig (1 byte por celda, o 1 bit si es 0/1)
+        • rle: compresión por tramos del formato compacto: True, False o "auto" (la opción más chica)
+        Da de regreso: la ruta (y en una pila, "ruta#n" con el número de la matriz)
+        """
+        matriz = self.cargar_matriz(matriz)
+        extension = os.path.splitext(str(ruta))[1].lower()
+        escritores_texto = {".txt": escribir_corchetes, ".csv": escribir_csv, ".json": escribir_json}
+        if extension in escritores_texto:
+            escritores_texto[extension](matriz, ruta)
+            return ruta
+        if extension == ".npy":
+            np.save(ruta, matriz, allow_pickle=False)
+            return ruta
+        if extension == ".figs":
+            with PilaMatrices(ruta, "a") as pila:
+                return f"{ruta}#{pila.agregar(matriz, rle)}"
+        escribir_matriz(ruta, matriz, rle)
+        return ruta
+    
+    def vista_previa(self, matriz, paleta="basicos", modo="reducir"):
+        """
+        Muestra la matriz en la terminal con los colores de la paleta, sin abrir
+        ventanas. Si no entra en la terminal se reduce (o se recorta con modo="recortar").
+        """
+        matriz = self.cargar_matriz(matriz)
+        if paleta not in self.paletas:
+            raise ValueError(f"Paleta '{paleta}' no disponible. Opciones: {', '.join(self.paletas)}")
+        print(vista_previa(matriz, self.paletas[paleta], modo=modo))
+    
+    def editar_matriz(self, matriz, paleta="basicos", guardar_como=None, mostrar_imagen=True):
+        """
+        Abre la matriz en un editor gráfico para corregirla a mano, sin pegarla en el código.
         
-        if filas:
-            return np.array(filas)
+        • matriz: cualquier entrada de cargar_matriz (texto, np.ndarray o ruta)
+        • paleta: paleta con la que se pinta y de la que se eligen los valores
+        • guardar_como: ruta donde la guarda la tecla "e" (.txt, .csv, .json, .npy, .fig
+          o .figs, ver guardar_matriz); sin ruta, "e" la imprime en la terminal
+        • mostrar_imagen: False para crear el editor sin abrir la ventana (p. ej. en scripts)
         
-        raise ValueError("No se pudo parsear la matriz. Verifica el formato.")
+        Da de regreso: el EditorMatriz; al cerrar la ventana, editor.matriz tiene la matriz editada
+        """
+        if paleta not in self.paletas:
+            raise ValueError(f"Paleta '{paleta}' no disponible. Opciones: {', '.join(self.paletas)}")
+        editor = EditorMatriz(self, self.cargar_matriz(matriz), paleta, guardar_como)
+        if mostrar_imagen:
+            obtener_pyplot().show()
+        return editor
     
     def convertir_matriz(self, matriz_texto, 
                         paleta="basicos", 
                         tamaño_pixel=50,
                         mostrar_numeros=True,
                         guardar_como=None,
-                        mostrar_imagen=True):
+                        mostrar_imagen=True,
+                        modo="matplotlib",
+                        medidor=None):
         """
         Convierte matriz de texto a imagen colorida.
         
         Parámetros:
-        • matriz_texto: Texto de la matriz copiada
+        • matriz_texto: Texto de la matriz copiada, un np.ndarray o la ruta a un .npy/.csv/.txt/.fig
         • paleta: Nombre de la paleta de colores
-        • tamaño_pixel: Tamaño de cada píxel en la imagen final
+        • tamaño_pixel: Tamaño de cada píxel en la imagen final (en modo "raster",
+          cada celda mide exactamente tamaño_pixel x tamaño_pixel píxeles)
         • mostrar_numeros: Si mostrar números en cada celda
         • guardar_como: Ruta para guardar la imagen (opcional)
         • mostrar_imagen: Si mostrar la imagen en pantalla
+        • modo: "matplotlib" (figura con título y leyenda) o "raster" (pinta la
+          matriz directamente por tabla de colores; mucho más rápido en matrices grandes)
+        • medidor: instrumentacion.Medidor opcional para registrar tiempo y memoria por etapa
+        
+        Da de regreso: (figura, matriz) en modo "matplotlib", (imagen PIL, matriz) en modo "raster"
         """
         
         # Parsear la matriz
         try:
-            matriz = self.parsear_matriz(matriz_texto)
+            with etapa(medidor, "parsear"):
+                matriz = self.cargar_matriz(matriz_texto)
             print(f"Matriz parseada correctamente: {matriz.shape}")
         except Exception as e:
             print(f"Error al parsear matriz: {e}")
@@ -220,6 +299,61 @@ class MatrizAImagen:
             print(f"   pero la paleta solo tiene {len(colores)} colores.")
             print("   Los valores altos usarán el último color.")
         
+        if modo == "raster":
+            with etapa(medidor, "render_raster", forma=matriz.shape, tamaño_pixel=tamaño_pixel):
+                imagen = self.renderizar_raster(matriz, paleta, tamaño_pixel, mostrar_numeros)
+            if guardar_como:
+                try:
+                    directorio = os.path.dirname(guardar_como)
+                    if directorio and not os.path.exists(directorio):
+                        os.makedirs(directorio)
+                    with etapa(medidor, "guardar_png"):
+                        imagen.save(guardar_como, compress_level=1)
+                    print(f"Imagen guardada como: {guardar_como}")
+                except Exception as e:
+                    print(f"Error al guardar: {e}")
+            if mostrar_imagen:
+                plt = obtener_pyplot()
+                fig, ax = plt.subplots(figsize=(8, 8))
+                ax.imshow(imagen)
+                ax.axis("off")
+                plt.show()
+            return imagen, matriz
+        elif modo != "matplotlib":
+            print(f"Modo '{modo}' no reconocido. Usando 'matplotlib'")
+        
+        plt = obtener_pyplot()
+        with etapa(medidor, "figura_matplotlib", forma=matriz.shape):
+            fig = self._figura_matplotlib(matriz, paleta, mostrar_numeros, valores_unicos)
+        
+        # Guardar si se especifica
+        if guardar_como:
+            try:
+                # Crear directorio si no existe
+                directorio = os.path.dirname(guardar_como)
+                if directorio and not os.path.exists(directorio):
+                    os.makedirs(directorio)
+                
+                with etapa(medidor, "guardar_png", dpi=300):
+                    plt.savefig(guardar_como, dpi=300, bbox_inches='tight')
+                print(f"Imagen guardada como: {guardar_como}")
+            except Exception as e:
+                print(f"Error al guardar: {e}")
+        
+        # Mostrar imagen
+        if mostrar_imagen:
+            plt.show()
+        
+        return fig, matriz
+    
+    def _figura_matplotlib(self, matriz, paleta, mostrar_numeros, valores_unicos):
+        """Figura con un rectángulo y un texto por celda, título y leyenda"""
+        plt = obtener_pyplot()
+        colores = self.paletas[paleta]
+        
+        # Color de texto de contraste, calculado una vez por color de la paleta
+        colores_texto = [self._obtener_color_contraste(color) for color in colores]
+        
         # Crear la visualización
         filas, columnas = matriz.shape
         fig, ax = plt.subplots(figsize=(columnas * 0.8, filas * 0.8))
@@ -243,7 +377,7 @@ class MatrizAImagen:
                 # Añadir número si se solicita
                 if mostrar_numeros:
                     # Determinar color del texto para contraste
-                    color_texto = self._obtener_color_contraste(color)
+                    color_texto = colores_texto[indice_color]
                     
                     ax.text(j+0.5, filas-1-i+0.5, str(valor),
                            ha='center', va='center',
@@ -268,25 +402,62 @@ class MatrizAImagen:
         self._crear_leyenda(ax, valores_unicos, colores, paleta)
         
         plt.tight_layout()
+        return fig
+    
+    def _tabla_paleta(self, paleta):
+        """
+        Tablas de búsqueda de una paleta (en caché):
+        colores RGB uint8 (n, 3) y color de texto de contraste (n, 3) por índice.
+        """
+        if paleta not in self._tablas_paleta:
+            colores = self.paletas[paleta]
+            rgb = np.array([[int(c.lstrip('#')[k:k+2], 16) for k in (0, 2, 4)] for c in colores],
+                           dtype=np.uint8)
+            texto = np.array([(255, 255, 255) if self._obtener_color_contraste(c) == 'white'
+                              else (0, 0, 0) for c in colores], dtype=np.uint8)
+            self._tablas_paleta[paleta] = (rgb, texto)
+        return self._tablas_paleta[paleta]
+    
+    def renderizar_raster(self, matriz, paleta="basicos", tamaño_pixel=50, mostrar_numeros=True):
+        """
+        Pinta la matriz por indexación en la tabla de la paleta, sin artistas de matplotlib.
         
-        # Guardar si se especifica
-        if guardar_como:
-            try:
-                # Crear directorio si no existe
-                directorio = os.path.dirname(guardar_como)
-                if directorio and not os.path.exists(directorio):
-                    os.makedirs(directorio)
-                
-                plt.savefig(guardar_como, dpi=300, bbox_inches='tight')
-                print(f"Imagen guardada como: {guardar_como}")
-            except Exception as e:
-                print(f"Error al guardar: {e}")
+        Cada celda ocupa exactamente tamaño_pixel x tamaño_pixel píxeles, con borde
+        negro de 1 píxel. Los números se dibujan una vez por valor distinto y se
+        copian en bloque. Valores mayores que la paleta usan el último color.
         
-        # Mostrar imagen
-        if mostrar_imagen:
-            plt.show()
+        Da de regreso: imagen PIL en modo RGB
+        """
+        rgb, texto = self._tabla_paleta(paleta)
+        matriz = np.asarray(matriz)
+        filas, columnas = matriz.shape
         
-        return fig, matriz
+        # Un bloque por valor distinto de la matriz
+        valores, indices = np.unique(matriz, return_inverse=True)
+        indices = indices.reshape(filas, columnas)
+        indices_color = np.clip(valores, 0, len(rgb) - 1)
+        bloques = np.empty((len(valores), tamaño_pixel, tamaño_pixel, 3), dtype=np.uint8)
+        bloques[:] = rgb[indices_color][:, None, None, :]
+        
+        if mostrar_numeros and tamaño_pixel >= 8:
+            fuente = cargar_fuente(max(6, int(tamaño_pixel * 0.5)))
+            for k, valor in enumerate(valores):
+                bloque = Image.fromarray(bloques[k])
+                ImageDraw.Draw(bloque).text((tamaño_pixel / 2, tamaño_pixel / 2), str(valor),
+                                            fill=tuple(int(c) for c in texto[indices_color[k]]),
+                                            font=fuente, anchor="mm")
+                bloques[k] = np.asarray(bloque)
+        
+        # Borde negro arriba/izquierda de cada celda
+        bloques[:, 0, :] = 0
+        bloques[:, :, 0] = 0
+        
+        # (filas, columnas, alto, ancho, 3) -> (filas*alto, columnas*ancho, 3)
+        pixeles = bloques[indices].transpose(0, 2, 1, 3, 4).reshape(
+            filas * tamaño_pixel, columnas * tamaño_pixel, 3)
+        pixeles[-1, :] = 0
+        pixeles[:, -1] = 0
+        return Image.fromarray(pixeles)
     
     def _obtener_color_contraste(self, color_hex):
         """Determina si usar texto blanco o negro para contraste"""
@@ -318,6 +489,239 @@ class MatrizAImagen:
                  loc='center left', bbox_to_anchor=(1, 0.5),
                  title=f'Leyenda - {paleta.title()}')
 
+class EditorMatriz:
+    def __init__(self, conversor, matriz, paleta="basicos", guardar_como=None):
+        """
+        Editor de la matriz en una ventana de matplotlib (ver MatrizAImagen.editar_matriz).
+        
+        Toda la matriz es una sola imagen (imshow) coloreada con la tabla de la
+        paleta, en lugar de un rectángulo y un texto por celda. Al pintar solo se
+        dibuja el rectángulo de celdas tocadas, como una imagen chica encima de
+        la pantalla guardada, y solo ese rectángulo se copia a la ventana
+        (blitting): el costo depende de lo que se pinta, no del tamaño de la
+        matriz, y sigue fluido con matrices de 200x200 o más.
+        
+        Controles:
+        • clic izquierdo (o arrastrar): pinta con el valor elegido
+        • clic derecho (o arrastrar)  : pinta con 0 (fondo)
+        • clic en la paleta o teclas 0-9: elige el valor
+        • u: deshace el último trazo
+        • e: guarda en guardar_como (o imprime la matriz si no hay ruta)
+        El valor de la celda bajo el cursor se ve en la barra de la ventana.
+        """
+        plt = obtener_pyplot()
+        self.conversor = conversor
+        self.paleta = paleta
+        self.guardar_como = guardar_como
+        self.matriz = np.array(matriz, copy=True)
+        self.valor = 1 if len(conversor.paletas[paleta]) > 1 else 0
+        self._rgb, _ = conversor._tabla_paleta(paleta)
+        self._historial = []
+        self._trazo = None
+        self._anterior = None
+        self._fondo = None
+        
+        filas, columnas = self.matriz.shape
+        self._pixeles = self._rgb[np.clip(self.matriz, 0, len(self._rgb) - 1)]
+        self.figura, (self.ax, self.ax_paleta) = plt.subplots(
+            2, 1, figsize=(8, 8.8), gridspec_kw={"height_ratios": [12, 1]})
+        self.imagen = self.ax.imshow(self._pixeles, interpolation="nearest", animated=True)
+        self.ax.format_coord = self._describir_celda
+        from matplotlib.ticker import MaxNLocator
+        self.ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+        self.ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+        # Sin autoescala: el parche no debe mover los límites al cambiar su extensión
+        self.ax.set_autoscale_on(False)
+        
+        # Parche: imagen chica con las celdas que cambiaron, dibujada sobre la pantalla guardada
+        from matplotlib.image import AxesImage
+        self._parche = AxesImage(self.ax, interpolation="nearest", animated=True)
+        self._parche.set_transform(self.ax.transData)
+        self._parche.set_clip_path(self.ax.patch)
+        
+        # Rejilla en un solo artista, y solo si las celdas son lo bastante grandes para verla
+        self.rejilla = None
+        if max(filas, columnas) <= 64:
+            from matplotlib.collections import LineCollection
+            lineas = [[(x - 0.5, -0.5), (x - 0.5, filas - 0.5)] for x in range(columnas + 1)]
+            lineas += [[(-0.5, y - 0.5), (columnas - 0.5, y - 0.5)] for y in range(filas + 1)]
+            self.rejilla = LineCollection(lineas, colors="#888888", linewidths=0.5, animated=True)
+            self.ax.add_collection(self.rejilla)
+        
+        # Paleta: una fila de colores con su índice
+        self.ax_paleta.imshow(self._rgb[None], interpolation="nearest")
+        for indice, color in enumerate(conversor.paletas[paleta]):
+            self.ax_paleta.text(indice, 0, str(indice), ha="center", va="center", fontweight="bold",
+                                color=conversor._obtener_color_contraste(color))
+        self.ax_paleta.set_yticks([])
+        self.ax_paleta.set_xticks([])
+        self._actualizar_titulo()
+        
+        canvas = self.figura.canvas
+        canvas.mpl_connect("draw_event", self._al_dibujar)
+        canvas.mpl_connect("button_press_event", self._al_presionar)
+        canvas.mpl_connect("motion_notify_event", self._al_mover)
+        canvas.mpl_connect("button_release_event", self._al_soltar)
+        canvas.mpl_connect("key_press_event", self._al_tecla)
+    
+    def _actualizar_titulo(self):
+        filas, columnas = self.matriz.shape
+        self.ax.set_title(f"Editor - Paleta: {self.paleta.title()} | {filas}x{columnas} | "
+                          f"Valor: {self.valor}\nIzq.: pintar, der.: borrar, 0-9: valor, "
+                          f"u: deshacer, e: guardar", fontsize=10)
+        self.ax_paleta.set_xlabel(f"Valor elegido: {self.valor}")
+    
+    def _describir_celda(self, x, y):
+        fila, columna = int(round(y)), int(round(x))
+        if 0 <= fila < self.matriz.shape[0] and 0 <= columna < self.matriz.shape[1]:
+            return f"fila {fila}, columna {columna}: {self.matriz[fila, columna]}"
+        return ""
+    
+    def _al_dibujar(self, evento):
+        """Tras un dibujado completo (inicio, zoom, cambio de tamaño): dibuja la matriz y guarda la pantalla"""
+        if self.figura.canvas.is_saving():
+            return  # al guardar a archivo, matplotlib ya incluye los artistas animados
+        self.ax.draw_artist(self.imagen)
+        if self.rejilla is not None:
+            self.ax.draw_artist(self.rejilla)
+        canvas = self.figura.canvas
+        if canvas.supports_blit:
+            self._fondo = canvas.copy_from_bbox(self.ax.bbox)
+    
+    def _celda(self, evento):
+        """(fila, columna) bajo el evento, o None si está fuera de la matriz"""
+        if evento.inaxes is not self.ax or evento.xdata is None:
+            return None
+        fila, columna = int(round(evento.ydata)), int(round(evento.xdata))
+        if 0 <= fila < self.matriz.shape[0] and 0 <= columna < self.matriz.shape[1]:
+            return fila, columna
+        return None
+    
+    def _herramienta_activa(self):
+        """True si la barra de herramientas está en modo zoom o desplazar"""
+        barra = getattr(self.figura.canvas, "toolbar", None)
+        return bool(barra is not None and getattr(barra, "mode", ""))
+    
+    def _al_presionar(self, evento):
+        if evento.inaxes is self.ax_paleta and evento.xdata is not None:
+            self.elegir_valor(int(round(evento.xdata)))
+            return
+        celda = self._celda(evento)
+        if celda is None or self._herramienta_activa() or evento.button not in (1, 3):
+            return
+        self._trazo = (self.valor if evento.button == 1 else 0, {})
+        self._anterior = celda
+        self._pintar_tramo(celda, celda)
+    
+    def _al_mover(self, evento):
+        if self._trazo is None:
+            return
+        celda = self._celda(evento)
+        if celda is None:
+            return
+        self._pintar_tramo(self._anterior, celda)
+        self._anterior = celda
+    
+    def _al_soltar(self, evento):
+        if self._trazo is None:
+            return
+        _, cambios = self._trazo
+        if cambios:
+            self._historial.append(cambios)
+        self._trazo = None
+    
+    def _al_tecla(self, evento):
+        if evento.key is None:
+            return
+        if evento.key.isdigit():
+            self.elegir_valor(int(evento.key))
+        elif evento.key == "u":
+            self.deshacer()
+        elif evento.key == "e":
+            self.exportar()
+    
+    def _pintar_tramo(self, desde, hasta):
+        """
+        Pinta las celdas en línea recta de `desde` a `hasta` (al arrastrar rápido
+        los eventos saltan celdas) y anota el valor previo de cada una para deshacer.
+        """
+        valor, cambios = self._trazo
+        pasos = max(abs(hasta[0] - desde[0]), abs(hasta[1] - desde[1])) + 1
+        filas = np.rint(np.linspace(desde[0], hasta[0], pasos)).astype(np.intp)
+        columnas = np.rint(np.linspace(desde[1], hasta[1], pasos)).astype(np.intp)
+        for celda in zip(filas.tolist(), columnas.tolist()):
+            cambios.setdefault(celda, self.matriz[celda])
+        self.pintar(filas, columnas, valor)
+    
+    def pintar(self, filas, columnas, valor):
+        """Asigna `valor` a las celdas (filas[k], columnas[k]) y redibuja solo esas"""
+        filas = np.atleast_1d(np.asarray(filas, dtype=np.intp))
+        columnas = np.atleast_1d(np.asarray(columnas, dtype=np.intp))
+        if np.iinfo(self.matriz.dtype).max < valor:
+            self.matriz = self.matriz.astype(np.min_scalar_type(valor))
+        self.matriz[filas, columnas] = valor
+        self._pixeles[filas, columnas] = self._rgb[min(valor, len(self._rgb) - 1)]
+        self._redibujar(filas, columnas)
+    
+    def _redibujar(self, filas, columnas):
+        """Dibuja y copia a la pantalla solo el rectángulo que contiene las celdas cambiadas"""
+        self.imagen.set_data(self._pixeles)  # para el próximo dibujado completo
+        canvas = self.figura.canvas
+        if self._fondo is None:
+            canvas.draw_idle()
+            return
+        from matplotlib.transforms import Bbox
+        fila_min, fila_max = int(filas.min()), int(filas.max())
+        columna_min, columna_max = int(columnas.min()), int(columnas.max())
+        extension = (columna_min - 0.5, columna_max + 0.5, fila_max + 0.5, fila_min - 0.5)
+        zona = Bbox.intersection(
+            Bbox(np.sort(self.ax.transData.transform([extension[::2], extension[1::2]]), axis=0)),
+            self.ax.bbox)
+        if zona is None:
+            return  # fuera de la vista (con zoom)
+        
+        self._parche.set_data(self._pixeles[fila_min:fila_max + 1, columna_min:columna_max + 1])
+        self._parche.set_extent(extension)
+        canvas.restore_region(self._fondo)
+        self.ax.draw_artist(self._parche)
+        if self.rejilla is not None:
+            self.rejilla.set_clip_box(zona)
+            self.ax.draw_artist(self.rejilla)
+            self.rejilla.set_clip_box(self.ax.bbox)
+        canvas.blit(zona)
+        self._fondo = canvas.copy_from_bbox(self.ax.bbox)
+    
+    def elegir_valor(self, valor):
+        """Valor (índice de la paleta) con el que pinta el clic izquierdo"""
+        if 0 <= valor < len(self._rgb):
+            self.valor = valor
+            self._actualizar_titulo()
+            self.figura.canvas.draw_idle()
+    
+    def deshacer(self):
+        """Devuelve las celdas del último trazo a su valor anterior"""
+        if not self._historial:
+            return
+        cambios = self._historial.pop()
+        for valor in set(cambios.values()):
+            celdas = [celda for celda, previo in cambios.items() if previo == valor]
+            filas, columnas = zip(*celdas)
+            self.pintar(filas, columnas, int(valor))
+    
+    def exportar(self, ruta=None):
+        """
+        Guarda la matriz con MatrizAImagen.guardar_matriz (mismos formatos que el detector).
+        Sin ruta ni guardar_como, la imprime en la terminal, lista para copiar.
+        Da de regreso: lo que da guardar_matriz, o None si solo se imprimió
+        """
+        ruta = ruta or self.guardar_como
+        if not ruta:
+            imprimir_matriz(self.matriz, colores=self.conversor.paletas[self.paleta])
+            return None
+        destino = self.conversor.guardar_matriz(self.matriz, ruta)
+        print(f"Matriz guardada en: {destino}")
+        return destino
+
 # ================================
 # EJECUCIÓN DIRECTA CON MATRIZ EJEMPLO
 # ================================
@@ -355,5 +759,9 @@ if __name__ == "__main__":
         tu_matriz,
         paleta="basicos",  # Cambia aquí por: primarios, secundarios, rueda_color, calidos, frios
         guardar_como="matriz_ejemplo_colorida.png",
-        mostrar_imagen=True
-    )
\ No newline at end of file
+        mostrar_imagen=True,
+        modo="matplotlib"  # "raster" para matrices grandes (pinta directo, mucho más rápido)
+    )
+    
+    # Para corregir la matriz con el mouse en lugar de editar el texto:
+    # conversor.editar_matriz(tu_matriz, guardar_como="matriz_editada.txt")
\ No newline at end of file
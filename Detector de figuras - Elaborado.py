@@ -1,13 +1,152 @@
-from PIL import Image
+from PIL import Image, ImageDraw, ImageSequence
 import numpy as np
-import matplotlib.pyplot as plt
+import contextlib
+import glob
+import io
 import os
+import re
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from formato_figuras import PilaMatrices, escribir_matriz
+from graficos import cargar_fuente, obtener_pyplot
+import nucleos_figuras
+from componentes_figuras import estadisticas_componentes, postprocesar, resumen_componentes
+from instrumentacion import etapa
+from paletas_figuras import colores_paleta, cubo_paleta, cuantizar, moda_por_celda
+from serializacion_figuras import imprimir_matriz
+
+# Nombres de los métodos registrados, en orden de registro (ver registrar_metodo)
+METODOS = []
+BACKENDS = ("numpy", "numba")
+
+# Los cuatro métodos de "todos los métodos" (detectar_todos_metodos, comparar_metodos,
+# mostrar_todos_metodos). "basico" y los registrados aparte solo se usan si se piden
+METODOS_POR_DEFECTO = ("contraste_mejorado", "diferencia_adaptativa",
+                       "luminancia_precisa", "bordes_combinados")
+
+# Métodos incluidos: los únicos con mapas de métrica (barrido) y recálculo por celdas (secuencias)
+_METODOS_INCLUIDOS = METODOS_POR_DEFECTO
+
+class MetodoDeteccion:
+    def __init__(self, nombre: str, descripcion: str = "", intermedios: tuple = (),
+                 parametros: tuple = ()):
+        """
+        Un método de detección del registro, con una implementación por backend.
+        
+        Todas las implementaciones reciben (pix, umbral_blanco, sensibilidad), los
+        intermedios declarados como argumentos con nombre y las opciones de
+        `parametros`, y deben dar exactamente la misma matriz (booleana o uint8;
+        ejecutar_metodo la entrega siempre como uint8).
+        
+        Parámetros:
+        • nombre      : nombre con el que se pide el método (p. ej. en metodo="...")
+        • descripcion : texto corto para listados
+        • intermedios : cuáles de "fondo", "gris" y "luminancia" puede reutilizar
+                        (ver _calcular_intermedios)
+        • parametros  : opciones propias del método que acepta ejecutar_metodo
+        """
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.intermedios = tuple(intermedios)
+        self.parametros = tuple(parametros)
+        self.implementaciones = {}
+    
+    def implementacion(self, backend: str = "auto"):
+        """
+        Función del backend pedido:
+        • "auto" : Numba si está instalado y el método tiene núcleo compilado; si no, NumPy
+        • "numba": si Numba no está instalado (o el método no tiene núcleo), avisa y usa NumPy
+        """
+        if backend == "auto":
+            backend = "numba" if nucleos_figuras.DISPONIBLE and "numba" in self.implementaciones \
+                else "numpy"
+        elif backend not in BACKENDS:
+            raise ValueError(f"Backend desconocido: {backend}. Opciones: auto, {', '.join(BACKENDS)}")
+        elif backend == "numba" and not nucleos_figuras.DISPONIBLE:
+            warnings.warn("Numba no está instalado; se usa el backend numpy", RuntimeWarning,
+                          stacklevel=3)
+            backend = "numpy"
+        return self.implementaciones.get(backend, self.implementaciones["numpy"])
+
+_REGISTRO = {}
+
+def registrar_metodo(nombre: str, backend: str = "numpy", descripcion: str = "",
+                     intermedios: tuple = (), parametros: tuple = ()):
+    """
+    Decorador que registra una implementación de un método de detección.
+    La primera registración de un nombre debe ser la de NumPy (la de referencia)
+    y define descripción, intermedios y parámetros; las de otros backends solo
+    agregan la función.
+    
+    Ejemplo:
+        @registrar_metodo("oscuros", descripcion="Píxeles más oscuros que el umbral")
+        def detectar_oscuros(pix, umbral_blanco, sensibilidad):
+            return pix.max(axis=2) < umbral_blanco * sensibilidad
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconocido: {backend}. Opciones: {', '.join(BACKENDS)}")
+    
+    def decorador(funcion):
+        if nombre not in _REGISTRO:
+            if backend != "numpy":
+                raise ValueError(f"El método '{nombre}' debe registrarse primero con backend numpy")
+            _REGISTRO[nombre] = MetodoDeteccion(nombre, descripcion, intermedios, parametros)
+            METODOS.append(nombre)
+        _REGISTRO[nombre].implementaciones[backend] = funcion
+        return funcion
+    return decorador
+
+def obtener_metodo(nombre: str) -> MetodoDeteccion:
+    """Método registrado con ese nombre; ValueError si no existe"""
+    if nombre not in _REGISTRO:
+        raise ValueError(f"Método desconocido: {nombre}. Opciones: {METODOS}")
+    return _REGISTRO[nombre]
+
+def ejecutar_metodo(nombre: str, pix: np.ndarray, umbral_blanco: int = 240,
+                    sensibilidad: float = 0.8, backend: str = "auto", out: np.ndarray = None,
+                    **opciones) -> np.ndarray:
+    """
+    Aplica un método registrado a la imagen ya reducida (tamaño x tamaño x 3).
+    • out     : array (filas, columnas) uint8 o bool donde escribir el resultado, para
+                reutilizar el mismo buffer entre llamadas (p. ej. una capa de una pila)
+    • opciones: intermedios ya calculados y parámetros propios del método
+    
+    Da de regreso: matriz uint8 con 0 (fondo) y 1 (figura); con out, el mismo out
+    """
+    metodo = obtener_metodo(nombre)
+    for opcion in opciones:
+        if opcion not in metodo.intermedios and opcion not in metodo.parametros:
+            raise ValueError(f"Opción desconocida para {nombre}: {opcion}. "
+                             f"Opciones: {list(metodo.intermedios + metodo.parametros)}")
+    matriz = np.asarray(metodo.implementacion(backend)(pix, umbral_blanco, sensibilidad, **opciones))
+    if out is not None:
+        np.copyto(out, matriz, casting="unsafe")
+        return out
+    if matriz.dtype == bool:
+        return _como_matriz(matriz)
+    return matriz.astype(np.uint8, copy=False)
+
+def _como_matriz(mascara):
+    """Máscara booleana como matriz uint8 de 0 y 1, sin copiar los datos"""
+    return mascara.view(np.uint8)
+
+# Carga rápida: la decodificación JPEG escalada (draft) deja al menos
+# _MARGEN_DRAFT píxeles por celda y Image.reduce al menos _MARGEN_REDUCCION,
+# así el LANCZOS final siempre trabaja con suficiente resolución.
+_MARGEN_DRAFT = 8
+_MARGEN_REDUCCION = 32
 
 def detectar_figura_optimizado(ruta_imagen: str,
                               tamaño: int = 15,
                               metodo: str = "contraste_mejorado",
                               umbral_blanco: int = 240,
-                              sensibilidad: float = 0.8) -> np.ndarray:
+                              sensibilidad: float = 0.8,
+                              rapido: bool = False,
+                              medidor=None,
+                              backend: str = "auto",
+                              out: np.ndarray = None) -> np.ndarray:
     """
     Detecta la figura principal en una imagen con fondo blanco.
     Sensibilidad ajustable.
@@ -18,37 +157,838 @@ def detectar_figura_optimizado(ruta_imagen: str,
     • metodo         : método de detección
     • umbral_blanco  : threshold para considerar un píxel como fondo blanco
     • sensibilidad   : qué tan estricto ser con la detección (0.1 a 1.0)
+    • rapido         : carga rápida para fotos grandes (ver _cargar_imagen); el resultado
+                       puede diferir del normal solo en celdas justo en el límite del umbral
+    • medidor        : instrumentacion.Medidor opcional para registrar tiempo y memoria por etapa
+    • backend        : "auto", "numpy" o "numba" (ver MetodoDeteccion.implementacion);
+                       todos dan la misma matriz
+    • out            : array (tamaño, tamaño) uint8 o bool a reutilizar para el resultado
     
-    Da de regreso: matriz con 0 (fondo) y 1 (figura)
+    Da de regreso: matriz uint8 con 0 (fondo) y 1 (figura)
     """
+    obtener_metodo(metodo)  # método desconocido: error antes de abrir la imagen
     
     # Cargar y procesar imagen
-    img = Image.open(ruta_imagen).convert("RGB")
-    img = img.resize((tamaño, tamaño), Image.Resampling.LANCZOS)
-    pix = np.asarray(img, dtype=np.uint8)
+    pix = _cargar_imagen(ruta_imagen, tamaño, rapido, medidor)
+    
+    with etapa(medidor, f"deteccion:{metodo}", tamaño=tamaño, sensibilidad=sensibilidad,
+               backend=backend):
+        return _detectar_en_pix(pix, metodo, umbral_blanco, sensibilidad, backend, out)
+
+def _detectar_en_pix(pix, metodo, umbral_blanco, sensibilidad, backend="auto", out=None):
+    """Aplica el método indicado a la imagen ya reducida (tamaño x tamaño x 3)"""
+    return ejecutar_metodo(metodo, pix, umbral_blanco, sensibilidad, backend, out)
+
+def detectar_todos_metodos(ruta_imagen: str,
+                           tamaño: int = 15,
+                           metodos: list = None,
+                           umbral_blanco: int = 240,
+                           sensibilidad: float = 0.8,
+                           rapido: bool = False,
+                           medidor=None,
+                           backend: str = "auto") -> dict:
+    """
+    Aplica varios métodos de detección decodificando la imagen una sola vez.
+    
+    La imagen se abre y redimensiona una vez, y la máscara de fondo blanco, la
+    escala de grises y la luminancia se calculan una vez y se comparten entre
+    los métodos. El resultado de cada método es idéntico al de
+    detectar_figura_optimizado con los mismos parámetros.
+    
+    Parámetros:
+    • metodos : lista de métodos a aplicar (por defecto, los cuatro de METODOS_POR_DEFECTO)
+    (el resto, igual que en detectar_figura_optimizado)
+    
+    Da de regreso: diccionario {metodo: matriz}
+    """
+    metodos = list(METODOS_POR_DEFECTO) if metodos is None else list(metodos)
+    for metodo in metodos:
+        obtener_metodo(metodo)
+    
+    pix = _cargar_imagen(ruta_imagen, tamaño, rapido, medidor)
+    with etapa(medidor, "intermedios", tamaño=tamaño):
+        intermedios = _calcular_intermedios(pix, umbral_blanco, metodos)
+    
+    resultados = {}
+    for metodo in metodos:
+        with etapa(medidor, f"deteccion:{metodo}", tamaño=tamaño, sensibilidad=sensibilidad,
+                   backend=backend):
+            resultados[metodo] = _detectar_con_intermedios(pix, metodo, umbral_blanco,
+                                                           sensibilidad, intermedios, backend)
+    return resultados
+
+def _detectar_con_intermedios(pix, metodo, umbral_blanco, sensibilidad, intermedios, backend="auto"):
+    """Como _detectar_en_pix, reutilizando lo que calculó _calcular_intermedios"""
+    compartidos = {nombre: intermedios[nombre] for nombre in obtener_metodo(metodo).intermedios}
+    return ejecutar_metodo(metodo, pix, umbral_blanco, sensibilidad, backend, **compartidos)
+
+def comparar_metodos(ruta_imagen: str,
+                     tamaño: int = 15,
+                     metodos: list = None,
+                     umbral_blanco: int = 240,
+                     sensibilidad: float = 0.8,
+                     rapido: bool = False,
+                     ruta_salida: str = None,
+                     workers: int = None,
+                     medidor=None,
+                     backend: str = "auto",
+                     postproceso: dict = None) -> dict:
+    """
+    Compara los métodos de detección en una sola imagen de resultado, sin ventanas
+    ni pausas: apta para scripts y tareas automáticas.
+    
+    La imagen se decodifica una vez y cada método (detección + panel raster) corre
+    en un hilo de un ThreadPoolExecutor; NumPy y PIL sueltan el GIL en el trabajo
+    pesado. Cada panel lleva la cobertura y el tiempo de su método, y las matrices
+    son idénticas a las de detectar_figura_optimizado.
+    
+    Parámetros:
+    • metodos     : lista de métodos (por defecto, los cuatro de METODOS_POR_DEFECTO)
+    • ruta_salida : si se indica, guarda ahí el PNG del montaje
+    • workers     : hilos en paralelo (por defecto, uno por método)
+    • backend     : "auto", "numpy" o "numba" (ver detectar_figura_optimizado)
+    • postproceso : opciones de componentes_figuras.postprocesar, aplicadas a cada
+                    matriz antes de dibujarla (el tiempo anotado incluye la limpieza)
+    (el resto, igual que en detectar_figura_optimizado)
+    
+    Da de regreso: diccionario con "matrices" {metodo: matriz}, "tiempos" {metodo: segundos},
+    "cobertura" {metodo: porcentaje} e "imagen" (el montaje, imagen PIL)
+    """
+    metodos = list(METODOS_POR_DEFECTO) if metodos is None else list(metodos)
+    for metodo in metodos:
+        obtener_metodo(metodo)
+    
+    pix = _cargar_imagen(ruta_imagen, tamaño, rapido, medidor)
+    with etapa(medidor, "intermedios", tamaño=tamaño):
+        intermedios = _calcular_intermedios(pix, umbral_blanco, metodos)
+    
+    ancho_panel = 480
+    tamaño_celda = max(2, ancho_panel // tamaño)
+    nombre = os.path.basename(ruta_imagen) if isinstance(ruta_imagen, str) else ""
+    
+    def ejecutar(metodo):
+        inicio = time.perf_counter()
+        matriz = _detectar_con_intermedios(pix, metodo, umbral_blanco, sensibilidad, intermedios,
+                                           backend)
+        if postproceso:
+            matriz = postprocesar(matriz, **postproceso)
+        tiempo = time.perf_counter() - inicio
+        panel = renderizar_resultado_raster(matriz, f"Método: {metodo}", nombre,
+                                            tamaño_celda=tamaño_celda)
+        return matriz, tiempo, panel
+    
+    with etapa(medidor, "comparar_metodos", metodos=len(metodos), tamaño=tamaño):
+        with ThreadPoolExecutor(max_workers=workers or len(metodos)) as ejecutor:
+            resultados = dict(zip(metodos, ejecutor.map(ejecutar, metodos)))
+    
+    matrices = {metodo: r[0] for metodo, r in resultados.items()}
+    tiempos = {metodo: r[1] for metodo, r in resultados.items()}
+    cobertura = {metodo: float(np.mean(m)) * 100 for metodo, m in matrices.items()}
+    notas = [f"Detección: {tiempos[m] * 1000:.2f} ms  |  Cobertura: {cobertura[m]:.1f}%"
+             for m in metodos]
+    
+    with etapa(medidor, "montaje", paneles=len(metodos)):
+        imagen = _montar_paneles([resultados[m][2] for m in metodos],
+                                 f"Comparación de métodos - {tamaño}x{tamaño}, sensibilidad {sensibilidad}",
+                                 notas=notas, columnas=int(np.ceil(np.sqrt(len(metodos)))))
+        if ruta_salida:
+            imagen.save(ruta_salida, format="PNG", compress_level=1)
+    
+    return {"matrices": matrices, "tiempos": tiempos, "cobertura": cobertura, "imagen": imagen}
+
+def detectar_figura_paleta(ruta_imagen: str,
+                           tamaño: int = 15,
+                           paleta="basicos",
+                           agregacion: str = "moda",
+                           muestras: int = 8,
+                           bits: int = 8,
+                           rapido: bool = False,
+                           medidor=None) -> np.ndarray:
+    """
+    Reduce la imagen a una matriz de índices de una paleta del coloreador:
+    cada celda toma el color más cercano de la paleta, vía una tabla RGB -> índice
+    calculada una vez por paleta (ver paletas_figuras).
+
+    Parámetros:
+    • paleta     : nombre de una paleta de MatrizAImagen ("basicos", "calidos", ...) o lista de "#RRGGBB"
+    • agregacion : "moda" (el color de la paleta más frecuente entre los píxeles de la celda)
+                   o "media" (el color más cercano al color promedio de la celda)
+    • muestras   : con "moda", píxeles por lado que se toman de cada celda
+    • bits       : precisión de la tabla (8 exacta; 6 más chica, ver paletas_figuras.cubo_paleta)
+    (el resto, igual que en detectar_figura_optimizado)
+
+    Da de regreso: matriz uint8 de índices, lista para MatrizAImagen.convertir_matriz con la misma paleta
+    """
+    with etapa(medidor, "paleta", bits=bits):
+        cantidad_colores = len(colores_paleta(paleta))
+        cubo_paleta(paleta, bits)
+
+    if agregacion == "media":
+        pix = _cargar_imagen(ruta_imagen, tamaño, rapido, medidor)
+        with etapa(medidor, "cuantizar", tamaño=tamaño):
+            return cuantizar(pix, paleta, bits)
+    if agregacion != "moda":
+        raise ValueError(f"Agregación desconocida: {agregacion}. Opciones: moda, media")
+
+    pix = _cargar_imagen(ruta_imagen, tamaño * muestras, rapido, medidor)
+    with etapa(medidor, "cuantizar", tamaño=tamaño, muestras=muestras):
+        indices = cuantizar(pix, paleta, bits)
+        return moda_por_celda(indices, tamaño, cantidad_colores)
+
+class PiramideImagen:
+    def __init__(self, fuente, rapido: bool = False, tamaño_max: int = None, medidor=None):
+        """
+        Imagen decodificada una sola vez, con una pirámide de reducciones a la mitad
+        que se construye a medida y queda en caché.
+        
+        Para cada tamaño se parte del nivel más chico que conserve al menos
+        _MARGEN_REDUCCION píxeles por celda, así el LANCZOS final trabaja sobre
+        pocos píxeles. En pruebas con fotos de 4000x3000 y tamaños de 10 a 100,
+        cada canal difiere como máximo 1 nivel (de 255) del LANCZOS sobre la
+        imagen completa; con exacto=True en pix() se usa siempre la imagen completa.
+        
+        Parámetros:
+        • fuente     : ruta de la imagen o imagen PIL ya abierta
+        • rapido     : decodificación JPEG reducida (draft), como en _cargar_imagen;
+                       requiere tamaño_max para no bajar de _MARGEN_DRAFT píxeles por celda
+        • tamaño_max : el tamaño más grande que se va a pedir
+        • medidor    : instrumentacion.Medidor opcional
+        """
+        self.medidor = medidor
+        with etapa(medidor, "decodificar", rapido=rapido):
+            img = fuente if isinstance(fuente, Image.Image) else Image.open(fuente)
+            if rapido and tamaño_max:
+                img.draft("RGB", (tamaño_max * _MARGEN_DRAFT, tamaño_max * _MARGEN_DRAFT))
+            self.niveles = [img.convert("RGB")]
+        self._pix = {}
+    
+    def nivel(self, tamaño: int) -> Image.Image:
+        """Nivel más reducido de la pirámide con al menos _MARGEN_REDUCCION píxeles por celda"""
+        minimo = _MARGEN_REDUCCION * tamaño
+        while min(self.niveles[-1].size) // 2 >= minimo:
+            with etapa(self.medidor, "piramide", nivel=len(self.niveles)):
+                self.niveles.append(self.niveles[-1].reduce(2))
+        for img in reversed(self.niveles):
+            if min(img.size) >= minimo:
+                return img
+        return self.niveles[0]
+    
+    def pix(self, tamaño: int, exacto: bool = False) -> np.ndarray:
+        """Imagen reducida a tamaño x tamaño (uint8, RGB), en caché por tamaño"""
+        clave = (tamaño, exacto)
+        if clave not in self._pix:
+            origen = self.niveles[0] if exacto else self.nivel(tamaño)
+            with etapa(self.medidor, "redimensionar", tamaño=tamaño, origen=origen.size):
+                self._pix[clave] = np.asarray(origen.resize((tamaño, tamaño), Image.Resampling.LANCZOS),
+                                              dtype=np.uint8)
+        return self._pix[clave]
+
+def detectar_multiples_tamaños(ruta_imagen,
+                               tamaños,
+                               metodo: str = "contraste_mejorado",
+                               umbral_blanco: int = 240,
+                               sensibilidad: float = 0.8,
+                               rapido: bool = False,
+                               exacto: bool = False,
+                               ruta_comparacion: str = None,
+                               medidor=None) -> dict:
+    """
+    Detecta la figura en varios tamaños de cuadrícula decodificando la imagen una sola vez.
+    
+    Útil para elegir el tamaño: en vez de repetir procesar_imagen_simple con 15, 20,
+    25..., la imagen se decodifica una vez y cada tamaño sale de la pirámide en
+    caché (ver PiramideImagen).
+    
+    Parámetros:
+    • ruta_imagen      : ruta de la imagen, imagen PIL o PiramideImagen ya construida
+    • tamaños          : lista o range de tamaños (p. ej. range(15, 51, 5))
+    • exacto           : redimensionar siempre desde la imagen completa; cada matriz
+                         es idéntica a la de detectar_figura_optimizado
+    • ruta_comparacion : si se indica, guarda ahí un PNG con las matrices lado a lado
+    (el resto, igual que en detectar_figura_optimizado)
+    
+    Da de regreso: diccionario {tamaño: matriz}, en el orden de `tamaños`
+    """
+    tamaños = [int(t) for t in tamaños]
+    if not tamaños:
+        return {}
+    if isinstance(ruta_imagen, PiramideImagen):
+        piramide = ruta_imagen
+    else:
+        piramide = PiramideImagen(ruta_imagen, rapido, max(tamaños), medidor)
+    
+    resultados = {}
+    for tamaño in tamaños:
+        pix = piramide.pix(tamaño, exacto)
+        with etapa(medidor, f"deteccion:{metodo}", tamaño=tamaño, sensibilidad=sensibilidad):
+            resultados[tamaño] = _detectar_en_pix(pix, metodo, umbral_blanco, sensibilidad)
+    
+    if ruta_comparacion:
+        nombre = ruta_imagen if isinstance(ruta_imagen, str) else ""
+        with etapa(medidor, "comparacion", tamaños=len(tamaños)):
+            renderizar_comparacion(resultados, f"Comparación de tamaños - {metodo}", nombre,
+                                   ruta_salida=ruta_comparacion)
+    return resultados
+
+def mapas_metrica(pix: np.ndarray, metodo: str, umbrales_blanco=(240,)) -> dict:
+    """
+    Métricas por celda que cada método compara contra un umbral escalado por la sensibilidad.
+    
+    Parámetros:
+    • pix             : imagen ya reducida (tamaño x tamaño x 3, uint8)
+    • metodo          : uno de los cuatro métodos incluidos (no los registrados aparte)
+    • umbrales_blanco : valores de umbral_blanco; lo que depende de él trae un eje
+                        inicial con un elemento por umbral
+    
+    Da de regreso: diccionario con los mapas del método
+    • contraste_mejorado    : "std" y "diferencia_esquinas" (filas, columnas), "fondo" (U, filas, columnas)
+    • diferencia_adaptativa : "distancia" al color de fondo (U, filas, columnas)
+    • luminancia_precisa    : "luminancia" (filas, columnas) y "luminancia_fondo" (U,)
+    • bordes_combinados     : "bordes" normalizados (filas, columnas), "fondo" (U, filas, columnas)
+    """
+    if metodo not in _METODOS_INCLUIDOS:
+        raise ValueError(f"Método no disponible para mapas de métrica: {metodo}. "
+                         f"Opciones: {list(_METODOS_INCLUIDOS)}")
+    umbrales_blanco = [int(u) for u in umbrales_blanco]
+    if metodo in ("contraste_mejorado", "bordes_combinados"):
+        # pix >= u en los tres canales equivale a min(pix) >= u
+        minimo = pix.min(axis=2)
+        fondo = minimo[None] >= np.array(umbrales_blanco)[:, None, None]
+    
+    if metodo == "contraste_mejorado":
+        std_promedio, diferencia_esquinas = _mapas_contraste(pix)
+        return {"std": std_promedio, "diferencia_esquinas": diferencia_esquinas, "fondo": fondo}
+    elif metodo == "diferencia_adaptativa":
+        return {"distancia": np.stack([_mapa_diferencia(pix, u) for u in umbrales_blanco])}
+    elif metodo == "luminancia_precisa":
+        luminancia = _luminancia(pix)
+        return {"luminancia": luminancia,
+                "luminancia_fondo": np.array([_luminancia_fondo(luminancia, u) for u in umbrales_blanco])}
+    else:
+        bordes, _ = _mapa_bordes(np.mean(pix, axis=2))
+        return {"bordes": bordes, "fondo": fondo}
+
+def umbralizar_mapas(mapas: dict, metodo: str, sensibilidades) -> np.ndarray:
+    """
+    Aplica a los mapas de mapas_metrica todas las sensibilidades a la vez, por broadcasting.
+    Cada capa es idéntica a la matriz de detectar_figura_optimizado con esos parámetros.
     
+    Da de regreso: array booleano (umbrales, sensibilidades, filas, columnas)
+    """
+    s = np.asarray(sensibilidades, dtype=float)[None, :, None, None]
     if metodo == "contraste_mejorado":
-        return _detectar_por_contraste_mejorado(pix, umbral_blanco, sensibilidad)
+        contraste = (mapas["std"] > 15 * s) | (mapas["diferencia_esquinas"] > 20 * s)
+        return contraste & ~mapas["fondo"][:, None]
     elif metodo == "diferencia_adaptativa":
-        return _detectar_por_diferencia_adaptativa(pix, umbral_blanco, sensibilidad)
+        return mapas["distancia"][:, None] > 30 * s
     elif metodo == "luminancia_precisa":
-        return _detectar_por_luminancia_precisa(pix, umbral_blanco, sensibilidad)
+        umbral = mapas["luminancia_fondo"][:, None, None, None] - (50 * s)
+        return mapas["luminancia"] < umbral
+    else:
+        return (mapas["bordes"] > 0.1 * s) | ~mapas["fondo"][:, None]
+
+def sugerir_parametros(cobertura: np.ndarray, sensibilidades, umbrales_blanco) -> dict:
+    """
+    Elige la combinación donde la cobertura es más estable, es decir, donde menos
+    cambia al mover la sensibilidad (y el umbral de blanco, si hay varios).
+    Se descartan las combinaciones con cobertura 0% o 100%, que son estables pero inútiles.
+    
+    Parámetros:
+    • cobertura : fracción de celdas de figura, array (umbrales, sensibilidades)
+    
+    Da de regreso: diccionario con sensibilidad, umbral_blanco, cobertura y variacion
+    (cambio de cobertura por unidad de parámetro normalizado; menor es más estable)
+    """
+    sensibilidades = np.asarray(sensibilidades, dtype=float)
+    umbrales_blanco = np.asarray(umbrales_blanco, dtype=float)
+    variacion = np.zeros_like(cobertura, dtype=float)
+    
+    # Derivada respecto de cada parámetro, llevado a [0, 1]
+    for eje, valores in ((1, sensibilidades), (0, umbrales_blanco)):
+        if valores.size < 2 or np.ptp(valores) == 0:
+            continue
+        normalizados = (valores - valores.min()) / np.ptp(valores)
+        variacion = np.hypot(variacion, np.gradient(cobertura, normalizados, axis=eje))
+    
+    puntaje = np.where((cobertura > 0) & (cobertura < 1), variacion, np.inf)
+    if np.all(np.isinf(puntaje)):
+        puntaje = variacion
+    # Si hay empate (una meseta), el punto del medio
+    candidatos = np.argwhere(puntaje <= puntaje.min() + 1e-12)
+    i, j = candidatos[len(candidatos) // 2]
+    return {"sensibilidad": float(sensibilidades[j]), "umbral_blanco": int(umbrales_blanco[i]),
+            "cobertura": float(cobertura[i, j]), "variacion": float(variacion[i, j])}
+
+def barrer_parametros(ruta_imagen: str,
+                      sensibilidades,
+                      umbrales_blanco=(240,),
+                      tamaño: int = 15,
+                      metodo: str = "contraste_mejorado",
+                      rapido: bool = False,
+                      medidor=None) -> dict:
+    """
+    Prueba muchas sensibilidades (y umbrales de blanco) con una sola detección.
+    
+    La imagen se carga una vez y las métricas de cada celda se calculan una vez
+    (mapas_metrica); luego todas las combinaciones se resuelven comparando contra
+    los umbrales por broadcasting, así un barrido de 50 valores cuesta casi lo
+    mismo que una detección.
+    
+    Parámetros:
+    • sensibilidades  : lista o array de sensibilidades (p. ej. np.linspace(0.1, 1.0, 50))
+    • umbrales_blanco : lista de valores de umbral_blanco
+    (el resto, igual que en detectar_figura_optimizado)
+    
+    Da de regreso: diccionario con
+    • matrices   : array booleano (umbrales, sensibilidades, tamaño, tamaño)
+    • cobertura  : fracción de celdas de figura por combinación (umbrales, sensibilidades)
+    • sugerencia : resultado de sugerir_parametros
+    """
+    sensibilidades = np.asarray(sensibilidades, dtype=float).ravel()
+    umbrales_blanco = np.asarray(umbrales_blanco, dtype=int).ravel()
+    
+    pix = _cargar_imagen(ruta_imagen, tamaño, rapido, medidor)
+    with etapa(medidor, f"mapas:{metodo}", tamaño=tamaño, umbrales=umbrales_blanco.size):
+        mapas = mapas_metrica(pix, metodo, umbrales_blanco)
+    with etapa(medidor, "barrido", sensibilidades=sensibilidades.size, umbrales=umbrales_blanco.size):
+        matrices = umbralizar_mapas(mapas, metodo, sensibilidades)
+        cobertura = matrices.mean(axis=(2, 3))
+    return {"matrices": matrices, "cobertura": cobertura,
+            "sugerencia": sugerir_parametros(cobertura, sensibilidades, umbrales_blanco)}
+
+def iterar_fotogramas(fuente):
+    """
+    Genera los fotogramas (imágenes PIL en RGB) de una secuencia, uno a la vez:
+    • GIF animado o TIFF de varias páginas: cada fotograma/página
+    • carpeta o patrón glob: cada imagen, en orden numérico natural (frame2 antes que frame10)
+    • lista de rutas o de imágenes PIL
+    """
+    if isinstance(fuente, (list, tuple)):
+        for elemento in fuente:
+            imagen = elemento if isinstance(elemento, Image.Image) else Image.open(elemento)
+            yield imagen.convert("RGB")
+        return
+    
+    if os.path.isdir(fuente) or any(c in fuente for c in "*?["):
+        rutas = [os.path.join(fuente, n) for n in os.listdir(fuente)] if os.path.isdir(fuente) \
+                else glob.glob(fuente)
+        rutas = [r for r in rutas if os.path.isfile(r)]
+        orden_natural = lambda r: [int(t) if t.isdigit() else t.lower() for t in re.split(r"(\d+)", r)]
+        for ruta in sorted(rutas, key=orden_natural):
+            try:
+                with Image.open(ruta) as imagen:
+                    yield imagen.convert("RGB")
+            except OSError:
+                continue  # archivos que no son imágenes
+        return
+    
+    with Image.open(fuente) as imagen:
+        for fotograma in ImageSequence.Iterator(imagen):
+            yield fotograma.convert("RGB")
+
+def detectar_secuencia(fuente,
+                       tamaño: int = 15,
+                       metodo: str = "contraste_mejorado",
+                       umbral_blanco: int = 240,
+                       sensibilidad: float = 0.8,
+                       tolerancia: int = 0,
+                       medidor=None):
+    """
+    Detecta la figura en cada fotograma de una secuencia, generando las matrices a medida.
+    
+    Solo se recalculan las celdas cuya zona de origen cambió respecto del último
+    valor usado: una celda cambia si algún canal de su píxel reducido difiere en
+    más de `tolerancia` niveles. También se recalculan las celdas vecinas que
+    dependen de ella (ventana de contraste, filtro de Sobel) y toda la matriz si
+    cambia algo que el método usa de forma global (esquinas y bordes para estimar
+    el fondo, máximo de los bordes). Cada método se calcula solo en el rectángulo
+    que encierra esas celdas (ver _detectar_en_caja); un fotograma sin cambios no
+    calcula nada.
+    
+    Con tolerancia=0 cada matriz es idéntica a la de detectar_figura_optimizado
+    sobre ese fotograma; con tolerancia > 0 se ignoran cambios pequeños (ruido de
+    compresión) y las celdas sin cambios conservan su valor anterior.
+    
+    Parámetros:
+    • fuente    : GIF/TIFF de varios fotogramas, carpeta, patrón glob o lista (ver iterar_fotogramas)
+    • tolerancia: diferencia máxima por canal (0-255) que se considera "sin cambio"
+    (el resto, igual que en detectar_figura_optimizado)
+    
+    Genera: una matriz (tamaño x tamaño) por fotograma
+    """
+    if metodo not in _METODOS_INCLUIDOS:
+        raise ValueError(f"Método no disponible para secuencias: {metodo}. "
+                         f"Opciones: {list(_METODOS_INCLUIDOS)}")
+    
+    pix_referencia = None
+    matriz_anterior = None
+    estado = {}  # lo que el método usa de toda la imagen, entre un fotograma y otro
+    
+    for indice, fotograma in enumerate(iterar_fotogramas(fuente)):
+        with etapa(medidor, "redimensionar", tamaño=tamaño, fotograma=indice):
+            pix = np.asarray(fotograma.resize((tamaño, tamaño), Image.Resampling.LANCZOS),
+                             dtype=np.uint8)
+        
+        with etapa(medidor, f"secuencia:{metodo}", fotograma=indice):
+            if pix_referencia is None:
+                cambiadas = np.ones((tamaño, tamaño), dtype=bool)
+            else:
+                diferencia = np.abs(pix.astype(np.int16) - pix_referencia)
+                cambiadas = np.any(diferencia > tolerancia, axis=2)
+            
+            recalcular = _celdas_a_recalcular(metodo, cambiadas)
+            if matriz_anterior is None:
+                matriz = np.zeros((tamaño, tamaño), dtype=np.uint8)
+                pix_referencia = pix.astype(np.int16)
+            else:
+                matriz = matriz_anterior.copy()
+                pix_referencia[cambiadas] = pix[cambiadas]
+            
+            caja = _caja(recalcular)
+            if caja is not None:
+                nueva, caja = _detectar_en_caja(metodo, pix, caja, recalcular, estado,
+                                                umbral_blanco, sensibilidad)
+                np.copyto(matriz[caja], nueva, where=recalcular[caja])
+            matriz_anterior = matriz
+        
+        if medidor is not None:
+            medidor.registros[-1]["celdas_recalculadas"] = int(recalcular.sum())
+        yield matriz
+
+def detectar_secuencia_pila(fuente, tamaño: int = 15, metodo: str = "contraste_mejorado",
+                            umbral_blanco: int = 240, sensibilidad: float = 0.8,
+                            tolerancia: int = 0, medidor=None, ruta_pila: str = None):
+    """
+    Igual que detectar_secuencia, pero reúne todo en un array (fotogramas, tamaño, tamaño).
+    Con ruta_pila, cada matriz se agrega a esa pila compacta (.figs, 1 bit por celda)
+    a medida que se detecta, sin juntarlas en memoria, y se devuelve la PilaMatrices.
+    """
+    if ruta_pila:
+        with PilaMatrices(ruta_pila, "a") as pila:
+            for matriz in detectar_secuencia(fuente, tamaño, metodo, umbral_blanco,
+                                             sensibilidad, tolerancia, medidor):
+                pila.agregar(matriz)
+        return PilaMatrices(ruta_pila)
+    
+    matrices = list(detectar_secuencia(fuente, tamaño, metodo, umbral_blanco,
+                                       sensibilidad, tolerancia, medidor))
+    if not matrices:
+        return np.zeros((0, tamaño, tamaño), dtype=np.uint8)
+    return np.stack(matrices)
+
+def _caja(celdas):
+    """Menor rectángulo (par de slices) que encierra las celdas en True; None si no hay"""
+    filas = np.flatnonzero(celdas.any(axis=1))
+    if filas.size == 0:
+        return None
+    columnas = np.flatnonzero(celdas.any(axis=0))
+    return slice(filas[0], filas[-1] + 1), slice(columnas[0], columnas[-1] + 1)
+
+def _detectar_en_caja(metodo, pix, caja, recalcular, estado, umbral_blanco, sensibilidad):
+    """
+    Paso de detectar_secuencia: aplica el método solo dentro de `caja`, con el mismo
+    resultado celda por celda que sobre la imagen completa. En `estado` quedan, de un
+    fotograma a otro, los valores globales que no se pueden sacar de la caja.
+    
+    Da de regreso: (matriz de la caja, caja). Si cambió el máximo de los bordes, la
+    normalización cambia en todas las celdas: la caja pasa a ser la matriz entera y
+    `recalcular` queda todo en True.
+    """
+    alto, ancho = recalcular.shape
+    filas, columnas = caja
+    if metodo == "contraste_mejorado":
+        # La ventana depende de la distancia al borde de la imagen: se usa la imagen
+        # completa, pero las métricas solo se calculan en las celdas marcadas
+        nueva = _detectar_por_contraste_mejorado(pix, umbral_blanco, sensibilidad,
+                                                 celdas=recalcular)
+        return nueva[caja], caja
+    if metodo == "diferencia_adaptativa":
+        # Si cambió algún punto del que sale el color de fondo, la caja ya es toda la matriz
+        color_fondo = _color_fondo(pix, umbral_blanco)
+        return _mapa_diferencia(pix[caja], umbral_blanco, color_fondo) > 30 * sensibilidad, caja
+    if metodo == "luminancia_precisa":
+        luminancia = _luminancia(pix[caja])
+        if recalcular.all():  # cambió el borde, del que sale la luminancia del fondo
+            estado["luminancia_fondo"] = _luminancia_fondo(luminancia, umbral_blanco)
+        return luminancia < estado["luminancia_fondo"] - 50 * sensibilidad, caja
+    
+    # bordes_combinados: Sobel sobre la caja más una celda de vecinos (o el borde
+    # reflejado, donde la caja toca el borde de la imagen)
+    f0, f1 = max(filas.start - 1, 0), min(filas.stop + 1, alto)
+    c0, c1 = max(columnas.start - 1, 0), min(columnas.stop + 1, ancho)
+    relleno = ((int(filas.start == 0), int(filas.stop == alto)),
+               (int(columnas.start == 0), int(columnas.stop == ancho)))
+    magnitud_caja = _magnitud_bordes(np.mean(pix[f0:f1, c0:c1], axis=2), relleno)
+    if "magnitud" not in estado:
+        estado["magnitud"] = magnitud_caja  # primer fotograma: la caja es toda la imagen
+    else:
+        np.copyto(estado["magnitud"][caja], magnitud_caja, where=recalcular[caja])
+    maximo = np.max(estado["magnitud"])
+    if maximo != estado.get("maximo"):
+        recalcular[:] = True
+        caja = (slice(0, alto), slice(0, ancho))
+    estado["maximo"] = maximo
+    
+    bordes = estado["magnitud"][caja]
+    if maximo > 0:
+        bordes = bordes / maximo
+    nueva = bordes > 0.1 * sensibilidad
+    nueva |= ~_mascara_fondo(pix[caja], umbral_blanco)
+    return nueva, caja
+
+def _celdas_a_recalcular(metodo, cambiadas):
+    """Amplía las celdas cambiadas a todas las que dependen de ellas según el método"""
+    filas, columnas = cambiadas.shape
+    if metodo == "contraste_mejorado":
+        radio = 2  # ventana adaptativa de hasta 5x5
     elif metodo == "bordes_combinados":
-        return _detectar_por_bordes_combinados(pix, umbral_blanco, sensibilidad)
+        radio = 1  # núcleo de Sobel 3x3
+    elif metodo == "diferencia_adaptativa":
+        # El color de fondo se estima con 8 puntos del borde
+        muestras = [(0, 0), (0, -1), (-1, 0), (-1, -1), (0, columnas//2),
+                    (filas//2, 0), (filas//2, -1), (-1, columnas//2)]
+        if any(cambiadas[i, j] for i, j in muestras):
+            return np.ones_like(cambiadas)
+        return cambiadas.copy()
+    else:
+        # La luminancia de fondo se estima con todo el borde
+        if cambiadas[0].any() or cambiadas[-1].any() or cambiadas[:, 0].any() or cambiadas[:, -1].any():
+            return np.ones_like(cambiadas)
+        return cambiadas.copy()
+    
+    # Dilatación cuadrada de `radio` celdas
+    relleno = np.pad(cambiadas, radio)
+    recalcular = np.zeros_like(cambiadas)
+    for di in range(2 * radio + 1):
+        for dj in range(2 * radio + 1):
+            recalcular |= relleno[di:di + filas, dj:dj + columnas]
+    return recalcular
+
+def _cargar_imagen(ruta_imagen, tamaño, rapido=False, medidor=None):
+    """
+    Abre la imagen, la convierte a RGB y la redimensiona a tamaño x tamaño.
+    
+    Con rapido=True, los JPEG se decodifican ya reducidos por escalado DCT
+    (1/2, 1/4 o 1/8, sin bajar de _MARGEN_DRAFT píxeles por celda) y luego
+    Image.reduce promedia por bloques enteros mientras queden al menos
+    _MARGEN_REDUCCION píxeles por celda, antes del LANCZOS final. Una foto de
+    24 MP se decodifica a ~0.4 MP, con menos tiempo y memoria.
+    
+    Cota de diferencia con la carga normal: en pruebas con fotos JPEG y PNG
+    de 4000x3000 y tamaños de 10 a 100, cada canal de la imagen reducida
+    difiere como máximo 3 niveles (de 255). Solo cambian las celdas cuyo valor
+    ya estaba a esa distancia del umbral (menos del 0.01% de las celdas).
+    """
+    with etapa(medidor, "decodificar", rapido=rapido):
+        img = Image.open(ruta_imagen)
+        if rapido:
+            img.draft("RGB", (tamaño * _MARGEN_DRAFT, tamaño * _MARGEN_DRAFT))
+        img = img.convert("RGB")
+    
+    with etapa(medidor, "redimensionar", tamaño=tamaño, origen=img.size):
+        if rapido:
+            img = img.resize((tamaño, tamaño), Image.Resampling.LANCZOS,
+                             reducing_gap=_MARGEN_REDUCCION)
+        else:
+            img = img.resize((tamaño, tamaño), Image.Resampling.LANCZOS)
+        return np.asarray(img, dtype=np.uint8)
+
+def detectar_figura_por_franjas(ruta_imagen: str,
+                                tamaño: int = 15,
+                                metodo: str = "contraste_mejorado",
+                                umbral_blanco: int = 240,
+                                sensibilidad: float = 0.8,
+                                memoria_max_mb: float = 256,
+                                medidor=None) -> np.ndarray:
+    """
+    Igual que detectar_figura_optimizado, pero para escaneos y panorámicas enormes:
+    lee la imagen por franjas horizontales sin cargarla entera (ver _cargar_imagen_por_franjas).
+    
+    Parámetros:
+    • memoria_max_mb : presupuesto aproximado de memoria pico para la lectura
+    (el resto, igual que en detectar_figura_optimizado)
+    
+    Da de regreso: matriz uint8 con 0 (fondo) y 1 (figura)
+    """
+    obtener_metodo(metodo)  # nombre inválido: error antes de abrir un archivo enorme
+    pix = _cargar_imagen_por_franjas(ruta_imagen, tamaño, memoria_max_mb, medidor)
+    with etapa(medidor, f"deteccion:{metodo}", tamaño=tamaño, sensibilidad=sensibilidad):
+        return _detectar_en_pix(pix, metodo, umbral_blanco, sensibilidad)
+
+def _cargar_imagen_por_franjas(ruta_imagen, tamaño, memoria_max_mb=256, medidor=None):
+    """
+    Reduce la imagen a tamaño x tamaño leyendo franjas de filas, con memoria acotada.
+    
+    Cada franja se promedia por bloques enteros (como Image.reduce), de modo que
+    cada píxel suma solo en el bloque que lo cubre y quedan hasta _MARGEN_REDUCCION
+    bloques por celda; al final un LANCZOS lleva esa cuadrícula a tamaño x tamaño.
+    El alto de franja se elige para que la memoria de trabajo (sin contar el
+    intérprete ni los módulos) no pase de memoria_max_mb.
+    
+    Lectura por franjas real (sin decodificar el resto): formatos sin compresión
+    (TIFF sin comprimir, BMP, PPM). Los JPEG se decodifican ya reducidos (draft)
+    y los demás (PNG, TIFF comprimido) se decodifican enteros, porque PIL los
+    entrega como un único bloque comprimido; en ambos casos la reducción sigue
+    siendo por franjas. Si esa decodificación completa no entra en memoria_max_mb
+    se avisa con un RuntimeWarning (el presupuesto no se puede cumplir).
+    
+    Tolerancia frente a _cargar_imagen: la misma que la carga rápida. En pruebas
+    con fotos de 4000x3000 (JPEG, PNG, TIFF y BMP, en RGB, grises y paleta),
+    tamaños de 10 a 100 y presupuestos de 32 y 256 MB, cada canal de la imagen
+    reducida difiere como máximo 3 niveles (de 255) y cambian menos del 0.03%
+    de las celdas, todas justo en el límite del umbral. Con presupuestos de menos
+    de 1 MB los acumuladores obligan a bajar el margen y la diferencia crece.
+    """
+    with warnings.catch_warnings(), etapa(medidor, "abrir_por_franjas"):
+        # Escaneos de gigapíxeles superan el límite de PIL contra "bombas" de descompresión
+        warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+        limite, Image.MAX_IMAGE_PIXELS = Image.MAX_IMAGE_PIXELS, None
+        try:
+            img = Image.open(ruta_imagen)
+        finally:
+            Image.MAX_IMAGE_PIXELS = limite
+    ancho, alto = img.size
+    
+    franjas = _franjas_sin_compresion(img) if _admite_franjas(img) else None
+    if franjas is None and img.format == "JPEG":
+        img.draft("RGB", (tamaño * _MARGEN_DRAFT, tamaño * _MARGEN_DRAFT))
+    ancho_leido, alto_leido = img.size
+    
+    # Factor entero de reducción por bloques, como Image.reduce con reducing_gap:
+    # hasta _MARGEN_REDUCCION píxeles por celda, menos si los acumuladores
+    # (float64) no entran en la mitad del presupuesto
+    presupuesto = memoria_max_mb * 2**20
+    margen = _MARGEN_REDUCCION
+    while margen > 2 and (tamaño * margen) ** 2 * 3 * 8 > presupuesto / 2:
+        margen //= 2
+    factor_x = max(1, ancho_leido // (tamaño * margen))
+    factor_y = max(1, alto_leido // (tamaño * margen))
+    
+    inicio_columnas = np.arange(0, ancho_leido, factor_x)
+    cuentas_columnas = np.diff(np.append(inicio_columnas, ancho_leido))
+    cuentas_filas = np.diff(np.append(np.arange(0, alto_leido, factor_y), alto_leido))
+    sumas = np.zeros((len(cuentas_filas), len(cuentas_columnas), 3))
+    
+    # Por fila: bytes crudos + imagen PIL de la franja y su conversión a RGB (4 bytes/px
+    # cada una) + copia numpy (3 bytes/px) + sumas por bloque de filas (uint32), con holgura
+    bytes_por_fila = ancho_leido * 16 + ancho_leido * 3 * 4 // factor_y
+    disponible = presupuesto - sumas.nbytes
+    alto_franja = int(max(1, min(alto_leido, disponible // bytes_por_fila)))
+    
+    if franjas is None:
+        # Memoria interna de PIL: 1 byte/px en L/P/1, 2 en I;16 y 4 en el resto
+        bytes_px = 1 if img.mode in ("1", "L", "P") else 2 if img.mode.startswith("I;16") else 4
+        decodificada = ancho_leido * alto_leido * bytes_px
+        if decodificada > presupuesto:
+            warnings.warn(f"{img.format or 'Este formato'} no se puede leer por franjas: se "
+                          f"decodifica entera (~{decodificada / 2**20:.0f} MB), más que "
+                          f"memoria_max_mb={memoria_max_mb:g}. Convierte la imagen a TIFF "
+                          f"sin comprimir o BMP para respetar el presupuesto.",
+                          RuntimeWarning, stacklevel=3)
+        with etapa(medidor, "decodificar", origen=(ancho, alto), leido=img.size):
+            img.load()
+        franjas = ((y, img.crop((0, y, ancho_leido, min(alto_leido, y + alto_franja))))
+                   for y in range(0, alto_leido, alto_franja))
     else:
-        return _detectar_basico(pix, umbral_blanco)
+        franjas = franjas(alto_franja)
+    
+    with etapa(medidor, "reducir_por_franjas", origen=(ancho, alto), leido=img.size,
+               factor=(factor_x, factor_y), alto_franja=alto_franja):
+        for y, franja in franjas:
+            bloque = np.asarray(franja.convert("RGB"), dtype=np.uint8)
+            # Sumar las filas de cada bloque (sin copiar la franja a otro tipo), luego
+            # las columnas, y acumular: un bloque puede quedar repartido en dos franjas
+            grupos = np.arange(y, y + bloque.shape[0]) // factor_y
+            cortes = np.flatnonzero(np.diff(grupos)) + 1
+            por_filas = np.stack([parte.sum(axis=0, dtype=np.uint32)
+                                  for parte in np.split(bloque, cortes)])
+            sumas[grupos[np.append(0, cortes)]] += np.add.reduceat(por_filas, inicio_columnas, axis=1)
+            del bloque, por_filas
+    img.close()
+    
+    with etapa(medidor, "redimensionar", tamaño=tamaño, origen=sumas.shape[1::-1]):
+        sumas /= cuentas_filas[:, None, None] * cuentas_columnas[None, :, None]
+        sumas += 0.5
+        intermedia = Image.fromarray(np.floor(sumas, out=sumas).astype(np.uint8))
+        # El último bloque puede ser parcial: recortar la misma fracción que Image.resize
+        caja = (0, 0, ancho_leido / factor_x, alto_leido / factor_y)
+        return np.asarray(intermedia.resize((tamaño, tamaño), Image.Resampling.LANCZOS, box=caja),
+                          dtype=np.uint8)
 
-def _detectar_basico(pix, umbral_blanco):
-    """Método básico: simplemente busca píxeles no blancos"""
-    fondo = (pix[:, :, 0] >= umbral_blanco) & \
-            (pix[:, :, 1] >= umbral_blanco) & \
-            (pix[:, :, 2] >= umbral_blanco)
-    return (~fondo).astype(int)
+def _admite_franjas(img):
+    """True si el archivo guarda filas completas sin compresión (decodificador "raw")"""
+    return bool(img.tile) and all(
+        t[0] == "raw" and t[1][0] == 0 and t[1][2] == img.size[0] for t in img.tile)
 
-def _detectar_por_contraste_mejorado(pix, umbral_blanco, sensibilidad):
-    """Detecta basado en contraste local mejorado"""
+def _franjas_sin_compresion(img):
+    """
+    Prepara la lectura por franjas de un archivo sin compresión: cada franja se
+    lee del disco y se decodifica sola con Image.frombytes.
+    Da de regreso: función alto_franja -> generador de (fila inicial, imagen PIL de la franja)
+    """
+    ancho = img.size[0]
+    ruta = img.filename
+    tramos = []
+    for _, (x0, y0, x1, y1), desplazamiento, argumentos in img.tile:
+        if isinstance(argumentos, str):
+            argumentos = (argumentos, 0, 1)
+        modo_crudo, paso, orientacion = (tuple(argumentos) + (0, 1))[:3]
+        if paso == 0:
+            paso = len(Image.new(img.mode, (ancho, 1)).tobytes("raw", modo_crudo))
+        tramos.append((y0, y1, desplazamiento, modo_crudo, paso, orientacion or 1))
+    paleta = img.getpalette() if img.mode == "P" else None
+    
+    def generar(alto_franja):
+        with open(ruta, "rb") as archivo:
+            for y0, y1, desplazamiento, modo_crudo, paso, orientacion in tramos:
+                for y in range(y0, y1, alto_franja):
+                    filas = min(alto_franja, y1 - y)
+                    if orientacion > 0:
+                        archivo.seek(desplazamiento + (y - y0) * paso)
+                    else:
+                        # De abajo hacia arriba (BMP): la última fila de la franja está primero
+                        archivo.seek(desplazamiento + (y1 - y - filas) * paso)
+                    datos = archivo.read(filas * paso)
+                    franja = Image.frombytes(img.mode, (ancho, filas), datos, "raw",
+                                             modo_crudo, paso, orientacion)
+                    if paleta is not None:
+                        franja.putpalette(paleta)
+                    yield y, franja
+    return generar
+
+def _mascara_fondo(pix, umbral_blanco):
+    """True donde los tres canales superan el umbral de blanco (es decir, el menor de ellos)"""
+    return pix.min(axis=2) >= umbral_blanco
+
+def _luminancia(pix):
+    """
+    Luminancia (percepción humana del brillo) de cada píxel:
+    0.299*R + 0.587*G + 0.114*B, sumado en ese orden sobre un solo buffer
+    """
+    luminancia = np.multiply(pix[:, :, 0], 0.299)
+    canal = np.empty_like(luminancia)
+    luminancia += np.multiply(pix[:, :, 1], 0.587, out=canal)
+    luminancia += np.multiply(pix[:, :, 2], 0.114, out=canal)
+    return luminancia
+
+def _calcular_intermedios(pix, umbral_blanco, metodos):
+    """Calcula una sola vez los intermedios que necesitan los métodos indicados"""
+    necesarios = set()
+    for metodo in metodos:
+        necesarios.update(obtener_metodo(metodo).intermedios)
+    intermedios = {"fondo": None, "gris": None, "luminancia": None}
+    if "fondo" in necesarios:
+        intermedios["fondo"] = _mascara_fondo(pix, umbral_blanco)
+    if "gris" in necesarios:
+        intermedios["gris"] = np.mean(pix, axis=2)
+    if "luminancia" in necesarios:
+        intermedios["luminancia"] = _luminancia(pix)
+    return intermedios
+
+def _detectar_por_contraste_mejorado_bucle(pix, umbral_blanco, sensibilidad):
+    """Detecta basado en contraste local mejorado (versión original celda por celda)"""
     filas, columnas = pix.shape[:2]
-    matriz = np.zeros((filas, columnas), dtype=int)
+    matriz = np.zeros((filas, columnas), dtype=np.uint8)
     
     # Calcular contraste local en ventanas variables
     for i in range(filas):
@@ -91,8 +1031,114 @@ def _detectar_por_contraste_mejorado(pix, umbral_blanco, sensibilidad):
     
     return matriz
 
+@registrar_metodo("contraste_mejorado", descripcion="Contraste local en una ventana adaptativa",
+                  intermedios=("fondo",), parametros=("bloque", "celdas"))
+def _detectar_por_contraste_mejorado(pix, umbral_blanco, sensibilidad, bloque=65536, fondo=None,
+                                     celdas=None):
+    """
+    Detecta basado en contraste local mejorado, procesando toda la matriz a la vez.
+
+    Devuelve exactamente la misma matriz que _detectar_por_contraste_mejorado_bucle:
+    las celdas se agrupan por forma de ventana (5x5 en el interior, 2x2, 2x3, 3x2
+    o 3x3 en los dos anillos del borde) y cada grupo calcula np.std sobre ventanas
+    contiguas, con el mismo orden de suma que la versión celda por celda.
+    • bloque: número máximo de celdas por lote (limita la memoria temporal)
+    • fondo : máscara de fondo blanco ya calculada (opcional)
+    • celdas: máscara booleana de las celdas a calcular (opcional); las demás quedan en 0
+    """
+    if fondo is None:
+        fondo = _mascara_fondo(pix, umbral_blanco)
+    std_promedio, diferencia_esquinas = _mapas_contraste(pix, bloque, celdas)
+    return _umbralizar_contraste(std_promedio, diferencia_esquinas, fondo, sensibilidad, celdas)
+
+@registrar_metodo("contraste_mejorado", backend="numba")
+def _detectar_por_contraste_mejorado_numba(pix, umbral_blanco, sensibilidad, bloque=None, fondo=None,
+                                           celdas=None):
+    """
+    Igual que _detectar_por_contraste_mejorado, con las métricas calculadas por el
+    núcleo compilado de nucleos_figuras (mismo orden de operaciones, mismo resultado).
+    `bloque` no se usa: el núcleo no necesita memoria temporal.
+    """
+    if fondo is None:
+        fondo = _mascara_fondo(pix, umbral_blanco)
+    std_promedio, diferencia_esquinas = nucleos_figuras.mapas_contraste(pix)
+    return _umbralizar_contraste(std_promedio, diferencia_esquinas, fondo, sensibilidad, celdas)
+
+def _umbralizar_contraste(std_promedio, diferencia_esquinas, fondo, sensibilidad, celdas=None):
+    matriz = std_promedio > 15 * sensibilidad
+    matriz |= diferencia_esquinas > 20 * sensibilidad
+    matriz &= ~fondo
+    if celdas is not None:
+        matriz &= celdas
+    return _como_matriz(matriz)
+
+def _mapas_contraste(pix, bloque=65536, celdas=None):
+    """
+    Métricas por celda de contraste_mejorado: desviación estándar promedio de los
+    canales en la ventana adaptativa y diferencia media con sus esquinas.
+    Da de regreso: (std_promedio, diferencia_esquinas), dos arrays (filas, columnas);
+    con `celdas`, las no seleccionadas quedan en 0.
+    """
+    filas, columnas = pix.shape[:2]
+    std_mapa = np.zeros((filas, columnas))
+    diferencia_mapa = np.zeros((filas, columnas))
+
+    # Ventana adaptativa por celda (más grande lejos de los bordes)
+    ii, jj = np.meshgrid(np.arange(filas), np.arange(columnas), indexing="ij")
+    ii, jj = ii.ravel(), jj.ravel()
+    distancia_borde = np.minimum.reduce([ii, jj, filas-1-ii, columnas-1-jj])
+    ventana_size = np.where(distancia_borde > 1, 2, 1)
+
+    i_min = np.maximum(0, ii - ventana_size)
+    i_max = np.minimum(filas, ii + ventana_size + 1)
+    j_min = np.maximum(0, jj - ventana_size)
+    j_max = np.minimum(columnas, jj + ventana_size + 1)
+    altos = i_max - i_min
+    anchos = j_max - j_min
+    seleccion = np.ones(filas * columnas, dtype=bool) if celdas is None else celdas.ravel()
+
+    # Canales contiguos para que cada ventana extraída también lo sea
+    canales = [np.ascontiguousarray(pix[:, :, c]) for c in range(3)]
+
+    for alto, ancho in set(zip(altos.tolist(), anchos.tolist())):
+        grupo = np.flatnonzero((altos == alto) & (anchos == ancho) & seleccion)
+
+        for inicio in range(0, grupo.size, bloque):
+            lote = grupo[inicio:inicio + bloque]
+            r0, c0 = i_min[lote], j_min[lote]
+            r1, c1 = i_max[lote] - 1, j_max[lote] - 1
+            idx_filas = (r0[:, None] + np.arange(alto))[:, :, None]
+            idx_columnas = (c0[:, None] + np.arange(ancho))[:, None, :]
+
+            # Desviación estándar de cada canal en la ventana
+            std_r = np.std(canales[0][idx_filas, idx_columnas], axis=(1, 2))
+            std_g = np.std(canales[1][idx_filas, idx_columnas], axis=(1, 2))
+            std_b = np.std(canales[2][idx_filas, idx_columnas], axis=(1, 2))
+            std_promedio = (std_r + std_g + std_b) / 3
+
+            # Diferencia con las esquinas de cada ventana
+            esquinas = np.stack([pix[r0, c0], pix[r0, c1], pix[r1, c0], pix[r1, c1]])
+            promedio_esquinas = np.mean(esquinas, axis=0)
+            pixel_actual = pix[ii[lote], jj[lote]]
+            diferencia_esquinas = np.mean(np.abs(pixel_actual - promedio_esquinas), axis=1)
+
+            std_mapa[ii[lote], jj[lote]] = std_promedio
+            diferencia_mapa[ii[lote], jj[lote]] = diferencia_esquinas
+
+    return std_mapa, diferencia_mapa
+
+@registrar_metodo("diferencia_adaptativa", descripcion="Distancia de color al fondo estimado desde el borde")
 def _detectar_por_diferencia_adaptativa(pix, umbral_blanco, sensibilidad):
     """Detecta comparando cada píxel con el fondo blanco esperado"""
+    diferencia = _mapa_diferencia(pix, umbral_blanco)
+    
+    # Umbral adaptativo basado en sensibilidad
+    umbral_diferencia = 30 * sensibilidad
+    
+    return _como_matriz(diferencia > umbral_diferencia)
+
+def _color_fondo(pix, umbral_blanco):
+    """Color de fondo estimado con las esquinas y los puntos medios del borde"""
     filas, columnas = pix.shape[:2]
     
     # Estimar color de fondo desde las esquinas
@@ -108,90 +1154,137 @@ def _detectar_por_diferencia_adaptativa(pix, umbral_blanco, sensibilidad):
     if esquinas_blancas:
         color_fondo = np.mean(esquinas_blancas, axis=0)
     else:
-        color_fondo = np.array([255, 255, 255])  # Asumir blanco puro
-    
-    # Calcular diferencia con el fondo
-    diferencia = np.sqrt(np.sum((pix - color_fondo)**2, axis=2))
-    
-    # Umbral adaptativo basado en sensibilidad
-    umbral_diferencia = 30 * sensibilidad
+        color_fondo = np.array([255.0, 255.0, 255.0])  # Asumir blanco puro
+    return color_fondo
+
+def _mapa_diferencia(pix, umbral_blanco, color_fondo=None):
+    """
+    Distancia de color de cada píxel al fondo estimado desde el borde.
+    Con color_fondo se usa ese color (así `pix` puede ser un recorte de la imagen).
+    """
+    if color_fondo is None:
+        color_fondo = _color_fondo(pix, umbral_blanco)
+    filas, columnas = pix.shape[:2]
     
-    matriz = (diferencia > umbral_diferencia).astype(int)
-    return matriz
+    # Distancia euclídea al fondo, canal por canal sobre dos buffers (filas, columnas)
+    # en lugar de temporales (filas, columnas, 3); mismo orden de suma que np.sum
+    distancia = np.zeros((filas, columnas))
+    canal = np.empty((filas, columnas))
+    for c in range(3):
+        np.subtract(pix[:, :, c], color_fondo[c], out=canal)
+        distancia += np.multiply(canal, canal, out=canal)
+    return np.sqrt(distancia, out=distancia)
 
-def _detectar_por_luminancia_precisa(pix, umbral_blanco, sensibilidad):
+@registrar_metodo("luminancia_precisa", descripcion="Luminancia bajo la del fondo",
+                  intermedios=("luminancia",))
+def _detectar_por_luminancia_precisa(pix, umbral_blanco, sensibilidad, luminancia=None):
     """Detecta usando luminancia con umbral adaptativo"""
     # Calcular luminancia (percepción humana del brillo)
-    luminancia = 0.299 * pix[:, :, 0] + 0.587 * pix[:, :, 1] + 0.114 * pix[:, :, 2]
+    if luminancia is None:
+        luminancia = _luminancia(pix)
     
     # Estimar luminancia del fondo
-    bordes = np.concatenate([
-        luminancia[0, :], luminancia[-1, :], 
-        luminancia[:, 0], luminancia[:, -1]
-    ])
-    luminancia_fondo = np.median(bordes[bordes >= umbral_blanco * 0.9])
+    luminancia_fondo = _luminancia_fondo(luminancia, umbral_blanco)
     
     # Umbral adaptativo
     umbral_luminancia = luminancia_fondo - (50 * sensibilidad)
     
-    matriz = (luminancia < umbral_luminancia).astype(int)
-    return matriz
+    return _como_matriz(luminancia < umbral_luminancia)
+
+def _luminancia_fondo(luminancia, umbral_blanco):
+    """Mediana de la luminancia del borde, solo entre los valores casi blancos"""
+    bordes = np.concatenate([
+        luminancia[0, :], luminancia[-1, :], 
+        luminancia[:, 0], luminancia[:, -1]
+    ])
+    return np.median(bordes[bordes >= umbral_blanco * 0.9])
 
-def _detectar_por_bordes_combinados(pix, umbral_blanco, sensibilidad):
+def _sobel(imagen, axis, relleno=1):
+    """
+    Filtro de Sobel con borde reflejado, igual bit a bit a scipy.ndimage.sobel
+    (mismo orden de operaciones), sin necesidad de importar scipy.
+    • relleno: ancho del borde reflejado por lado, como en np.pad. Con 0 en un lado,
+               la primera fila o columna de ese lado solo se usa como vecina (para
+               un recorte que ya trae sus vecinos; ver _detectar_en_caja)
+    """
+    p = np.pad(imagen, relleno, mode="symmetric")
+    if axis == 1:
+        derivada = p[:, 2:] - p[:, :-2]
+        del p
+        resultado = derivada[:-2] + derivada[2:]
+        centro = derivada[1:-1]
+    else:
+        derivada = p[2:, :] - p[:-2, :]
+        del p
+        resultado = derivada[:, :-2] + derivada[:, 2:]
+        centro = derivada[:, 1:-1]
+    # centro * 2 + vecinos, en el lugar (la suma de dos términos no depende del orden)
+    centro *= 2
+    resultado += centro
+    return resultado
+
+@registrar_metodo("bordes_combinados", descripcion="Bordes de Sobel más píxeles no blancos",
+                  intermedios=("gris", "fondo"))
+def _detectar_por_bordes_combinados(pix, umbral_blanco, sensibilidad, gris=None, fondo=None):
     """Combina detección de bordes con análisis de color"""
-    from scipy import ndimage
-    
     # Convertir a escala de grises
-    gris = np.mean(pix, axis=2)
+    if gris is None:
+        gris = np.mean(pix, axis=2)
     
-    # Detectar bordes con Sobel
-    bordes_x = ndimage.sobel(gris, axis=1)
-    bordes_y = ndimage.sobel(gris, axis=0)
-    bordes = np.sqrt(bordes_x**2 + bordes_y**2)
-    
-    # Normalizar bordes
-    if np.max(bordes) > 0:
-        bordes = bordes / np.max(bordes)
+    bordes, _ = _mapa_bordes(gris)
     
     # Detección básica de no-blancos
-    no_blanco = ~((pix[:, :, 0] >= umbral_blanco) & 
-                  (pix[:, :, 1] >= umbral_blanco) & 
-                  (pix[:, :, 2] >= umbral_blanco))
-    
+    if fondo is None:
+        fondo = _mascara_fondo(pix, umbral_blanco)
     # Combinar bordes y no-blancos
     umbral_borde = 0.1 * sensibilidad
-    matriz = ((bordes > umbral_borde) | no_blanco).astype(int)
+    matriz = bordes > umbral_borde
+    matriz |= ~fondo
+    return _como_matriz(matriz)
+
+@registrar_metodo("basico", descripcion="Píxeles no blancos", intermedios=("fondo",))
+def _detectar_basico(pix, umbral_blanco, sensibilidad, fondo=None):
+    """Método básico: simplemente busca píxeles no blancos (no usa la sensibilidad)"""
+    if fondo is None:
+        fondo = _mascara_fondo(pix, umbral_blanco)
+    return _como_matriz(~fondo)
+
+def _magnitud_bordes(gris, relleno=1):
+    """Magnitud de Sobel sin normalizar (relleno, como en _sobel)"""
+    bordes = _sobel(gris, axis=1, relleno=relleno)
+    bordes_y = _sobel(gris, axis=0, relleno=relleno)
+    # sqrt(x**2 + y**2) en el lugar, sin temporales del tamaño de la imagen
+    bordes *= bordes
+    bordes_y *= bordes_y
+    bordes += bordes_y
+    del bordes_y
+    return np.sqrt(bordes, out=bordes)
+
+def _mapa_bordes(gris):
+    """Magnitud de Sobel normalizada a [0, 1]. Da de regreso: (bordes, máximo usado)"""
+    bordes = _magnitud_bordes(gris)
     
-    return matriz
+    # Normalizar bordes
+    maximo = np.max(bordes)
+    if maximo > 0:
+        bordes /= maximo
+    return bordes, maximo
 
 def mostrar_resultado_simple(matriz: np.ndarray, 
                            titulo: str = "Detección de Figura",
-                           ruta_imagen: str = ""):
-    """Muestra el resultado en terminal y ventana gráfica simple"""
+                           ruta_imagen: str = "",
+                           componentes: list = None):
+    """
+    Muestra el resultado en terminal y ventana gráfica simple
+    • componentes: estadisticas_componentes(matriz) ya calculadas (opcional)
+    """
+    plt = obtener_pyplot()
     
     filas, columnas = matriz.shape
-    
-    # === MOSTRAR EN TERMINAL ===
-    print(f"\n{'='*60}")
-    print(f"{titulo.center(60)}")
-    print(f"{'='*60}")
-    print(f"Imagen: {ruta_imagen.split('/')[-1] if ruta_imagen else 'N/A'}")
-    print(f"Tamaño: {filas}x{columnas}")
-    print(f"Píxeles de figura detectados: {np.sum(matriz)}")
-    print(f"Porcentaje de cobertura: {(np.sum(matriz)/(filas*columnas)*100):.1f}%")
-    print(f"{'='*60}")
-    
-    # === MOSTRAR MATRIZ EN FORMATO TÍPICO ===
-    print("MATRIZ RESULTADO:")
-    for i in range(filas):
-        fila_str = "["
-        for j in range(columnas):
-            if j > 0:
-                fila_str += ", "
-            fila_str += str(matriz[i, j])
-        fila_str += "]"
-        print(fila_str)
-    print(f"{'='*60}")
+    # Etiquetar una sola vez para la terminal y el recuadro de estadísticas
+    if componentes is None:
+        componentes = estadisticas_componentes(matriz)
+    _imprimir_resultado(matriz, titulo, ruta_imagen, componentes)
     
     # === MOSTRAR EN VENTANA GRÁFICA ===
     fig, ax = plt.subplots(figsize=(8, 8))
@@ -229,7 +1322,8 @@ def mostrar_resultado_simple(matriz: np.ndarray,
                 fontsize=12, fontweight="bold", pad=20)
     
     # Estadísticas en el gráfico
-    stats_text = f"Píxeles figura: {np.sum(matriz)}\nCobertura: {(np.sum(matriz)/(filas*columnas)*100):.1f}%"
+    stats_text = f"Píxeles figura: {np.sum(matriz)}\nCobertura: {(np.sum(matriz)/(filas*columnas)*100):.1f}%" \
+                 f"\n{_texto_componentes(componentes)}"
     ax.text(0.02, 0.98, stats_text, transform=ax.transAxes, 
             fontsize=10, verticalalignment='top',
             bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.8))
@@ -237,17 +1331,277 @@ def mostrar_resultado_simple(matriz: np.ndarray,
     plt.tight_layout()
     return fig
 
+def _texto_componentes(componentes):
+    """
+    Línea corta para los recuadros de estadísticas: cantidad de componentes y área del mayor
+    • componentes: resultado de estadisticas_componentes
+    """
+    if not componentes:
+        return "Componentes: 0"
+    return f"Componentes: {len(componentes)} (mayor: {max(c['area'] for c in componentes)})"
+
+def _imprimir_resultado(matriz, titulo, ruta_imagen, componentes=None):
+    """Muestra en terminal el resumen y la matriz en formato típico"""
+    
+    filas, columnas = matriz.shape
+    
+    # === MOSTRAR EN TERMINAL ===
+    print(f"\n{'='*60}")
+    print(f"{titulo.center(60)}")
+    print(f"{'='*60}")
+    print(f"Imagen: {ruta_imagen.split('/')[-1] if ruta_imagen else 'N/A'}")
+    print(f"Tamaño: {filas}x{columnas}")
+    print(f"Píxeles de figura detectados: {np.sum(matriz)}")
+    print(f"Porcentaje de cobertura: {(np.sum(matriz)/(filas*columnas)*100):.1f}%")
+    for linea in resumen_componentes(matriz, componentes=componentes):
+        print(linea)
+    print(f"{'='*60}")
+    
+    # === MOSTRAR MATRIZ EN FORMATO TÍPICO ===
+    # (si no entra en la terminal, una vista reducida en su lugar)
+    print("MATRIZ RESULTADO:")
+    imprimir_matriz(matriz)
+    print(f"{'='*60}")
+
+def renderizar_resultado_raster(matriz: np.ndarray,
+                                titulo: str = "Detección de Figura",
+                                ruta_imagen: str = "",
+                                ruta_salida: str = None,
+                                tamaño_celda: int = None,
+                                mostrar_numeros: bool = None,
+                                componentes: list = None) -> Image.Image:
+    """
+    Dibuja el resultado directamente en un buffer de píxeles, sin figura de matplotlib.
+
+    Mismo contenido que mostrar_resultado_simple (celdas negras/blancas, líneas de
+    cuadrícula, números, título y recuadro de estadísticas), pero cada celda se
+    pinta copiando un bloque precalculado, así que el costo crece con los píxeles
+    de salida y no con la cantidad de artistas.
+
+    Parámetros:
+    • ruta_salida     : si se indica, guarda el PNG ahí
+    • tamaño_celda    : píxeles por celda (por defecto se ajusta a ~1600 px de ancho)
+    • mostrar_numeros : dibujar el valor de cada celda (por defecto, solo si la celda mide 12 px o más)
+    • componentes     : estadisticas_componentes(matriz) ya calculadas (opcional)
+
+    Da de regreso: imagen PIL en modo RGB
+    """
+    filas, columnas = matriz.shape
+    if tamaño_celda is None:
+        tamaño_celda = int(np.clip(1600 // max(filas, columnas), 2, 40))
+    if mostrar_numeros is None:
+        mostrar_numeros = tamaño_celda >= 12
+
+    # Un bloque por valor distinto: relleno, línea de cuadrícula arriba/izquierda y número
+    valores, indices = np.unique(matriz, return_inverse=True)
+    indices = indices.reshape(filas, columnas)
+    gris_linea = np.array([0xCC, 0xCC, 0xCC], dtype=np.uint8)
+    fuente_celda = cargar_fuente(max(6, int(tamaño_celda * 0.6)))
+    bloques = np.empty((len(valores), tamaño_celda, tamaño_celda, 3), dtype=np.uint8)
+    for k, valor in enumerate(valores):
+        relleno, tinta = ((0, 0, 0), (255, 255, 255)) if valor == 1 else ((255, 255, 255), (0, 0, 0))
+        bloque = Image.new("RGB", (tamaño_celda, tamaño_celda), relleno)
+        if mostrar_numeros:
+            ImageDraw.Draw(bloque).text((tamaño_celda / 2, tamaño_celda / 2), str(valor),
+                                        fill=tinta, font=fuente_celda, anchor="mm")
+        bloques[k] = np.asarray(bloque)
+        bloques[k, 0, :] = gris_linea
+        bloques[k, :, 0] = gris_linea
+
+    # Ensamblar la cuadrícula: (filas, columnas, alto, ancho, 3) -> (alto total, ancho total, 3)
+    cuadricula = bloques[indices].transpose(0, 2, 1, 3, 4).reshape(
+        filas * tamaño_celda, columnas * tamaño_celda, 3)
+    cuadricula = np.pad(cuadricula, ((0, 1), (0, 1), (0, 0)), constant_values=0xCC)
+
+    # Encabezado con título y estadísticas
+    imagen_nombre = ruta_imagen.split('/')[-1] if ruta_imagen else "Imagen"
+    total = int(np.sum(matriz))
+    lineas_titulo = [titulo, f"{imagen_nombre} ({filas}x{columnas})"]
+    if componentes is None:
+        componentes = estadisticas_componentes(matriz)
+    stats_text = f"Píxeles figura: {total}\nCobertura: {(total/(filas*columnas)*100):.1f}%" \
+                 f"\n{_texto_componentes(componentes)}"
+
+    fuente_titulo = cargar_fuente(20)
+    fuente_stats = cargar_fuente(14)
+    margen = 20
+    alto_titulo = 26 * len(lineas_titulo)
+    alto_stats = 62
+    alto_encabezado = margen + alto_titulo + 10 + alto_stats + 10
+    ancho = max(cuadricula.shape[1] + 2 * margen, 420)
+    alto = alto_encabezado + cuadricula.shape[0] + margen
+
+    imagen = Image.new("RGB", (ancho, alto), "white")
+    dibujo = ImageDraw.Draw(imagen)
+    for k, linea in enumerate(lineas_titulo):
+        dibujo.text((ancho / 2, margen + 26 * k), linea, fill="black",
+                    font=fuente_titulo, anchor="ma")
+    y_stats = margen + alto_titulo + 10
+    dibujo.rounded_rectangle((margen, y_stats, margen + 240, y_stats + alto_stats),
+                             radius=6, fill="#F5DEB3", outline="#C8B28C")
+    dibujo.multiline_text((margen + 8, y_stats + 6), stats_text, fill="black", font=fuente_stats)
+    x_cuadricula = (ancho - cuadricula.shape[1]) // 2
+    imagen.paste(Image.fromarray(cuadricula), (x_cuadricula, alto_encabezado))
+
+    if ruta_salida:
+        imagen.save(ruta_salida, format="PNG", compress_level=1)
+    return imagen
+
+def png_resultado(matriz: np.ndarray,
+                  titulo: str = "Detección de Figura",
+                  ruta_imagen: str = "",
+                  renderizador: str = "raster",
+                  dpi: int = 100) -> bytes:
+    """
+    PNG del resultado en memoria, sin abrir ventanas ni imprimir la matriz.
+    • renderizador: "raster" (renderizar_resultado_raster) o "matplotlib"
+                    (mostrar_resultado_simple, guardado con `dpi`)
+    Da de regreso: los bytes del PNG
+    """
+    salida = io.BytesIO()
+    if renderizador == "raster":
+        renderizar_resultado_raster(matriz, titulo, ruta_imagen).save(
+            salida, format="PNG", compress_level=1)
+    elif renderizador == "matplotlib":
+        plt = obtener_pyplot()
+        # mostrar_resultado_simple también imprime la matriz
+        with contextlib.redirect_stdout(io.StringIO()):
+            fig = mostrar_resultado_simple(matriz, titulo, ruta_imagen)
+        fig.savefig(salida, format="png", dpi=dpi, bbox_inches='tight')
+        plt.close(fig)
+    else:
+        raise ValueError(f"Renderizador desconocido: {renderizador}. Opciones: matplotlib, raster")
+    return salida.getvalue()
+
+def renderizar_comparacion(matrices: dict,
+                           titulo: str = "Comparación de tamaños",
+                           ruta_imagen: str = "",
+                           ruta_salida: str = None,
+                           ancho_panel: int = 480) -> Image.Image:
+    """
+    Pone lado a lado los resultados de renderizar_resultado_raster, uno por matriz.
+    
+    Parámetros:
+    • matrices    : diccionario {etiqueta: matriz}, p. ej. el de detectar_multiples_tamaños
+    • ancho_panel : ancho aproximado de la cuadrícula de cada panel, en píxeles
+    • ruta_salida : si se indica, guarda el PNG ahí
+    
+    Da de regreso: imagen PIL en modo RGB
+    """
+    paneles = []
+    for etiqueta, matriz in matrices.items():
+        filas, columnas = matriz.shape
+        tamaño_celda = max(2, ancho_panel // max(filas, columnas))
+        paneles.append(renderizar_resultado_raster(matriz, f"Tamaño {filas}x{columnas}", ruta_imagen,
+                                                   tamaño_celda=tamaño_celda))
+    
+    imagen = _montar_paneles(paneles, titulo)
+    if ruta_salida:
+        imagen.save(ruta_salida, format="PNG", compress_level=1)
+    return imagen
+
+def _montar_paneles(paneles: list, titulo: str, notas: list = None, columnas: int = None) -> Image.Image:
+    """
+    Une los paneles en una grilla con un título arriba.
+    • notas    : un texto por panel, que se escribe debajo de él
+    • columnas : paneles por fila (por defecto, todos en una sola fila, uno al lado del otro)
+    """
+    margen = 20
+    alto_titulo = 56
+    alto_nota = 24 if notas else 0
+    columnas = columnas or max(len(paneles), 1)
+    cantidad_filas = -(-len(paneles) // columnas)
+    ancho_celda = max((p.width for p in paneles), default=0)
+    alto_celda = max((p.height for p in paneles), default=0) + alto_nota
+    
+    # Posición de cada panel: en una sola fila, seguidos; en varias, centrados en su casilla
+    posiciones = []
+    x = margen
+    for k, panel in enumerate(paneles):
+        fila, columna = divmod(k, columnas)
+        if cantidad_filas == 1:
+            posiciones.append((x, alto_titulo))
+            x += panel.width + margen
+        else:
+            posiciones.append((margen + columna * (ancho_celda + margen) + (ancho_celda - panel.width) // 2,
+                               alto_titulo + fila * (alto_celda + margen)))
+    
+    if cantidad_filas == 1:
+        ancho = x
+    else:
+        ancho = columnas * (ancho_celda + margen) + margen
+    alto = alto_titulo + cantidad_filas * (alto_celda + margen)
+    imagen = Image.new("RGB", (max(ancho, 420), alto), "white")
+    dibujo = ImageDraw.Draw(imagen)
+    dibujo.text((imagen.width / 2, margen), titulo, fill="black", font=cargar_fuente(22), anchor="ma")
+    fuente_nota = cargar_fuente(15)
+    for k, (panel, (x, y)) in enumerate(zip(paneles, posiciones)):
+        imagen.paste(panel, (x, y))
+        if notas:
+            dibujo.text((x + panel.width / 2, y + panel.height + 2), notas[k],
+                        fill="#404040", font=fuente_nota, anchor="ma")
+    return imagen
+
+def _guardar_y_mostrar(matriz, titulo, ruta_imagen, nombre_archivo, renderizador, headless,
+                       medidor=None):
+    """Renderiza con el renderizador elegido, guarda el PNG y lo muestra si no es headless"""
+    if renderizador == "raster":
+        componentes = estadisticas_componentes(matriz)
+        _imprimir_resultado(matriz, titulo, ruta_imagen, componentes)
+        with etapa(medidor, "render_raster+guardar", forma=matriz.shape):
+            imagen = renderizar_resultado_raster(matriz, titulo, ruta_imagen, ruta_salida=nombre_archivo,
+                                                 componentes=componentes)
+        print(f"Guardado como: {nombre_archivo}")
+        if not headless:
+            plt = obtener_pyplot()
+            fig, ax = plt.subplots(figsize=(8, 8))
+            ax.imshow(imagen)
+            ax.axis("off")
+            plt.show()
+            plt.close(fig)
+    elif renderizador == "matplotlib":
+        plt = obtener_pyplot()
+        with etapa(medidor, "figura_matplotlib", forma=matriz.shape):
+            fig = mostrar_resultado_simple(matriz, titulo, ruta_imagen)
+        with etapa(medidor, "guardar_png", dpi=300):
+            fig.savefig(nombre_archivo, dpi=300, bbox_inches='tight')
+        print(f"Guardado como: {nombre_archivo}")
+        if not headless:
+            plt.show()
+        plt.close(fig)
+    else:
+        raise ValueError(f"Renderizador desconocido: {renderizador}. Opciones: matplotlib, raster")
+
 def procesar_imagen_simple(ruta_imagen: str, 
                           tamaño: int = 15,
                           metodo: str = "contraste_mejorado",
                           sensibilidad: float = 0.8,
                           mostrar_todos_metodos: bool = False,
-                          ruta_guardado: str = None):
+                          ruta_guardado: str = None,
+                          renderizador: str = "matplotlib",
+                          headless: bool = False,
+                          medidor=None,
+                          ruta_matriz: str = None,
+                          montaje: bool = False,
+                          postproceso: dict = None):
     """
     Función principal simplificada para detección de figura.
     
-    Nuevo parámetro:
+    Nuevos parámetros:
     • ruta_guardado: Ruta donde se guardará la imagen resultado. Si es None, se guarda en la carpeta actual.
+    • renderizador : "matplotlib" (aspecto original, un rectángulo y un texto por celda)
+                     o "raster" (dibuja directo en píxeles, mucho más rápido en matrices grandes)
+    • headless     : si es True, solo guarda los resultados: no abre ventanas ni espera Enter
+    • medidor      : instrumentacion.Medidor opcional; registra decodificar, redimensionar,
+                     deteccion, figura y guardado (ver medidor.resumen() al final)
+    • ruta_matriz  : si se indica, guarda también la matriz en formato compacto (.fig,
+                     1 bit por celda), que el coloreador lee directamente
+    • montaje      : con mostrar_todos_metodos, corre los métodos en paralelo y guarda un
+                     solo PNG comparativo con cobertura y tiempo de cada uno (ver
+                     comparar_metodos), sin abrir ventanas ni esperar Enter
+    • postproceso  : limpieza después de detectar, con las opciones de
+                     componentes_figuras.postprocesar; p. ej.
+                     {"area_minima": 3, "rellenar": True, "solo_mayor": True}
     """
     
     print(f"Procesando: {ruta_imagen}")
@@ -255,18 +1609,41 @@ def procesar_imagen_simple(ruta_imagen: str,
     print(f"Método: {metodo}")
     print(f"Sensibilidad: {sensibilidad}")
     
+    if mostrar_todos_metodos and montaje:
+        if ruta_guardado:
+            os.makedirs(os.path.dirname(ruta_guardado), exist_ok=True)
+            carpeta = ruta_guardado if os.path.isdir(ruta_guardado) else os.path.dirname(ruta_guardado)
+        else:
+            carpeta = ""
+        nombre_archivo = os.path.join(carpeta, f"comparacion_metodos_{tamaño}x{tamaño}.png")
+        try:
+            comparacion = comparar_metodos(ruta_imagen, tamaño, sensibilidad=sensibilidad,
+                                           ruta_salida=nombre_archivo, medidor=medidor,
+                                           postproceso=postproceso)
+        except Exception as e:
+            print(f"Error: {e}")
+            return None
+        for metodo_actual in comparacion["matrices"]:
+            print(f"  {metodo_actual:<24} cobertura {comparacion['cobertura'][metodo_actual]:5.1f}%"
+                  f"   {comparacion['tiempos'][metodo_actual] * 1000:8.2f} ms")
+        print(f"Comparación guardada como: {nombre_archivo}")
+        return comparacion["matrices"]
+    
     if mostrar_todos_metodos:
-        metodos = ["contraste_mejorado", "diferencia_adaptativa", 
-                  "luminancia_precisa", "bordes_combinados"]
+        # Decodificar una sola vez y compartir intermedios entre métodos
+        try:
+            matrices = detectar_todos_metodos(ruta_imagen, tamaño, sensibilidad=sensibilidad,
+                                              medidor=medidor)
+            if postproceso:
+                with etapa(medidor, "postproceso", **postproceso):
+                    matrices = {m: postprocesar(v, **postproceso) for m, v in matrices.items()}
+        except Exception as e:
+            print(f"Error: {e}")
+            return None
         
-        for metodo_actual in metodos:
+        for metodo_actual, matriz in matrices.items():
             try:
                 print(f"\n🔍 Probando método: {metodo_actual}")
-                matriz = detectar_figura_optimizado(ruta_imagen, tamaño, 
-                                                  metodo_actual, sensibilidad=sensibilidad)
-                fig = mostrar_resultado_simple(matriz, 
-                                             f"Método: {metodo_actual}", 
-                                             ruta_imagen)
                 
                 # Guardar con ruta personalizada
                 if ruta_guardado:
@@ -276,21 +1653,21 @@ def procesar_imagen_simple(ruta_imagen: str,
                 else:
                     nombre_archivo = f"deteccion_{metodo_actual}_{tamaño}x{tamaño}.png"
                 
-                fig.savefig(nombre_archivo, dpi=300, bbox_inches='tight')
-                print(f"Guardado como: {nombre_archivo}")
-                
-                plt.show()
+                _guardar_y_mostrar(matriz, f"Método: {metodo_actual}", ruta_imagen,
+                                   nombre_archivo, renderizador, headless, medidor)
                 
-                input("Presiona Enter para el siguiente método...")
-                plt.close(fig)
+                if not headless:
+                    input("Presiona Enter para el siguiente método...")
                 
             except Exception as e:
                 print(f"Error con {metodo_actual}: {e}")
     else:
         try:
             matriz = detectar_figura_optimizado(ruta_imagen, tamaño, metodo, 
-                                              sensibilidad=sensibilidad)
-            fig = mostrar_resultado_simple(matriz, f"Detección - {metodo}", ruta_imagen)
+                                              sensibilidad=sensibilidad, medidor=medidor)
+            if postproceso:
+                with etapa(medidor, "postproceso", **postproceso):
+                    matriz = postprocesar(matriz, **postproceso)
             
             # Guardar resultado con ruta personalizada
             if ruta_guardado:
@@ -310,10 +1687,11 @@ def procesar_imagen_simple(ruta_imagen: str,
                 # Guardar en la carpeta actual
                 nombre_archivo = f"deteccion_{metodo}_{tamaño}x{tamaño}.png"
             
-            fig.savefig(nombre_archivo, dpi=300, bbox_inches='tight')
-            print(f"Guardado como: {nombre_archivo}")
-            
-            plt.show()
+            _guardar_y_mostrar(matriz, f"Detección - {metodo}", ruta_imagen,
+                               nombre_archivo, renderizador, headless, medidor)
+            if ruta_matriz:
+                escribir_matriz(ruta_matriz, matriz)
+                print(f"Matriz guardada como: {ruta_matriz}")
             return matriz
             
         except Exception as e:
@@ -347,7 +1725,8 @@ if __name__ == "__main__":
         tamaño=20,  # Cambiar aquí el tamaño (rango máximo sugerido 15 - 25)
         metodo="contraste_mejorado",  # El que mejor funciona según tú
         sensibilidad=0.4,  # Ajustar entre 0.1 (menos estricto) y 1.0 (más estricto)
-        ruta_guardado=ruta_guardado  # Establecer dónde guardar la imagen
+        ruta_guardado=ruta_guardado,  # Establecer dónde guardar la imagen
+        renderizador="matplotlib"  # "raster" para matrices grandes (dibuja mucho más rápido)
     )
     
     # Opción 2: Probar todos los métodos para comparar
@@ -355,4 +1734,6 @@ if __name__ == "__main__":
     
     # print("\n¿Quieres probar todos los métodos? (y/n)")
     # if input().lower() == 'y':
-    #     procesar_imagen_simple(ruta_imagen, 15, mostrar_todos_metodos=True, ruta_guardado=ruta_guardado)
\ No newline at end of file
+    #     procesar_imagen_simple(ruta_imagen, 15, mostrar_todos_metodos=True, ruta_guardado=ruta_guardado)
+    #     # o, en una sola imagen y sin pausas entre métodos:
+    #     procesar_imagen_simple(ruta_imagen, 15, mostrar_todos_metodos=True, montaje=True, ruta_guardado=ruta_guardado)
\ No newline at end of file
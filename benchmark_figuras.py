@@ -0,0 +1,218 @@
+"""
+Benchmarks reproducibles (sin conexión) de detección y renderizado.
+
+Genera imágenes sintéticas (figuras sobre fondo casi blanco, con ruido) en
+varias resoluciones y mide:
+• detectar_figura_optimizado para cada método, tamaño y sensibilidad
+• mostrar_resultado_simple (figura + savefig a 300 dpi) y el renderizador raster
+• MatrizAImagen.convertir_matriz en modo matplotlib y raster
+
+Los resultados se guardan en JSON; con --comparar se contrastan con una corrida
+anterior y se marcan las regresiones. Con --etapas cada caso de detección se
+corre una vez más con un instrumentacion.Medidor y se guardan sus tiempos por
+etapa; --memoria agrega la memoria pico (tracemalloc) en esa corrida aparte,
+así las medianas no se ven afectadas.
+
+Ejemplos:
+    python benchmark_figuras.py --salida base.json
+    python benchmark_figuras.py --salida nuevo.json --comparar base.json
+    python benchmark_figuras.py --corto
+    python benchmark_figuras.py --corto --etapas --memoria
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import numpy as np
+import PIL
+from PIL import Image, ImageDraw, ImageFilter
+
+import coloreado_figuras
+import detector_figuras
+from instrumentacion import Medidor
+
+RESOLUCIONES = [(640, 480), (1920, 1080), (4000, 3000)]
+TAMAÑOS = [15, 25, 50, 100]
+SENSIBILIDADES = [0.4, 0.8]
+TAMAÑOS_RENDER_MATPLOTLIB = [15, 25, 50]
+TAMAÑOS_RENDER_RASTER = [15, 50, 200, 500]
+
+
+def generar_imagen(ancho: int, alto: int, semilla: int = 0) -> Image.Image:
+    """Figuras de colores sobre fondo casi blanco, con ruido gaussiano y leve desenfoque"""
+    rng = np.random.default_rng(semilla)
+    img = Image.new("RGB", (ancho, alto), (248, 248, 246))
+    dibujo = ImageDraw.Draw(img)
+    for _ in range(5):
+        x0, y0 = rng.integers(0, int(ancho * 0.7)), rng.integers(0, int(alto * 0.7))
+        x1 = x0 + rng.integers(ancho // 10, ancho // 3)
+        y1 = y0 + rng.integers(alto // 10, alto // 3)
+        color = tuple(int(c) for c in rng.integers(0, 220, 3))
+        if rng.random() < 0.5:
+            dibujo.ellipse([x0, y0, x1, y1], fill=color)
+        else:
+            dibujo.rectangle([x0, y0, x1, y1], fill=color)
+    ruido = rng.normal(0, 5, (alto, ancho, 3))
+    pix = np.clip(np.asarray(img, dtype=np.float32) + ruido, 0, 255).astype(np.uint8)
+    return Image.fromarray(pix).filter(ImageFilter.GaussianBlur(1))
+
+
+def _medir(funcion, repeticiones: int) -> dict:
+    """Mediana y mínimo de varias ejecuciones (tras una de calentamiento)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        funcion()
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - inicio)
+    return {"mediana_s": float(np.median(tiempos)), "min_s": float(np.min(tiempos)),
+            "repeticiones": repeticiones}
+
+
+def _medir_etapas(funcion, memoria: bool) -> dict:
+    """Una ejecución más con un Medidor: resumen por etapa (ver Medidor.resumen)"""
+    medidor = Medidor(memoria=memoria)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            funcion(medidor)
+        return medidor.resumen()
+    finally:
+        medidor.cerrar()
+
+
+def ejecutar(corto: bool = False, repeticiones: int = 3, etapas: bool = False,
+             memoria: bool = False) -> dict:
+    """
+    Corre todos los casos y devuelve {"entorno": ..., "casos": {nombre: medición}}.
+    Con etapas (o memoria), cada caso de detección trae además "etapas": el resumen
+    de un Medidor, con la memoria pico por etapa si memoria=True.
+    """
+    resoluciones = RESOLUCIONES[:1] if corto else RESOLUCIONES
+    tamaños = TAMAÑOS[:2] if corto else TAMAÑOS
+    tamaños_mpl = TAMAÑOS_RENDER_MATPLOTLIB[:1] if corto else TAMAÑOS_RENDER_MATPLOTLIB
+    tamaños_raster = TAMAÑOS_RENDER_RASTER[:2] if corto else TAMAÑOS_RENDER_RASTER
+    casos = {}
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        # === DETECCIÓN ===
+        for ancho, alto in resoluciones:
+            ruta = os.path.join(carpeta, f"sintetica_{ancho}x{alto}.jpg")
+            generar_imagen(ancho, alto).save(ruta, quality=92)
+            for metodo in detector_figuras.METODOS_POR_DEFECTO:
+                for tamaño in tamaños:
+                    for sensibilidad in SENSIBILIDADES:
+                        nombre = f"detectar/{metodo}/{ancho}x{alto}/t{tamaño}/s{sensibilidad}"
+                        detectar = lambda medidor=None: detector_figuras.detectar_figura_optimizado(
+                            ruta, tamaño, metodo, sensibilidad=sensibilidad, medidor=medidor)
+                        casos[nombre] = _medir(detectar, repeticiones)
+                        if etapas or memoria:
+                            casos[nombre]["etapas"] = _medir_etapas(detectar, memoria)
+
+        # === RENDERIZADO DEL DETECTOR ===
+        import matplotlib.pyplot as plt
+        rng = np.random.default_rng(1)
+        ruta_png = os.path.join(carpeta, "salida.png")
+
+        def mostrar_y_guardar(matriz):
+            fig = detector_figuras.mostrar_resultado_simple(matriz, "Benchmark", "sintetica.jpg")
+            fig.savefig(ruta_png, dpi=300, bbox_inches='tight')
+            plt.close(fig)
+
+        for tamaño in tamaños_mpl:
+            matriz = (rng.random((tamaño, tamaño)) < 0.4).astype(int)
+            casos[f"mostrar_resultado_simple/t{tamaño}"] = _medir(
+                lambda: mostrar_y_guardar(matriz), max(1, repeticiones // 2))
+        for tamaño in tamaños_raster:
+            matriz = (rng.random((tamaño, tamaño)) < 0.4).astype(int)
+            casos[f"renderizar_resultado_raster/t{tamaño}"] = _medir(
+                lambda: detector_figuras.renderizar_resultado_raster(
+                    matriz, "Benchmark", "sintetica.jpg", ruta_salida=ruta_png),
+                repeticiones)
+
+        # === COLOREADO ===
+        conversor = coloreado_figuras.MatrizAImagen()
+
+        def convertir(matriz, modo):
+            resultado = conversor.convertir_matriz(matriz, paleta="basicos", tamaño_pixel=20,
+                                                   guardar_como=ruta_png, mostrar_imagen=False,
+                                                   modo=modo)
+            if modo == "matplotlib":
+                plt.close(resultado[0])
+
+        for tamaño in tamaños_mpl:
+            matriz = rng.integers(0, 10, (tamaño, tamaño))
+            casos[f"convertir_matriz/matplotlib/t{tamaño}"] = _medir(
+                lambda: convertir(matriz, "matplotlib"), max(1, repeticiones // 2))
+        for tamaño in tamaños_raster:
+            matriz = rng.integers(0, 10, (tamaño, tamaño))
+            casos[f"convertir_matriz/raster/t{tamaño}"] = _medir(
+                lambda: convertir(matriz, "raster"), repeticiones)
+
+    entorno = {"python": platform.python_version(), "numpy": np.__version__,
+               "pillow": PIL.__version__, "plataforma": platform.platform(),
+               "procesador": platform.processor(), "corto": corto, "memoria": memoria}
+    return {"entorno": entorno, "casos": casos}
+
+
+def comparar(actual: dict, base: dict, tolerancia: float = 0.2) -> list:
+    """
+    Compara medianas caso por caso.
+    Da de regreso: lista de (caso, segundos_base, segundos_actual, cambio) de las
+    regresiones, es decir, casos más lentos que la base por más de `tolerancia`.
+    """
+    regresiones = []
+    for nombre, medicion in actual["casos"].items():
+        if nombre not in base["casos"]:
+            continue
+        antes = base["casos"][nombre]["mediana_s"]
+        ahora = medicion["mediana_s"]
+        if antes > 0 and (ahora - antes) / antes > tolerancia:
+            regresiones.append((nombre, antes, ahora, (ahora - antes) / antes))
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de detección y renderizado")
+    parser.add_argument("--salida", default="benchmark.json", help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para detectar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.2,
+                        help="Cambio relativo a partir del cual se marca una regresión (0.2 = 20%%)")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--corto", action="store_true", help="Solo los casos más pequeños")
+    parser.add_argument("--etapas", action="store_true",
+                        help="Guardar también los tiempos por etapa de cada detección")
+    parser.add_argument("--memoria", action="store_true",
+                        help="Medir también la memoria pico por etapa con tracemalloc (implica --etapas)")
+    args = parser.parse_args(argv)
+
+    resultado = ejecutar(args.corto, args.repeticiones, args.etapas, args.memoria)
+    with open(args.salida, "w", encoding="utf-8") as archivo:
+        json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+
+    for nombre, medicion in resultado["casos"].items():
+        print(f"{nombre:<60} {medicion['mediana_s'] * 1000:10.2f} ms")
+    print(f"Resultados guardados en: {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            base = json.load(archivo)
+        regresiones = comparar(resultado, base, args.tolerancia)
+        for nombre, antes, ahora, cambio in regresiones:
+            print(f"REGRESIÓN {nombre}: {antes * 1000:.2f} ms -> {ahora * 1000:.2f} ms (+{cambio:.0%})")
+        if regresiones:
+            return 1
+        print("Sin regresiones.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
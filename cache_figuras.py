@@ -0,0 +1,428 @@
+"""
+Caché en disco de resultados de detección y de PNG renderizados.
+
+La clave de cada entrada es un hash del contenido de la imagen (no de su ruta)
+más los parámetros que afectan el resultado, así una imagen copiada o renombrada
+también acierta, y una imagen editada no devuelve un resultado viejo.
+
+Todo se guarda en un único archivo SQLite (indice.sqlite en la carpeta de la
+caché), que se puede usar a la vez desde varios procesos: lote_figuras con
+varios workers, el servicio o varias terminales.
+
+Uso:
+    cache = CacheFiguras()                       # ~/.cache/figuras, hasta 512 MB
+    matriz = cache.detectar("gato.jpg", 20, "contraste_mejorado")
+    png = cache.png_deteccion("gato.jpg", 20, renderizador="raster")
+    print(cache.estadisticas())
+
+Los aciertos no escriben en la base al momento: la hora de uso (para el
+desalojo) y los contadores se acumulan en memoria y se escriben juntos al
+guardar una entrada, cada MAX_PENDIENTES consultas o SEGUNDOS_PENDIENTES
+segundos, en estadisticas(), en cerrar() y al terminar el proceso.
+
+Para saltarse la caché: usar_cache=False en cada llamada, CacheFiguras(activa=False)
+o la variable de entorno FIGURAS_SIN_CACHE=1.
+"""
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing.util
+import os
+import sqlite3
+import tempfile
+import time
+import weakref
+from collections import Counter
+
+import numpy as np
+
+# Cambiar al modificar un algoritmo de detección o de renderizado: las entradas
+# anteriores dejan de coincidir y se desalojan con el tiempo
+VERSION_CACHE = 2
+
+CARPETA_POR_DEFECTO = os.path.join(os.path.expanduser("~"), ".cache", "figuras")
+
+# Consultas o segundos que se acumulan en memoria antes de escribirlas en la base
+MAX_PENDIENTES = 64
+SEGUNDOS_PENDIENTES = 2.0
+
+
+def hash_bytes(datos: bytes) -> str:
+    return hashlib.blake2b(datos, digest_size=20).hexdigest()
+
+
+def hash_archivo(ruta: str) -> str:
+    """Hash del contenido del archivo, leído por bloques"""
+    resumen = hashlib.blake2b(digest_size=20)
+    with open(ruta, "rb") as archivo:
+        for bloque in iter(lambda: archivo.read(1 << 20), b""):
+            resumen.update(bloque)
+    return resumen.hexdigest()
+
+
+def hash_matriz(matriz: np.ndarray) -> str:
+    """Hash de forma, tipo y contenido de una matriz"""
+    matriz = np.ascontiguousarray(matriz)
+    encabezado = f"{matriz.shape}{matriz.dtype.str}".encode()
+    return hash_bytes(encabezado + matriz.tobytes())
+
+
+def escribir_atomico(ruta: str, datos: bytes):
+    """Escribe en un temporal de la misma carpeta y lo renombra (nunca deja archivos a medias)"""
+    carpeta = os.path.dirname(os.path.abspath(ruta))
+    os.makedirs(carpeta, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=carpeta, prefix=".tmp_")
+    try:
+        with os.fdopen(descriptor, "wb") as archivo:
+            archivo.write(datos)
+        os.replace(temporal, ruta)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(temporal)
+        raise
+
+
+def _matriz_a_bytes(matriz: np.ndarray) -> bytes:
+    salida = io.BytesIO()
+    np.save(salida, matriz, allow_pickle=False)
+    return salida.getvalue()
+
+
+def _bytes_a_matriz(datos: bytes) -> np.ndarray:
+    return np.load(io.BytesIO(datos), allow_pickle=False)
+
+
+def _volcar_al_salir(referencia):
+    cache = referencia()
+    if cache is not None and cache._pid == os.getpid():
+        with contextlib.suppress(sqlite3.Error):
+            cache.volcar()
+
+
+class CacheFiguras:
+    def __init__(self, carpeta: str = None, max_mb: float = 512, activa: bool = True):
+        """
+        Caché en disco con desalojo LRU por tamaño total.
+
+        Parámetros:
+        • carpeta : dónde guardar la caché (por defecto FIGURAS_CACHE o ~/.cache/figuras)
+        • max_mb  : tamaño máximo de los datos guardados; al pasarlo se borran las
+                    entradas usadas hace más tiempo
+        • activa  : False para no leer ni escribir nada (igual que FIGURAS_SIN_CACHE=1)
+        """
+        self.carpeta = carpeta or os.environ.get("FIGURAS_CACHE") or CARPETA_POR_DEFECTO
+        self.max_bytes = int(max_mb * 2**20)
+        self.activa = activa and os.environ.get("FIGURAS_SIN_CACHE", "") in ("", "0")
+        self.aciertos = 0
+        self.fallos = 0
+        self._conexion = None
+        self._pid = None
+        self._usos_pendientes = {}
+        self._contadores_pendientes = Counter()
+        self._ultimo_volcado = time.monotonic()
+
+    # === ALMACENAMIENTO ===
+    def _conectar(self) -> sqlite3.Connection:
+        """Una conexión por proceso (las conexiones SQLite no se comparten tras un fork)"""
+        if self._conexion is None or self._pid != os.getpid():
+            if self._pid != os.getpid():
+                # Tras un fork, lo pendiente lo escribe el proceso padre
+                self._usos_pendientes.clear()
+                self._contadores_pendientes.clear()
+                # Lo de este proceso se escribe también al terminar, incluidos los workers
+                # de multiprocessing (que no corren atexit); la referencia débil no
+                # retiene la caché
+                multiprocessing.util.Finalize(None, _volcar_al_salir, args=(weakref.ref(self),),
+                                              exitpriority=10)
+            os.makedirs(self.carpeta, exist_ok=True)
+            conexion = sqlite3.connect(os.path.join(self.carpeta, "indice.sqlite"),
+                                       timeout=60, isolation_level=None)
+            # Al crear la base, varios procesos pueden llegar a la vez: cambiar el modo
+            # de diario no respeta la espera de SQLite, así que se reintenta
+            for intento in range(200):
+                try:
+                    conexion.execute("PRAGMA journal_mode=WAL")
+                    break
+                except sqlite3.OperationalError as e:
+                    if "locked" not in str(e) or intento == 199:
+                        raise
+                    time.sleep(0.05)
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            with self._transaccion(conexion):
+                conexion.execute("""CREATE TABLE IF NOT EXISTS entradas (
+                                        clave TEXT PRIMARY KEY, imagen TEXT, tipo TEXT,
+                                        datos BLOB, bytes INTEGER, ultimo_uso REAL)""")
+                conexion.execute("CREATE INDEX IF NOT EXISTS por_uso ON entradas(ultimo_uso)")
+                conexion.execute("CREATE INDEX IF NOT EXISTS por_imagen ON entradas(imagen)")
+                conexion.execute("""CREATE TABLE IF NOT EXISTS contadores (
+                                        nombre TEXT PRIMARY KEY, valor INTEGER)""")
+            self._conexion, self._pid = conexion, os.getpid()
+        return self._conexion
+
+    @staticmethod
+    def clave(imagen: str, tipo: str, **parametros) -> str:
+        """Clave de una entrada: hash de la fuente + tipo de resultado + parámetros"""
+        texto = json.dumps({"v": VERSION_CACHE, "imagen": imagen, "tipo": tipo, **parametros},
+                           sort_keys=True, ensure_ascii=False)
+        return hash_bytes(texto.encode("utf-8"))
+
+    def obtener(self, clave: str):
+        """Da de regreso: los bytes guardados, o None si no están"""
+        conexion = self._conectar()
+        fila = conexion.execute("SELECT datos FROM entradas WHERE clave = ?", (clave,)).fetchone()
+        if fila is None:
+            self.fallos += 1
+            self._anotar("fallos")
+            return None
+        self.aciertos += 1
+        self._usos_pendientes[clave] = time.time()
+        self._anotar("aciertos")
+        return fila[0]
+
+    def _anotar(self, contador: str):
+        """Suma una consulta en memoria y escribe lo pendiente si ya se acumuló bastante"""
+        self._contadores_pendientes[contador] += 1
+        if (sum(self._contadores_pendientes.values()) >= MAX_PENDIENTES
+                or time.monotonic() - self._ultimo_volcado >= SEGUNDOS_PENDIENTES):
+            self.volcar()
+
+    def volcar(self):
+        """Escribe en la base las horas de uso y los contadores pendientes"""
+        if not self._contadores_pendientes:
+            return
+        conexion = self._conectar()
+        with self._transaccion(conexion):
+            self._escribir_pendientes(conexion)
+
+    def _escribir_pendientes(self, conexion):
+        # MAX: otro proceso pudo haber anotado un uso más reciente
+        conexion.executemany("UPDATE entradas SET ultimo_uso = MAX(ultimo_uso, ?) WHERE clave = ?",
+                             [(uso, clave) for clave, uso in self._usos_pendientes.items()])
+        for nombre, cantidad in self._contadores_pendientes.items():
+            self._sumar_contador(nombre, cantidad, conexion)
+        self._usos_pendientes.clear()
+        self._contadores_pendientes.clear()
+        self._ultimo_volcado = time.monotonic()
+
+    def guardar(self, clave: str, datos: bytes, imagen: str = None, tipo: str = None):
+        """Guarda (o reemplaza) una entrada y desaloja las menos usadas si se pasa del máximo"""
+        if len(datos) > self.max_bytes:
+            return
+        conexion = self._conectar()
+        with self._transaccion(conexion):
+            conexion.execute("INSERT OR REPLACE INTO entradas VALUES (?, ?, ?, ?, ?, ?)",
+                             (clave, imagen, tipo, sqlite3.Binary(datos), len(datos), time.time()))
+            # Antes de desalojar, para que los aciertos recientes cuenten como uso
+            self._escribir_pendientes(conexion)
+            self._desalojar(conexion)
+
+    def _desalojar(self, conexion):
+        """Borra las entradas usadas hace más tiempo hasta volver por debajo del máximo"""
+        total = conexion.execute("SELECT COALESCE(SUM(bytes), 0) FROM entradas").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        sobrante = total - self.max_bytes
+        borrar = []
+        for clave, tamaño in conexion.execute(
+                "SELECT clave, bytes FROM entradas ORDER BY ultimo_uso ASC"):
+            if sobrante <= 0:
+                break
+            borrar.append((clave,))
+            sobrante -= tamaño
+        conexion.executemany("DELETE FROM entradas WHERE clave = ?", borrar)
+        self._sumar_contador("desalojos", len(borrar), conexion)
+
+    @contextlib.contextmanager
+    def _transaccion(self, conexion):
+        # IMMEDIATE toma el bloqueo de escritura al empezar: dos procesos no se pisan
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            conexion.execute("ROLLBACK")
+            raise
+        conexion.execute("COMMIT")
+
+    def _sumar_contador(self, nombre: str, cantidad: int = 1, conexion=None):
+        (conexion or self._conectar()).execute(
+            "INSERT INTO contadores VALUES (?, ?) "
+            "ON CONFLICT(nombre) DO UPDATE SET valor = valor + excluded.valor", (nombre, cantidad))
+
+    def invalidar(self, imagen=None) -> int:
+        """
+        Borra las entradas de una imagen (ruta o bytes), o todas si imagen es None.
+        Da de regreso: cantidad de entradas borradas
+        """
+        conexion = self._conectar()
+        with self._transaccion(conexion):
+            if imagen is None:
+                cursor = conexion.execute("DELETE FROM entradas")
+            else:
+                huella = hash_bytes(imagen) if isinstance(imagen, bytes) else hash_archivo(imagen)
+                cursor = conexion.execute("DELETE FROM entradas WHERE imagen = ?", (huella,))
+        return cursor.rowcount
+
+    def estadisticas(self) -> dict:
+        """
+        Aciertos y fallos de este proceso, totales históricos, entradas y bytes ocupados.
+        Con la caché desactivada no abre la base (ni crea la carpeta): todo en 0.
+        """
+        entradas = ocupados = 0
+        historicos = {}
+        if self.activa:
+            self.volcar()
+            conexion = self._conectar()
+            entradas, ocupados = conexion.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM entradas").fetchone()
+            historicos = dict(conexion.execute("SELECT nombre, valor FROM contadores").fetchall())
+        consultas = self.aciertos + self.fallos
+        return {"carpeta": self.carpeta, "activa": self.activa,
+                "aciertos": self.aciertos, "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else None,
+                "aciertos_totales": historicos.get("aciertos", 0),
+                "fallos_totales": historicos.get("fallos", 0),
+                "desalojos_totales": historicos.get("desalojos", 0),
+                "entradas": entradas, "bytes": ocupados, "max_bytes": self.max_bytes}
+
+    def cerrar(self):
+        if self._conexion is not None and self._pid == os.getpid():
+            self.volcar()
+            self._conexion.close()
+        self._conexion = None
+
+    def __getstate__(self):
+        # Para enviarla a procesos del pool: cada proceso abre su propia conexión
+        estado = self.__dict__.copy()
+        estado["_conexion"] = None
+        estado["_pid"] = None
+        estado["_usos_pendientes"] = {}
+        estado["_contadores_pendientes"] = Counter()
+        return estado
+
+    # === RESULTADOS ===
+    def _huella(self, fuente) -> str:
+        return hash_bytes(fuente) if isinstance(fuente, bytes) else hash_archivo(fuente)
+
+    def detectar(self, ruta_imagen,
+                 tamaño: int = 15,
+                 metodo: str = "contraste_mejorado",
+                 umbral_blanco: int = 240,
+                 sensibilidad: float = 0.8,
+                 rapido: bool = False,
+                 usar_cache: bool = True) -> np.ndarray:
+        """
+        detectar_figura_optimizado con caché.
+        • ruta_imagen: ruta del archivo o sus bytes
+        • usar_cache : False para calcular sin leer ni escribir la caché
+        """
+        import detector_figuras
+        fuente = io.BytesIO(ruta_imagen) if isinstance(ruta_imagen, bytes) else ruta_imagen
+        if not (usar_cache and self.activa):
+            return detector_figuras.detectar_figura_optimizado(
+                fuente, tamaño, metodo, umbral_blanco=umbral_blanco,
+                sensibilidad=sensibilidad, rapido=rapido)
+
+        huella = self._huella(ruta_imagen)
+        clave = self.clave(huella, "matriz", tamaño=tamaño, metodo=metodo,
+                           umbral_blanco=umbral_blanco, sensibilidad=sensibilidad, rapido=rapido)
+        datos = self.obtener(clave)
+        if datos is not None:
+            return _bytes_a_matriz(datos)
+        matriz = detector_figuras.detectar_figura_optimizado(
+            fuente, tamaño, metodo, umbral_blanco=umbral_blanco,
+            sensibilidad=sensibilidad, rapido=rapido)
+        self.guardar(clave, _matriz_a_bytes(matriz), huella, "matriz")
+        return matriz
+
+    def png_deteccion(self, ruta_imagen,
+                      tamaño: int = 15,
+                      metodo: str = "contraste_mejorado",
+                      umbral_blanco: int = 240,
+                      sensibilidad: float = 0.8,
+                      rapido: bool = False,
+                      renderizador: str = "matplotlib",
+                      guardar_como: str = None,
+                      usar_cache: bool = True) -> bytes:
+        """
+        PNG del resultado de png_resultado del detector (mostrar_resultado_simple a
+        300 dpi, como lo guarda procesar_imagen_simple, o renderizar_resultado_raster).
+        Si se indica guardar_como, además se escribe ahí.
+        Da de regreso: bytes del PNG
+        """
+        import detector_figuras
+        usar = usar_cache and self.activa
+        titulo = f"Detección - {metodo}"
+        nombre = ruta_imagen if isinstance(ruta_imagen, str) else ""
+        clave = huella = None
+        datos = None
+        if usar:
+            huella = self._huella(ruta_imagen)
+            clave = self.clave(huella, "png_deteccion", tamaño=tamaño, metodo=metodo,
+                               umbral_blanco=umbral_blanco, sensibilidad=sensibilidad,
+                               rapido=rapido, renderizador=renderizador, titulo=titulo,
+                               nombre=os.path.basename(nombre))
+            datos = self.obtener(clave)
+
+        if datos is None:
+            matriz = self.detectar(ruta_imagen, tamaño, metodo, umbral_blanco, sensibilidad,
+                                   rapido, usar_cache)
+            datos = detector_figuras.png_resultado(matriz, titulo, nombre, renderizador, dpi=300)
+            if usar:
+                self.guardar(clave, datos, huella, "png_deteccion")
+
+        if guardar_como:
+            escribir_atomico(guardar_como, datos)
+        return datos
+
+    def png_coloreado(self, matriz,
+                      paleta: str = "basicos",
+                      tamaño_pixel: int = 50,
+                      mostrar_numeros: bool = True,
+                      modo: str = "matplotlib",
+                      conversor=None,
+                      guardar_como: str = None,
+                      usar_cache: bool = True) -> bytes:
+        """
+        PNG de MatrizAImagen.convertir_matriz para una matriz (o texto/ruta que acepte
+        cargar_matriz). La clave incluye los colores de la paleta, así editar una
+        paleta no devuelve imágenes viejas.
+        Da de regreso: bytes del PNG (ValueError si convertir_matriz no pudo generarlo)
+        """
+        import coloreado_figuras
+        conversor = conversor or coloreado_figuras.MatrizAImagen()
+        matriz = conversor.cargar_matriz(matriz)
+        usar = usar_cache and self.activa
+        clave = huella = None
+        datos = None
+        if usar:
+            huella = hash_matriz(matriz)
+            colores = conversor.paletas.get(paleta, conversor.paletas["basicos"])
+            clave = self.clave(huella, "png_coloreado", paleta=paleta, colores=colores,
+                               tamaño_pixel=tamaño_pixel, mostrar_numeros=mostrar_numeros, modo=modo)
+            datos = self.obtener(clave)
+
+        if datos is None:
+            descriptor, temporal = tempfile.mkstemp(suffix=".png")
+            os.close(descriptor)
+            try:
+                resultado = conversor.convertir_matriz(matriz, paleta, tamaño_pixel, mostrar_numeros,
+                                                       guardar_como=temporal, mostrar_imagen=False,
+                                                       modo=modo)
+                if resultado is not None and modo != "raster":
+                    from graficos import obtener_pyplot
+                    obtener_pyplot().close(resultado[0])
+                with open(temporal, "rb") as archivo:
+                    datos = archivo.read()
+            finally:
+                os.remove(temporal)
+            # convertir_matriz informa los errores al guardar sin lanzarlos: un PNG
+            # vacío no se guarda en la caché, o se devolvería en cada acierto
+            if not datos:
+                raise ValueError("No se pudo generar el PNG coloreado")
+            if usar:
+                self.guardar(clave, datos, huella, "png_coloreado")
+
+        if guardar_como:
+            escribir_atomico(guardar_como, datos)
+        return datos
@@ -0,0 +1,15 @@
+"""
+Alias importable de 'Coloreado de figuras - Elaborado.py'.
+
+Igual que detector_figuras: ejecuta el script dentro de este módulo para poder
+hacer `import coloreado_figuras` (el bloque `if __name__ == "__main__"` no corre).
+"""
+import os
+
+_RUTA_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "Coloreado de figuras - Elaborado.py")
+
+with open(_RUTA_SCRIPT, encoding="utf-8") as _archivo:
+    exec(compile(_archivo.read(), _RUTA_SCRIPT, "exec"), globals())
+
+del _archivo
@@ -0,0 +1,238 @@
+"""
+Componentes conexos de las matrices de detección: etiquetado, limpieza y estadísticas.
+
+Todo funciona igual con una matriz (filas, columnas) que con una pila
+(n, filas, columnas), como la de detectar_secuencia_pila; en una pila cada
+matriz se trata por separado. Las celdas distintas de 0 son figura.
+
+• etiquetar              : número de componente de cada celda
+• estadisticas_componentes: área, caja y centroide de cada componente
+• quitar_manchas         : borra componentes de menos de area_minima celdas
+• rellenar_huecos        : pinta el fondo encerrado por la figura
+• conservar_mayor        : deja solo el componente más grande
+• postprocesar           : las tres anteriores en orden, según los parámetros
+
+El etiquetado es lineal: recorre la matriz por tramos horizontales de figura,
+une los tramos que se tocan con la fila anterior (union-find) y numera los
+componentes en orden de lectura. La unión usa el núcleo compilado de
+nucleos_figuras si Numba está instalado.
+"""
+import numpy as np
+
+import nucleos_figuras
+
+
+def _como_pila(matriz):
+    """(pila booleana de 3 dimensiones, True si la entrada era una sola matriz)"""
+    matriz = np.asarray(matriz)
+    if matriz.ndim == 2:
+        return matriz[None] != 0, True
+    if matriz.ndim == 3:
+        return matriz != 0, False
+    raise ValueError(f"Se esperaba una matriz 2D o una pila 3D, pero tiene forma {matriz.shape}")
+
+
+def _tramos(pila):
+    """Tramos horizontales de figura: fila global, inicio y fin (exclusivo), en orden de lectura"""
+    cantidad, filas, columnas = pila.shape
+    plano = pila.reshape(cantidad * filas, columnas).astype(np.int8)
+    bordes = np.diff(np.pad(plano, ((0, 0), (1, 1))), axis=1)
+    fila_inicio, inicio = np.nonzero(bordes == 1)
+    _, fin = np.nonzero(bordes == -1)
+    return fila_inicio, inicio, fin
+
+
+def _pares_vecinos(fila, inicio, fin, columnas, filas, conectividad):
+    """
+    Pares (tramo de arriba, tramo de abajo) que se tocan entre filas consecutivas
+    de la misma matriz. Los tramos de una fila están ordenados y no se pisan, así
+    que los vecinos de cada tramo forman un rango contiguo que se busca con searchsorted.
+    """
+    diagonal = 1 if conectividad == 8 else 0
+    paso = columnas + 2
+    inicio_global = fila * paso + inicio
+    fin_global = fila * paso + fin
+
+    # Solo tramos con fila anterior dentro de la misma matriz
+    abajo = np.flatnonzero(fila % filas != 0)
+    base = (fila[abajo] - 1) * paso
+    desde = np.searchsorted(fin_global, base + inicio[abajo] - diagonal, side="right")
+    hasta = np.searchsorted(inicio_global, base + fin[abajo] + diagonal, side="left")
+    cantidades = np.maximum(hasta - desde, 0)
+
+    tramo_abajo = np.repeat(abajo, cantidades)
+    desplazamiento = np.arange(cantidades.sum()) - np.repeat(np.cumsum(cantidades) - cantidades,
+                                                              cantidades)
+    tramo_arriba = np.repeat(desde, cantidades) + desplazamiento
+    return tramo_arriba, tramo_abajo
+
+
+def etiquetar(matriz, conectividad: int = 8):
+    """
+    Etiqueta los componentes conexos de la figura.
+
+    Parámetros:
+    • matriz       : matriz (filas, columnas) o pila (n, filas, columnas); figura = distinto de 0
+    • conectividad : 8 (las celdas en diagonal se tocan) o 4 (solo arriba, abajo y a los lados)
+
+    Da de regreso: (etiquetas, cantidad). Etiquetas es un array int32 de la misma forma
+    con 0 en el fondo y 1..cantidad en orden de lectura; en una pila la numeración
+    empieza en 1 en cada matriz y cantidad es un array con un valor por matriz.
+    """
+    if conectividad not in (4, 8):
+        raise ValueError(f"Conectividad desconocida: {conectividad}. Opciones: 4, 8")
+    pila, es_matriz = _como_pila(matriz)
+    cantidad_matrices, filas, columnas = pila.shape
+
+    fila, inicio, fin = _tramos(pila)
+    tramo_arriba, tramo_abajo = _pares_vecinos(fila, inicio, fin, columnas, filas, conectividad)
+    padre = np.arange(len(fila), dtype=np.int64)
+    nucleos_figuras.unir_tramos(padre, tramo_arriba.astype(np.int64), tramo_abajo.astype(np.int64))
+
+    # Raíces numeradas en orden de lectura, reiniciando en cada matriz
+    es_raiz = padre == np.arange(len(fila))
+    numero = np.cumsum(es_raiz)
+    matriz_de_tramo = fila // filas
+    raices_por_matriz = np.bincount(matriz_de_tramo[es_raiz], minlength=cantidad_matrices)
+    previas = np.concatenate([[0], np.cumsum(raices_por_matriz)[:-1]])
+    etiqueta_tramo = (numero[padre] - previas[matriz_de_tramo]).astype(np.int32)
+
+    etiquetas = np.zeros(pila.shape, dtype=np.int32)
+    etiquetas.reshape(-1)[np.flatnonzero(pila)] = np.repeat(etiqueta_tramo, fin - inicio)
+    if es_matriz:
+        return etiquetas[0], int(raices_por_matriz[0])
+    return etiquetas, raices_por_matriz
+
+
+def _estadisticas_de_matriz(etiquetas, cantidad):
+    if cantidad == 0:
+        return []
+    filas_idx, columnas_idx = np.nonzero(etiquetas)
+    valores = etiquetas[filas_idx, columnas_idx]
+    area = np.bincount(valores, minlength=cantidad + 1)[1:]
+    suma_filas = np.bincount(valores, weights=filas_idx, minlength=cantidad + 1)[1:]
+    suma_columnas = np.bincount(valores, weights=columnas_idx, minlength=cantidad + 1)[1:]
+    grande = np.iinfo(np.int64).max
+    fila_min = np.full(cantidad + 1, grande)
+    columna_min = np.full(cantidad + 1, grande)
+    fila_max = np.full(cantidad + 1, -1)
+    columna_max = np.full(cantidad + 1, -1)
+    np.minimum.at(fila_min, valores, filas_idx)
+    np.minimum.at(columna_min, valores, columnas_idx)
+    np.maximum.at(fila_max, valores, filas_idx)
+    np.maximum.at(columna_max, valores, columnas_idx)
+    return [{"etiqueta": k + 1,
+             "area": int(area[k]),
+             "caja": (int(fila_min[k + 1]), int(columna_min[k + 1]),
+                      int(fila_max[k + 1]), int(columna_max[k + 1])),
+             "centroide": (float(suma_filas[k] / area[k]), float(suma_columnas[k] / area[k]))}
+            for k in range(cantidad)]
+
+
+def estadisticas_componentes(matriz, conectividad: int = 8):
+    """
+    Estadísticas de cada componente, en orden de etiqueta.
+
+    Da de regreso: lista de diccionarios con "etiqueta", "area" (celdas),
+    "caja" (fila_min, columna_min, fila_max, columna_max, inclusive) y
+    "centroide" (fila, columna); en una pila, una lista por matriz.
+    """
+    etiquetas, cantidad = etiquetar(matriz, conectividad)
+    if etiquetas.ndim == 2:
+        return _estadisticas_de_matriz(etiquetas, cantidad)
+    return [_estadisticas_de_matriz(capa, int(n)) for capa, n in zip(etiquetas, cantidad)]
+
+
+def _areas(etiquetas, cantidad):
+    """Área de cada etiqueta de la pila: array (n, max(cantidad) + 1), con la columna 0 sin usar"""
+    pila = etiquetas.reshape((-1,) + etiquetas.shape[-2:])
+    ancho = int(np.max(cantidad, initial=0)) + 1
+    indice = np.arange(len(pila))[:, None, None] * ancho + pila
+    areas = np.bincount(indice.ravel(), minlength=len(pila) * ancho).reshape(len(pila), ancho)
+    areas[:, 0] = 0
+    return areas, indice
+
+
+def _mismo_tipo(resultado, matriz):
+    """La máscara resultado (0/1) con el dtype de la entrada"""
+    return resultado.astype(np.asarray(matriz).dtype)
+
+
+def quitar_manchas(matriz, area_minima: int, conectividad: int = 8):
+    """Borra los componentes de menos de area_minima celdas"""
+    etiquetas, cantidad = etiquetar(matriz, conectividad)
+    areas, indice = _areas(etiquetas, cantidad)
+    conservar = (areas >= area_minima).ravel()
+    resultado = conservar[indice].reshape(etiquetas.shape) & (etiquetas > 0)
+    return _mismo_tipo(resultado, matriz)
+
+
+def conservar_mayor(matriz, conectividad: int = 8):
+    """Deja solo el componente más grande (con empate, el primero en orden de lectura)"""
+    etiquetas, cantidad = etiquetar(matriz, conectividad)
+    areas, indice = _areas(etiquetas, cantidad)
+    mayor = np.zeros_like(areas, dtype=bool)
+    filas_con_figura = np.flatnonzero(areas.max(axis=1) > 0)
+    mayor[filas_con_figura, areas[filas_con_figura].argmax(axis=1)] = True
+    resultado = mayor.ravel()[indice].reshape(etiquetas.shape) & (etiquetas > 0)
+    return _mismo_tipo(resultado, matriz)
+
+
+def rellenar_huecos(matriz, conectividad: int = 8):
+    """
+    Pinta como figura el fondo que no toca el borde de la matriz.
+    El fondo se recorre con la conectividad complementaria (4 si la figura usa 8),
+    así un hueco cerrado solo en diagonal no se considera abierto.
+    """
+    pila, es_matriz = _como_pila(matriz)
+    fondo, cantidad = etiquetar(~pila, 4 if conectividad == 8 else 8)
+    ancho = int(np.max(cantidad, initial=0)) + 1
+    abiertos = np.zeros((len(pila), ancho), dtype=bool)
+    for borde in (fondo[:, 0, :], fondo[:, -1, :], fondo[:, :, 0], fondo[:, :, -1]):
+        matriz_idx = np.repeat(np.arange(len(pila)), borde.shape[1])
+        abiertos[matriz_idx, borde.ravel()] = True
+    indice = np.arange(len(pila))[:, None, None] * ancho + fondo
+    resultado = pila | ((fondo > 0) & ~abiertos.ravel()[indice])
+    return _mismo_tipo(resultado[0] if es_matriz else resultado, matriz)
+
+
+def postprocesar(matriz,
+                 area_minima: int = 0,
+                 rellenar: bool = False,
+                 solo_mayor: bool = False,
+                 conectividad: int = 8):
+    """
+    Limpieza de la matriz de detección, en este orden:
+    • area_minima : quitar componentes de menos celdas (0 para no quitar nada)
+    • rellenar    : rellenar huecos encerrados por la figura
+    • solo_mayor  : dejar solo el componente más grande
+
+    Da de regreso: una matriz (o pila) nueva, del mismo tipo que la entrada
+    """
+    resultado = np.asarray(matriz)
+    if area_minima > 1:
+        resultado = quitar_manchas(resultado, area_minima, conectividad)
+    if rellenar:
+        resultado = rellenar_huecos(resultado, conectividad)
+    if solo_mayor:
+        resultado = conservar_mayor(resultado, conectividad)
+    return resultado.copy() if resultado is matriz else resultado
+
+
+def resumen_componentes(matriz, conectividad: int = 8, maximo: int = 3,
+                        componentes: list = None) -> list:
+    """
+    Líneas de texto con la cantidad de componentes y los datos de los más grandes.
+    • componentes: resultado de estadisticas_componentes(matriz) ya calculado, para
+                   no volver a etiquetar la matriz
+    """
+    if componentes is None:
+        componentes = estadisticas_componentes(matriz, conectividad)
+    lineas = [f"Componentes: {len(componentes)}"]
+    for componente in sorted(componentes, key=lambda c: -c["area"])[:maximo]:
+        fila_min, columna_min, fila_max, columna_max = componente["caja"]
+        fila_c, columna_c = componente["centroide"]
+        lineas.append(f"  #{componente['etiqueta']}: área {componente['area']}, "
+                      f"caja ({fila_min},{columna_min})-({fila_max},{columna_max}), "
+                      f"centroide ({fila_c:.1f}, {columna_c:.1f})")
+    return lineas
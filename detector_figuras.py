@@ -0,0 +1,17 @@
+"""
+Alias importable de 'Detector de figuras - Elaborado.py'.
+
+El nombre del script (con espacios) no se puede usar con `import`; este módulo
+ejecuta su código dentro de su propio espacio de nombres para que otros módulos
+(y los procesos de un pool) puedan hacer `import detector_figuras`.
+El bloque `if __name__ == "__main__"` del script no se ejecuta.
+"""
+import os
+
+_RUTA_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "Detector de figuras - Elaborado.py")
+
+with open(_RUTA_SCRIPT, encoding="utf-8") as _archivo:
+    exec(compile(_archivo.read(), _RUTA_SCRIPT, "exec"), globals())
+
+del _archivo
@@ -0,0 +1,328 @@
+"""
+Formato compacto para guardar matrices de detección y de paleta.
+
+Una matriz 0/1 guardada como int64 ocupa 64 bits por celda; aquí ocupa 1 bit
+(empaquetada) y una matriz de paleta (valores 0-255) ocupa 1 byte por celda.
+Opcionalmente cada matriz se comprime por tramos (RLE), útil en máscaras con
+zonas grandes de un mismo valor.
+
+Archivos:
+• .fig  : una matriz (escribir_matriz / leer_matriz)
+• .figs : pila de muchas matrices, solo se agregan al final (PilaMatrices), con un
+          índice al lado (.figs.idx) para ir directo a la matriz i. Se lee con
+          np.memmap: abrir una pila no carga nada y cada matriz se decodifica sola.
+
+Estructura (little-endian):
+    encabezado de archivo : b"FIGS", versión (1 byte), 3 bytes reservados
+    cada registro         : b"RM", tipo (0 = bits, 1 = uint8), rle (0/1),
+                            filas, columnas, largo de los datos (uint32 c/u),
+                            datos rellenados a múltiplo de 8 bytes
+    datos RLE             : cantidad de tramos n (uint32) + 4 bytes de relleno,
+                            largos (n x uint32), valores (n x uint8)
+    índice (.figs.idx)    : b"FIGI", versión, 3 reservados y una entrada de 24 bytes
+                            por matriz (posición, filas, columnas, largo, tipo, rle)
+
+Si el índice falta o quedó atrasado (por ejemplo, por un corte durante una
+escritura), se reconstruye recorriendo los registros.
+"""
+import os
+import tempfile
+
+import numpy as np
+
+VERSION_FORMATO = 1
+TIPO_BITS = 0
+TIPO_UINT8 = 1
+
+_MARCA_ARCHIVO = b"FIGS"
+_MARCA_INDICE = b"FIGI"
+_MARCA_REGISTRO = b"RM"
+_LARGO_ENCABEZADO = 8
+_REGISTRO = np.dtype([("marca", "S2"), ("tipo", "u1"), ("rle", "u1"),
+                      ("filas", "<u4"), ("columnas", "<u4"), ("largo", "<u4")])
+_ENTRADA_INDICE = np.dtype([("posicion", "<u8"), ("filas", "<u4"), ("columnas", "<u4"),
+                            ("largo", "<u4"), ("tipo", "u1"), ("rle", "u1"), ("reservado", "<u2")])
+# Cantidad de unos en cada byte posible, para contar sin desempaquetar
+_UNOS_POR_BYTE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+def _encabezado(marca: bytes) -> bytes:
+    return marca + bytes([VERSION_FORMATO, 0, 0, 0])
+
+
+def _relleno(largo: int) -> int:
+    return -largo % 8
+
+
+def _tramos(plana: np.ndarray):
+    """Valores y largos de los tramos de valores iguales consecutivos"""
+    if plana.size == 0:
+        return np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.uint32)
+    cortes = np.flatnonzero(plana[1:] != plana[:-1]) + 1
+    inicios = np.concatenate(([0], cortes))
+    largos = np.diff(np.append(inicios, plana.size)).astype(np.uint32)
+    return plana[inicios].astype(np.uint8), largos
+
+
+def codificar(matriz, rle="auto"):
+    """
+    Codifica una matriz 2D de enteros entre 0 y 255.
+
+    Parámetros:
+    • rle: True (siempre por tramos), False (nunca) o "auto" (lo que ocupe menos)
+
+    Da de regreso: (tipo, rle, datos en bytes)
+    """
+    matriz = np.asarray(matriz)
+    if matriz.ndim != 2:
+        raise ValueError(f"La matriz debe ser 2D, tiene forma {matriz.shape}")
+    if matriz.size and (matriz.min() < 0 or matriz.max() > 255):
+        raise ValueError("El formato compacto admite valores entre 0 y 255")
+    plana = matriz.astype(np.uint8, copy=False).ravel()
+    tipo = TIPO_BITS if plana.size == 0 or plana.max() <= 1 else TIPO_UINT8
+
+    directo = np.packbits(plana).tobytes() if tipo == TIPO_BITS else plana.tobytes()
+    if rle is False:
+        return tipo, False, directo
+    valores, largos = _tramos(plana)
+    por_tramos = (np.array([len(largos), 0], dtype="<u4").tobytes()
+                  + largos.astype("<u4").tobytes() + valores.tobytes())
+    if rle is True or len(por_tramos) < len(directo):
+        return tipo, True, por_tramos
+    return tipo, False, directo
+
+
+def decodificar(datos, filas: int, columnas: int, tipo: int, rle: bool) -> np.ndarray:
+    """
+    Reconstruye la matriz (uint8) a partir de los datos de un registro.
+    Con datos sin RLE de tipo uint8 devuelve una vista, sin copiar (solo lectura si
+    viene de un memmap).
+    """
+    datos = np.frombuffer(datos, dtype=np.uint8) if isinstance(datos, (bytes, bytearray)) else datos
+    celdas = filas * columnas
+    if rle:
+        n = int(datos[:4].view("<u4")[0])
+        largos = datos[8:8 + 4 * n].view("<u4")
+        valores = datos[8 + 4 * n:8 + 5 * n]
+        return np.repeat(valores, largos).reshape(filas, columnas)
+    if tipo == TIPO_BITS:
+        return np.unpackbits(datos[:(celdas + 7) // 8], count=celdas).reshape(filas, columnas)
+    return datos[:celdas].reshape(filas, columnas)
+
+
+def _registro(matriz, rle) -> tuple:
+    """Da de regreso: (bytes del registro completo, entrada de índice sin posición)"""
+    matriz = np.asarray(matriz)
+    tipo, con_rle, datos = codificar(matriz, rle)
+    encabezado = np.zeros(1, dtype=_REGISTRO)
+    encabezado[0] = (_MARCA_REGISTRO, tipo, int(con_rle), matriz.shape[0], matriz.shape[1], len(datos))
+    contenido = encabezado.tobytes() + datos + bytes(_relleno(len(datos)))
+    return contenido, (matriz.shape[0], matriz.shape[1], len(datos), tipo, int(con_rle))
+
+
+def _escribir_atomico(ruta: str, contenido: bytes):
+    carpeta = os.path.dirname(os.path.abspath(ruta))
+    os.makedirs(carpeta, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=carpeta, prefix=".tmp_")
+    try:
+        with os.fdopen(descriptor, "wb") as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.remove(temporal)
+        raise
+
+
+def escribir_matriz(ruta: str, matriz, rle="auto"):
+    """Guarda una matriz en un archivo .fig (se escribe completo o no se escribe)"""
+    contenido, _ = _registro(matriz, rle)
+    _escribir_atomico(ruta, _encabezado(_MARCA_ARCHIVO) + contenido)
+
+
+def leer_matriz(ruta: str, indice: int = 0) -> np.ndarray:
+    """Lee una matriz de un .fig (o la número `indice` de una pila .figs) como uint8"""
+    with PilaMatrices(ruta) as pila:
+        return np.array(pila[indice])
+
+
+def es_archivo_compacto(ruta: str) -> bool:
+    """True si el archivo empieza con la marca del formato compacto"""
+    try:
+        with open(ruta, "rb") as archivo:
+            return archivo.read(4) == _MARCA_ARCHIVO
+    except OSError:
+        return False
+
+
+class PilaMatrices:
+    def __init__(self, ruta: str, modo: str = "r"):
+        """
+        Pila de matrices en un archivo de solo agregar, con índice y lectura por memmap.
+
+        Parámetros:
+        • ruta : archivo .figs (el índice se guarda en ruta + ".idx")
+        • modo : "r" solo lectura, "a" para agregar (crea el archivo si no existe)
+
+        Uso:
+            with PilaMatrices("mascaras.figs", "a") as pila:
+                pila.agregar(matriz)
+            pila = PilaMatrices("mascaras.figs")
+            pila[10], len(pila), pila.contar_figura(10)
+        """
+        if modo not in ("r", "a"):
+            raise ValueError(f"Modo desconocido: {modo}. Opciones: r, a")
+        self.ruta = ruta
+        self.ruta_indice = ruta + ".idx"
+        self.modo = modo
+        self._datos = None
+        self._largo_mapeado = 0
+        self._archivo = None
+
+        if modo == "a" and not os.path.exists(ruta):
+            with open(ruta, "wb") as archivo:
+                archivo.write(_encabezado(_MARCA_ARCHIVO))
+            with open(self.ruta_indice, "wb") as archivo:
+                archivo.write(_encabezado(_MARCA_INDICE))
+        with open(ruta, "rb") as archivo:
+            if archivo.read(4) != _MARCA_ARCHIVO:
+                raise ValueError(f"{ruta} no es un archivo de matrices compacto")
+        self._indice = self._cargar_indice()
+        if modo == "a":
+            self._archivo = open(ruta, "ab")
+
+    # === ÍNDICE ===
+    def _cargar_indice(self) -> np.ndarray:
+        """Lee el índice y lo completa recorriendo los registros que le falten"""
+        entradas = np.zeros(0, dtype=_ENTRADA_INDICE)
+        if os.path.exists(self.ruta_indice):
+            with open(self.ruta_indice, "rb") as archivo:
+                encabezado = archivo.read(_LARGO_ENCABEZADO)
+                crudo = archivo.read()
+            if encabezado[:4] == _MARCA_INDICE:
+                completas = len(crudo) // _ENTRADA_INDICE.itemsize
+                entradas = np.frombuffer(crudo[:completas * _ENTRADA_INDICE.itemsize],
+                                         dtype=_ENTRADA_INDICE)
+
+        tamaño_archivo = os.path.getsize(self.ruta)
+        posicion = _LARGO_ENCABEZADO
+        if len(entradas):
+            ultima = entradas[-1]
+            posicion = int(ultima["posicion"]) + _REGISTRO.itemsize + int(ultima["largo"]) \
+                + _relleno(int(ultima["largo"]))
+            if posicion > tamaño_archivo:  # índice más largo que los datos: no confiar en él
+                entradas, posicion = entradas[:0], _LARGO_ENCABEZADO
+        if posicion >= tamaño_archivo:
+            return entradas.copy()
+
+        # Recorrer los registros que el índice no tiene
+        nuevas = []
+        with open(self.ruta, "rb") as archivo:
+            while posicion + _REGISTRO.itemsize <= tamaño_archivo:
+                archivo.seek(posicion)
+                registro = np.frombuffer(archivo.read(_REGISTRO.itemsize), dtype=_REGISTRO)[0]
+                largo = int(registro["largo"])
+                fin = posicion + _REGISTRO.itemsize + largo + _relleno(largo)
+                if registro["marca"] != _MARCA_REGISTRO or fin > tamaño_archivo:
+                    break  # registro incompleto al final: se ignora
+                nuevas.append((posicion, registro["filas"], registro["columnas"], largo,
+                               registro["tipo"], registro["rle"], 0))
+                posicion = fin
+        entradas = np.concatenate([entradas, np.array(nuevas, dtype=_ENTRADA_INDICE)])
+        if self.modo == "a":
+            self._recortar_y_reescribir_indice(entradas, posicion)
+        return entradas
+
+    def _recortar_y_reescribir_indice(self, entradas, fin_valido):
+        """Descarta un registro a medias al final y guarda el índice completo"""
+        if os.path.getsize(self.ruta) > fin_valido:
+            with open(self.ruta, "r+b") as archivo:
+                archivo.truncate(fin_valido)
+        _escribir_atomico(self.ruta_indice, _encabezado(_MARCA_INDICE) + entradas.tobytes())
+
+    # === ESCRITURA ===
+    def agregar(self, matriz, rle="auto") -> int:
+        """Agrega una matriz al final. Da de regreso: su número dentro de la pila"""
+        if self._archivo is None:
+            raise ValueError("La pila está abierta en modo lectura; usar modo='a' para agregar")
+        contenido, (filas, columnas, largo, tipo, con_rle) = _registro(matriz, rle)
+        posicion = self._archivo.tell()
+        self._archivo.write(contenido)
+        self._archivo.flush()
+        entrada = np.array([(posicion, filas, columnas, largo, tipo, con_rle, 0)],
+                           dtype=_ENTRADA_INDICE)
+        # El índice se escribe después de los datos: un corte entre ambos se repara al abrir
+        with open(self.ruta_indice, "ab") as archivo:
+            archivo.write(entrada.tobytes())
+        self._indice = np.concatenate([self._indice, entrada])
+        return len(self._indice) - 1
+
+    def extender(self, matrices, rle="auto"):
+        for matriz in matrices:
+            self.agregar(matriz, rle)
+
+    # === LECTURA ===
+    def _mapa(self) -> np.ndarray:
+        """memmap del archivo de datos, rehecho solo si la pila creció"""
+        fin = os.path.getsize(self.ruta)
+        if self._datos is None or fin != self._largo_mapeado:
+            self._datos = np.memmap(self.ruta, dtype=np.uint8, mode="r", shape=(fin,))
+            self._largo_mapeado = fin
+        return self._datos
+
+    def datos_crudos(self, i: int) -> np.ndarray:
+        """Bytes codificados de la matriz i (vista del memmap, sin decodificar)"""
+        entrada = self._indice[i]
+        inicio = int(entrada["posicion"]) + _REGISTRO.itemsize
+        return self._mapa()[inicio:inicio + int(entrada["largo"])]
+
+    def info(self, i: int) -> dict:
+        entrada = self._indice[i]
+        return {"filas": int(entrada["filas"]), "columnas": int(entrada["columnas"]),
+                "tipo": "bits" if entrada["tipo"] == TIPO_BITS else "uint8",
+                "rle": bool(entrada["rle"]), "bytes": int(entrada["largo"])}
+
+    def __len__(self):
+        return len(self._indice)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        entrada = self._indice[i]
+        return decodificar(self.datos_crudos(i), int(entrada["filas"]), int(entrada["columnas"]),
+                           int(entrada["tipo"]), bool(entrada["rle"]))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def contar_figura(self, i: int) -> int:
+        """Celdas distintas de 0 en la matriz i, sin desempaquetarla"""
+        entrada = self._indice[i]
+        datos = self.datos_crudos(i)
+        if entrada["rle"]:
+            n = int(datos[:4].view("<u4")[0])
+            largos = datos[8:8 + 4 * n].view("<u4")
+            valores = datos[8 + 4 * n:8 + 5 * n]
+            return int(largos[valores != 0].sum())
+        if entrada["tipo"] == TIPO_BITS:
+            # Los bits de relleno del último byte son 0
+            return int(_UNOS_POR_BYTE[datos].sum())
+        return int(np.count_nonzero(datos))
+
+    def apilar(self) -> np.ndarray:
+        """Todas las matrices (de igual forma) en un array (n, filas, columnas) uint8"""
+        if not len(self):
+            return np.zeros((0, 0, 0), dtype=np.uint8)
+        return np.stack(list(self))
+
+    def cerrar(self):
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
+        self._datos = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
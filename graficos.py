@@ -0,0 +1,67 @@
+"""
+Carga perezosa de matplotlib y fuentes para los renderizadores.
+
+Detectar y parsear matrices no necesita matplotlib; estos helpers lo importan
+solo cuando se pide una figura, y eligen el backend no interactivo "Agg"
+cuando no hay pantalla disponible.
+"""
+import functools
+import importlib.util
+import os
+import sys
+
+
+def hay_pantalla() -> bool:
+    """En Linux/Unix, True si hay servidor gráfico (X11 o Wayland); en Windows y macOS, siempre True"""
+    if sys.platform.startswith("win") or sys.platform == "darwin":
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def obtener_pyplot():
+    """
+    Importa y devuelve matplotlib.pyplot.
+    Si no hay pantalla ni MPLBACKEND definido, fija antes el backend "Agg".
+    """
+    if "matplotlib.pyplot" not in sys.modules and not os.environ.get("MPLBACKEND") \
+            and not hay_pantalla():
+        import matplotlib
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _ruta_fuente_matplotlib(nombre: str = "DejaVuSans-Bold.ttf"):
+    """Ruta de una fuente incluida en matplotlib, buscada sin importarlo (None si no está)"""
+    try:
+        especificacion = importlib.util.find_spec("matplotlib")
+    except (ImportError, ValueError):
+        return None
+    if especificacion is None:
+        return None
+    for carpeta in especificacion.submodule_search_locations or []:
+        ruta = os.path.join(carpeta, "mpl-data", "fonts", "ttf", nombre)
+        if os.path.isfile(ruta):
+            return ruta
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def cargar_fuente(tamaño_fuente: int):
+    """
+    DejaVu Sans Bold (la de matplotlib, con acentos); si no está, la fuente por defecto de PIL.
+    Queda en caché por tamaño: cada render reutiliza la fuente ya cargada.
+    """
+    from PIL import ImageFont
+    candidatas = ["DejaVuSans-Bold.ttf", _ruta_fuente_matplotlib()]
+    for candidata in candidatas:
+        if candidata is None:
+            continue
+        try:
+            return ImageFont.truetype(candidata, tamaño_fuente)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=tamaño_fuente)
+    except (TypeError, OSError):
+        return ImageFont.load_default()
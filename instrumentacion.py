@@ -0,0 +1,138 @@
+"""
+Medición opcional por etapas (tiempo y, si se pide, memoria pico) para el detector y el coloreador.
+
+Uso:
+    medidor = Medidor(callback=print)               # solo tiempos
+    matriz = detectar_figura_optimizado(ruta, 20, medidor=medidor)
+    medidor.imprimir_resumen()
+
+    medidor = Medidor(memoria=True)                 # también memoria pico (tracemalloc)
+
+Las funciones instrumentadas reciben `medidor=None` por defecto; en ese caso
+`etapa()` devuelve siempre el mismo contexto vacío y no se mide nada.
+"""
+import contextlib
+import logging
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_SIN_MEDICION = contextlib.nullcontext()
+
+
+def etapa(medidor, nombre: str, **datos):
+    """Contexto que mide la etapa si hay medidor; si medidor es None no hace nada"""
+    if medidor is None:
+        return _SIN_MEDICION
+    return medidor.etapa(nombre, **datos)
+
+
+def _rss_max_kb():
+    """Memoria residente máxima del proceso hasta ahora (KB), si el sistema lo permite"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss  # macOS lo da en bytes
+
+
+class Medidor:
+    def __init__(self, callback=None, logger: logging.Logger = None, memoria: bool = False):
+        """
+        Registra el tiempo de pared de cada etapa y, con memoria=True, su memoria pico.
+
+        Parámetros:
+        • callback : función que recibe cada registro (dict) al terminar la etapa
+        • logger   : logger donde escribir cada registro (nivel INFO)
+        • memoria  : usar tracemalloc para la memoria pico de cada etapa (cuenta las
+                     asignaciones de Python y numpy, no las internas de PIL). Rastrear
+                     cada asignación hace más lentas las etapas, así que los tiempos
+                     de una corrida con memoria=True no sirven para comparar velocidad
+
+        Cada registro tiene: etapa, segundos, memoria_pico_bytes (None sin memoria=True),
+        rss_max_kb y los datos extra que pasó la función instrumentada (método, tamaño, etc.).
+        """
+        self.callback = callback
+        self.logger = logger
+        self.memoria = memoria
+        self.registros = []
+        self._pila = []
+        self._inicio_tracemalloc = False
+
+    @contextlib.contextmanager
+    def etapa(self, nombre: str, **datos):
+        if self.memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._inicio_tracemalloc = True
+
+        marco = {"pico": 0, "base": 0}
+        if self.memoria:
+            if self._pila:
+                # Conservar el pico visto hasta ahora por la etapa externa
+                self._pila[-1]["pico"] = max(self._pila[-1]["pico"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            marco["base"] = tracemalloc.get_traced_memory()[0]
+        self._pila.append(marco)
+
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - inicio
+            self._pila.pop()
+            pico = None
+            if self.memoria:
+                pico_absoluto = max(marco["pico"], tracemalloc.get_traced_memory()[1])
+                pico = max(0, pico_absoluto - marco["base"])
+                if self._pila:
+                    self._pila[-1]["pico"] = max(self._pila[-1]["pico"], pico_absoluto)
+            registro = {"etapa": nombre, "segundos": segundos,
+                        "memoria_pico_bytes": pico, "rss_max_kb": _rss_max_kb(), **datos}
+            self.registros.append(registro)
+            if self.callback is not None:
+                self.callback(registro)
+            if self.logger is not None:
+                self.logger.info("%s", registro)
+
+    def resumen(self) -> dict:
+        """Totales por etapa: veces, segundos (total, promedio, máximo) y memoria pico máxima"""
+        resumen = {}
+        for registro in self.registros:
+            datos = resumen.setdefault(registro["etapa"], {"veces": 0, "segundos_total": 0.0,
+                                                           "segundos_max": 0.0,
+                                                           "memoria_pico_bytes": None})
+            datos["veces"] += 1
+            datos["segundos_total"] += registro["segundos"]
+            datos["segundos_max"] = max(datos["segundos_max"], registro["segundos"])
+            if registro["memoria_pico_bytes"] is not None:
+                datos["memoria_pico_bytes"] = max(datos["memoria_pico_bytes"] or 0,
+                                                  registro["memoria_pico_bytes"])
+        for datos in resumen.values():
+            datos["segundos_promedio"] = datos["segundos_total"] / datos["veces"]
+        return resumen
+
+    def imprimir_resumen(self):
+        """Muestra el resumen por etapa en terminal, ordenado por tiempo total"""
+        resumen = self.resumen()
+        print(f"\n{'='*78}")
+        print(f"{'Etapa':<32}{'Veces':>7}{'Total (s)':>12}{'Prom. (ms)':>13}{'Memoria pico':>14}")
+        print(f"{'='*78}")
+        for nombre, datos in sorted(resumen.items(), key=lambda e: -e[1]["segundos_total"]):
+            memoria = datos["memoria_pico_bytes"]
+            memoria_txt = f"{memoria / 2**20:.1f} MB" if memoria is not None else "-"
+            print(f"{nombre:<32}{datos['veces']:>7}{datos['segundos_total']:>12.3f}"
+                  f"{datos['segundos_promedio'] * 1000:>13.2f}{memoria_txt:>14}")
+        rss = _rss_max_kb()
+        if rss is not None:
+            print(f"Memoria residente máxima del proceso: {rss / 1024:.1f} MB")
+        print(f"{'='*78}")
+
+    def cerrar(self):
+        """Detiene tracemalloc si lo inició este medidor"""
+        if self._inicio_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._inicio_tracemalloc = False
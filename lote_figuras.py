@@ -0,0 +1,276 @@
+"""
+Detección de figuras por lotes desde la línea de comandos.
+
+Procesa una carpeta (o un patrón glob) de imágenes con detectar_figura_optimizado
+en un pool de procesos, sin abrir ventanas, y escribe un resultado por imagen
+más un manifiesto resumen (manifiesto.json).
+
+Ejemplo:
+    python lote_figuras.py "C:\\Fotos" --tamaño 20 --metodo contraste_mejorado \\
+        --sensibilidad 0.4 --workers 8 --salida resultados
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Nunca abrir ventanas en los procesos del lote
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import numpy as np
+
+import detector_figuras
+from cache_figuras import CacheFiguras, escribir_atomico
+from componentes_figuras import etiquetar, postprocesar
+from serializacion_figuras import escribir_corchetes, escribir_csv, escribir_json
+
+EXTENSIONES_IMAGEN = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".tif", ".tiff", ".webp")
+
+
+def listar_imagenes(entrada: str) -> list:
+    """Devuelve las rutas de imagen de una carpeta o de un patrón glob, ordenadas"""
+    if os.path.isdir(entrada):
+        rutas = [os.path.join(entrada, nombre) for nombre in os.listdir(entrada)]
+    else:
+        rutas = glob.glob(entrada, recursive=True)
+    return sorted(ruta for ruta in rutas
+                  if os.path.isfile(ruta) and ruta.lower().endswith(EXTENSIONES_IMAGEN))
+
+
+def carpeta_base(rutas: list) -> str:
+    """Carpeta común de todas las rutas (de ella cuelgan las subcarpetas de la salida)"""
+    if not rutas:
+        return ""
+    return os.path.commonpath([os.path.dirname(os.path.abspath(ruta)) for ruta in rutas])
+
+
+def nombre_salida(ruta_imagen: str, carpeta_salida: str, extension: str, base: str = None) -> str:
+    """
+    Ruta de salida de una imagen: su nombre completo, con extensión, más la del
+    resultado ("gato.png" da "gato.png.txt"), así "gato.png" y "gato.jpg" no se
+    pisan. Con base, se conserva además la ruta relativa a esa carpeta
+    ("fotos/sub/gato.png" con base "fotos" da "sub/gato.png.txt").
+    """
+    if base:
+        relativa = os.path.relpath(os.path.abspath(ruta_imagen), base)
+    else:
+        relativa = os.path.basename(ruta_imagen)
+    return os.path.join(carpeta_salida, relativa + extension)
+
+
+def escribir_resultado(matriz, ruta_imagen: str, carpeta_salida: str, formato: str = "txt",
+                       base: str = None) -> str:
+    """
+    Guarda la matriz de una imagen en carpeta_salida, con el nombre de la imagen y la
+    extensión del formato (txt, csv, json, npy o fig), ver nombre_salida. Se escribe
+    en un temporal que luego se renombra: quien lea la carpeta nunca ve un archivo a medias.
+    Da de regreso: la ruta escrita
+    """
+    if formato == "fig":
+        ruta_salida = nombre_salida(ruta_imagen, carpeta_salida, ".fig", base)
+        detector_figuras.escribir_matriz(ruta_salida, matriz)  # ya es atómico
+        return ruta_salida
+    if formato == "npy":
+        contenido = io.BytesIO()
+        np.save(contenido, matriz, allow_pickle=False)
+        datos = contenido.getvalue()
+    else:
+        escritores = {"txt": escribir_corchetes, "csv": escribir_csv, "json": escribir_json}
+        if formato not in escritores:
+            raise ValueError(f"Formato desconocido: {formato}. Opciones: txt, csv, json, npy, fig")
+        contenido = io.StringIO()
+        escritores[formato](matriz, contenido)
+        datos = contenido.getvalue().encode("utf-8")
+    ruta_salida = nombre_salida(ruta_imagen, carpeta_salida, "." + formato, base)
+    escribir_atomico(ruta_salida, datos)
+    return ruta_salida
+
+
+_CACHES = {}
+
+
+def _cache_del_proceso(carpeta_cache, cache_mb):
+    """Una CacheFiguras por proceso y carpeta, para reutilizar su conexión entre tareas"""
+    if (carpeta_cache, cache_mb) not in _CACHES:
+        _CACHES[(carpeta_cache, cache_mb)] = CacheFiguras(carpeta_cache, cache_mb)
+    return _CACHES[(carpeta_cache, cache_mb)]
+
+
+def _procesar_una(tarea):
+    """Procesa una imagen en un proceso del pool; nunca lanza excepciones"""
+    (ruta_imagen, carpeta_salida, base, tamaño, metodo, umbral_blanco, sensibilidad, formato,
+     rapido, carpeta_cache, cache_mb, postproceso) = tarea
+    registro = {"imagen": ruta_imagen}
+    inicio = time.perf_counter()
+    try:
+        if carpeta_cache:
+            cache = _cache_del_proceso(carpeta_cache, cache_mb)
+            aciertos = cache.aciertos
+            matriz = cache.detectar(ruta_imagen, tamaño, metodo, umbral_blanco, sensibilidad, rapido)
+            registro["cache"] = "acierto" if cache.aciertos > aciertos else "fallo"
+        else:
+            matriz = detector_figuras.detectar_figura_optimizado(
+                ruta_imagen, tamaño, metodo, umbral_blanco=umbral_blanco,
+                sensibilidad=sensibilidad, rapido=rapido)
+        # La caché guarda la detección sin limpiar: la limpieza se aplica siempre aquí
+        if postproceso:
+            matriz = postprocesar(matriz, **postproceso)
+
+        if formato == "figs":
+            # Una sola pila para todo el lote: la escribe el proceso principal, en orden
+            ruta_salida = None
+            registro["_matriz"] = matriz
+        else:
+            ruta_salida = escribir_resultado(matriz, ruta_imagen, carpeta_salida, formato, base)
+
+        registro.update(estado="ok",
+                        salida=ruta_salida,
+                        forma=list(matriz.shape),
+                        pixeles_figura=int(np.sum(matriz)),
+                        cobertura=round(float(np.mean(matriz)) * 100, 2))
+        # Contar componentes cuesta un etiquetado por imagen: solo si se pidió limpieza
+        if postproceso:
+            registro["componentes"] = etiquetar(matriz)[1]
+    except Exception as e:
+        registro.update(estado="error", error=f"{type(e).__name__}: {e}")
+    registro["segundos"] = round(time.perf_counter() - inicio, 4)
+    return registro
+
+
+def procesar_lote(rutas: list,
+                  carpeta_salida: str,
+                  tamaño: int = 15,
+                  metodo: str = "contraste_mejorado",
+                  umbral_blanco: int = 240,
+                  sensibilidad: float = 0.8,
+                  workers: int = None,
+                  formato: str = "txt",
+                  rapido: bool = False,
+                  carpeta_cache: str = None,
+                  cache_mb: float = 512,
+                  postproceso: dict = None) -> dict:
+    """
+    Procesa una lista de imágenes en paralelo y escribe el manifiesto.
+
+    Los errores por imagen quedan registrados en el manifiesto sin detener el lote.
+    Cada resultado conserva el nombre completo de su imagen y su subcarpeta respecto
+    de la carpeta común de las rutas (ver nombre_salida), así no se pisan entre sí.
+    Con carpeta_cache, las imágenes ya procesadas con los mismos parámetros se
+    leen de la caché en disco (ver cache_figuras.CacheFiguras). Con postproceso,
+    cada matriz se limpia con componentes_figuras.postprocesar antes de guardarla.
+    Da de regreso: el manifiesto (también guardado en carpeta_salida/manifiesto.json)
+    """
+    os.makedirs(carpeta_salida, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    base = carpeta_base(rutas)
+    tareas = [(ruta, carpeta_salida, base, tamaño, metodo, umbral_blanco, sensibilidad, formato,
+               rapido, carpeta_cache, cache_mb, postproceso)
+              for ruta in rutas]
+
+    inicio = time.perf_counter()
+    if workers == 1:
+        registros = [_procesar_una(tarea) for tarea in tareas]
+    else:
+        # Lotes por proceso para amortizar el envío de tareas entre procesos
+        chunksize = max(1, len(tareas) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            registros = list(pool.map(_procesar_una, tareas, chunksize=chunksize))
+    if formato == "figs":
+        ruta_pila = os.path.join(carpeta_salida, "matrices.figs")
+        with detector_figuras.PilaMatrices(ruta_pila, "a") as pila:
+            for registro in registros:
+                if "_matriz" in registro:
+                    registro["salida"] = f"{ruta_pila}#{pila.agregar(registro.pop('_matriz'))}"
+    duracion = time.perf_counter() - inicio
+
+    errores = [r for r in registros if r["estado"] != "ok"]
+    manifiesto = {
+        "parametros": {"tamaño": tamaño, "metodo": metodo, "umbral_blanco": umbral_blanco,
+                       "sensibilidad": sensibilidad, "workers": workers, "formato": formato,
+                       "rapido": rapido, "postproceso": postproceso or {}},
+        "total": len(registros),
+        "correctas": len(registros) - len(errores),
+        "errores": len(errores),
+        "segundos": round(duracion, 3),
+        "imagenes_por_segundo": round(len(registros) / duracion, 2) if duracion > 0 else None,
+        "resultados": registros,
+    }
+    if carpeta_cache:
+        # La del proceso: con workers=1 escribe también sus aciertos pendientes
+        manifiesto["cache"] = {**_cache_del_proceso(carpeta_cache, cache_mb).estadisticas(),
+                               "aciertos": sum(r.get("cache") == "acierto" for r in registros),
+                               "fallos": sum(r.get("cache") == "fallo" for r in registros)}
+    with open(os.path.join(carpeta_salida, "manifiesto.json"), "w", encoding="utf-8") as archivo:
+        json.dump(manifiesto, archivo, ensure_ascii=False, indent=2)
+    return manifiesto
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detección de figuras por lotes")
+    parser.add_argument("entrada", help="Carpeta de imágenes o patrón glob (ej. 'fotos/*.jpg')")
+    parser.add_argument("--salida", default="resultados_lote", help="Carpeta de resultados")
+    parser.add_argument("--tamaño", "--tamano", dest="tamaño", type=int, default=15)
+    parser.add_argument("--metodo", default="contraste_mejorado", choices=detector_figuras.METODOS)
+    parser.add_argument("--umbral-blanco", dest="umbral_blanco", type=int, default=240)
+    parser.add_argument("--sensibilidad", type=float, default=0.8)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Procesos en paralelo (por defecto, todos los núcleos)")
+    parser.add_argument("--formato", choices=["txt", "csv", "json", "npy", "fig", "figs"], default="txt",
+                        help="txt: filas entre corchetes para el coloreador; csv/json: texto "
+                             "para otras herramientas; npy: array numpy; "
+                             "fig: formato compacto (1 bit por celda), un archivo por imagen; "
+                             "figs: todas en una pila compacta (matrices.figs)")
+    parser.add_argument("--rapido", action="store_true",
+                        help="Decodificación reducida para fotos grandes (JPEG draft + reduce)")
+    parser.add_argument("--cache", nargs="?", const="", default=None, metavar="CARPETA",
+                        help="Reutilizar resultados guardados en disco (sin CARPETA: ~/.cache/figuras)")
+    parser.add_argument("--cache-mb", dest="cache_mb", type=float, default=512,
+                        help="Tamaño máximo de la caché en MB")
+    parser.add_argument("--limpiar-cache", dest="limpiar_cache", action="store_true",
+                        help="Vaciar la caché antes de procesar")
+    parser.add_argument("--area-minima", dest="area_minima", type=int, default=0,
+                        help="Quitar manchas de menos celdas que esto")
+    parser.add_argument("--rellenar", action="store_true",
+                        help="Rellenar los huecos encerrados por la figura")
+    parser.add_argument("--solo-mayor", dest="solo_mayor", action="store_true",
+                        help="Dejar solo el componente más grande")
+    args = parser.parse_args(argv)
+    postproceso = {clave: valor for clave, valor in (("area_minima", args.area_minima),
+                                                     ("rellenar", args.rellenar),
+                                                     ("solo_mayor", args.solo_mayor)) if valor}
+
+    rutas = listar_imagenes(args.entrada)
+    if not rutas:
+        print(f"No se encontraron imágenes en: {args.entrada}")
+        return 1
+
+    carpeta_cache = None
+    if args.cache is not None:
+        cache = CacheFiguras(args.cache or None, args.cache_mb)
+        carpeta_cache = cache.carpeta
+        if args.limpiar_cache:
+            print(f"Entradas borradas de la caché: {cache.invalidar()}")
+
+    print(f"Procesando {len(rutas)} imágenes con {args.workers or os.cpu_count()} procesos...")
+    manifiesto = procesar_lote(rutas, args.salida, args.tamaño, args.metodo,
+                               args.umbral_blanco, args.sensibilidad, args.workers, args.formato,
+                               args.rapido, carpeta_cache, args.cache_mb, postproceso)
+
+    for registro in manifiesto["resultados"]:
+        if registro["estado"] != "ok":
+            print(f"Error con {registro['imagen']}: {registro['error']}")
+    print(f"Correctas: {manifiesto['correctas']}/{manifiesto['total']} "
+          f"en {manifiesto['segundos']} s ({manifiesto['imagenes_por_segundo']} img/s)")
+    if "cache" in manifiesto:
+        print(f"Caché: {manifiesto['cache']['aciertos']} aciertos, "
+              f"{manifiesto['cache']['fallos']} fallos ({manifiesto['cache']['carpeta']})")
+    print(f"Manifiesto: {os.path.join(args.salida, 'manifiesto.json')}")
+    return 0 if manifiesto["errores"] == 0 else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Núcleos celda por celda compilados con Numba (opcional).
+
+Si Numba está instalado, el registro de métodos del detector los usa como
+backend "numba"; si no, todo sigue funcionando con NumPy. Cada núcleo repite
+las operaciones de su versión NumPy en el mismo orden (incluido el orden de
+suma por pares que usa np.std), así el resultado es idéntico bit a bit y no
+solo parecido.
+
+Las funciones *_py son Python puro: Numba las compila la primera vez que se
+usan (y guarda la compilación en disco). Sin Numba se pueden llamar igual,
+muy lentas, para comprobar que coinciden con NumPy
+(mapas_contraste(pix, compilado=False)).
+"""
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+DISPONIBLE = numba is not None
+
+
+def _jit(funcion):
+    """Con Numba, la función compilada (al primer uso); sin Numba, la misma función"""
+    return numba.njit(cache=True, nogil=True)(funcion) if DISPONIBLE else funcion
+
+
+def _suma_por_pares_py(valores, n):
+    """Suma de valores[:n] en el mismo orden que la suma por pares de NumPy (n <= 128)"""
+    if n < 8:
+        suma = 0.0
+        for k in range(n):
+            suma += valores[k]
+        return suma
+    r0, r1, r2, r3 = valores[0], valores[1], valores[2], valores[3]
+    r4, r5, r6, r7 = valores[4], valores[5], valores[6], valores[7]
+    k = 8
+    while k < n - n % 8:
+        r0 += valores[k]
+        r1 += valores[k + 1]
+        r2 += valores[k + 2]
+        r3 += valores[k + 3]
+        r4 += valores[k + 4]
+        r5 += valores[k + 5]
+        r6 += valores[k + 6]
+        r7 += valores[k + 7]
+        k += 8
+    suma = ((r0 + r1) + (r2 + r3)) + ((r4 + r5) + (r6 + r7))
+    while k < n:
+        suma += valores[k]
+        k += 1
+    return suma
+
+
+def _mapas_contraste_py(pix, std_mapa, diferencia_mapa):
+    """Igual que _mapas_contraste del detector, una celda a la vez"""
+    filas, columnas = pix.shape[0], pix.shape[1]
+    desvios = np.empty(25)
+    for i in range(filas):
+        for j in range(columnas):
+            ventana_size = 2 if min(i, j, filas - 1 - i, columnas - 1 - j) > 1 else 1
+            i_min = max(0, i - ventana_size)
+            i_max = min(filas, i + ventana_size + 1)
+            j_min = max(0, j - ventana_size)
+            j_max = min(columnas, j + ventana_size + 1)
+            n = (i_max - i_min) * (j_max - j_min)
+
+            # Desviación estándar de cada canal: media (suma exacta de enteros) y luego
+            # cuadrados de los desvíos sumados por pares, en orden de filas
+            suma_std = 0.0
+            for c in range(3):
+                total = 0.0
+                for a in range(i_min, i_max):
+                    for b in range(j_min, j_max):
+                        total += pix[a, b, c]
+                media = total / n
+                k = 0
+                for a in range(i_min, i_max):
+                    for b in range(j_min, j_max):
+                        desvio = pix[a, b, c] - media
+                        desvios[k] = desvio * desvio
+                        k += 1
+                suma_std += np.sqrt(_suma_por_pares(desvios, n) / n)
+            std_mapa[i, j] = suma_std / 3
+
+            # Diferencia media con el promedio de las 4 esquinas de la ventana
+            diferencia = 0.0
+            for c in range(3):
+                esquinas = (float(pix[i_min, j_min, c]) + pix[i_min, j_max - 1, c]
+                            + pix[i_max - 1, j_min, c] + pix[i_max - 1, j_max - 1, c]) / 4
+                diferencia += abs(pix[i, j, c] - esquinas)
+            diferencia_mapa[i, j] = diferencia / 3
+
+
+def _unir_tramos_py(padre, pares_a, pares_b):
+    """Union-find sobre los pares; la raíz de cada grupo queda en su elemento de menor índice"""
+    for k in range(pares_a.shape[0]):
+        a = pares_a[k]
+        while padre[a] != a:
+            padre[a] = padre[padre[a]]
+            a = padre[a]
+        b = pares_b[k]
+        while padre[b] != b:
+            padre[b] = padre[padre[b]]
+            b = padre[b]
+        if a < b:
+            padre[b] = a
+        elif b < a:
+            padre[a] = b
+    # Cada padre tiene menor índice que su hijo: en orden, cada uno ya encuentra su raíz final
+    for k in range(padre.shape[0]):
+        padre[k] = padre[padre[k]]
+
+
+_suma_por_pares = _jit(_suma_por_pares_py)
+_mapas_contraste = _jit(_mapas_contraste_py)
+_unir_tramos = _jit(_unir_tramos_py)
+
+
+def mapas_contraste(pix: np.ndarray, compilado: bool = True):
+    """
+    (std_promedio, diferencia_esquinas) de contraste_mejorado, calculados celda por celda.
+    • compilado: False para correr la versión sin compilar (la única posible sin Numba)
+    """
+    pix = np.ascontiguousarray(pix, dtype=np.uint8)
+    std_mapa = np.zeros(pix.shape[:2])
+    diferencia_mapa = np.zeros(pix.shape[:2])
+    (_mapas_contraste if compilado else _mapas_contraste_py)(pix, std_mapa, diferencia_mapa)
+    return std_mapa, diferencia_mapa
+
+
+def unir_tramos(padre: np.ndarray, pares_a: np.ndarray, pares_b: np.ndarray):
+    """
+    Une los pares (pares_a[k], pares_b[k]) en `padre` (int64, modificado en el lugar).
+    Al terminar, padre[k] es la raíz de k: el elemento de menor índice de su grupo.
+    Lineal en la cantidad de pares; compilado si hay Numba.
+    """
+    _unir_tramos(padre, pares_a, pares_b)
@@ -0,0 +1,223 @@
+"""
+Paletas de colores de MatrizAImagen y cuantización de imágenes a ellas.
+
+Cada paleta se convierte una sola vez en un cubo RGB -> índice (el color de la
+paleta más cercano para cada combinación de rojo, verde y azul). Después,
+cuantizar una imagen es una consulta a la tabla por píxel, en lugar de medir la
+distancia a cada color de la paleta.
+
+Los cubos quedan en memoria mientras dure el proceso. Si la variable de entorno
+FIGURAS_CACHE indica una carpeta, también se guardan ahí (subcarpeta 'paletas',
+16 MB por paleta con bits=8), así los workers de lote_figuras o del servicio no
+los vuelven a calcular. Sin FIGURAS_CACHE, o con FIGURAS_SIN_CACHE=1, no se
+escribe nada en disco.
+
+Uso:
+    indices = cuantizar(pix, "basicos")          # pix: (alto, ancho, 3) uint8
+    cubo = cubo_paleta("calidos", bits=6)        # 64x64x64, más chico y aproximado
+"""
+import io
+import os
+
+import numpy as np
+
+from cache_figuras import escribir_atomico, hash_bytes
+
+# Paletas de colores básicas de MatrizAImagen: índice de la matriz -> color
+PALETAS = {
+    "basicos": [
+        "#FFFFFF",  # 0 - Blanco
+        "#000000",  # 1 - Negro
+        "#FF0000",  # 2 - Rojo (primario)
+        "#FFFF00",  # 3 - Amarillo (primario)
+        "#0000FF",  # 4 - Azul (primario)
+        "#00FF00",  # 5 - Verde (secundario)
+        "#FF8000",  # 6 - Naranja (secundario)
+        "#8000FF",  # 7 - Violeta (secundario)
+        "#FF0080",  # 8 - Rosa (terciario)
+        "#80FF00"   # 9 - Lima (terciario)
+    ],
+
+    "primarios": [
+        "#FFFFFF",  # 0 - Blanco
+        "#000000",  # 1 - Negro
+        "#FF0000",  # 2 - Rojo
+        "#FFFF00",  # 3 - Amarillo
+        "#0000FF",  # 4 - Azul
+        "#808080",  # 5 - Gris
+        "#C0C0C0",  # 6 - Gris claro
+        "#404040",  # 7 - Gris oscuro
+        "#800000",  # 8 - Rojo oscuro
+        "#000080"   # 9 - Azul oscuro
+    ],
+
+    "secundarios": [
+        "#FFFFFF",  # 0 - Blanco
+        "#000000",  # 1 - Negro
+        "#00FF00",  # 2 - Verde (amarillo + azul)
+        "#FF8000",  # 3 - Naranja (rojo + amarillo)
+        "#8000FF",  # 4 - Violeta (rojo + azul)
+        "#80FF80",  # 5 - Verde claro
+        "#FFBF80",  # 6 - Naranja claro
+        "#BF80FF",  # 7 - Violeta claro
+        "#008000",  # 8 - Verde oscuro
+        "#804000"   # 9 - Naranja oscuro
+    ],
+
+    "rueda_color": [
+        "#FFFFFF",  # 0 - Blanco
+        "#000000",  # 1 - Negro
+        "#FF0000",  # 2 - Rojo (primario)
+        "#FF8000",  # 3 - Naranja (secundario)
+        "#FFFF00",  # 4 - Amarillo (primario)
+        "#80FF00",  # 5 - Lima (terciario)
+        "#00FF00",  # 6 - Verde (secundario)
+        "#00FF80",  # 7 - Turquesa (terciario)
+        "#0000FF",  # 8 - Azul (primario)
+        "#8000FF"   # 9 - Violeta (secundario)
+    ],
+
+    "calidos": [
+        "#FFFFFF",  # 0 - Blanco
+        "#000000",  # 1 - Negro
+        "#FF0000",  # 2 - Rojo
+        "#FF4000",  # 3 - Rojo-naranja
+        "#FF8000",  # 4 - Naranja
+        "#FFBF00",  # 5 - Naranja-amarillo
+        "#FFFF00",  # 6 - Amarillo
+        "#BFFF00",  # 7 - Amarillo-verde
+        "#FF0040",  # 8 - Rosa-rojo
+        "#FF8040"   # 9 - Coral
+    ],
+
+    "frios": [
+        "#FFFFFF",  # 0 - Blanco
+        "#000000",  # 1 - Negro
+        "#0000FF",  # 2 - Azul
+        "#0040FF",  # 3 - Azul-violeta
+        "#8000FF",  # 4 - Violeta
+        "#4000FF",  # 5 - Índigo
+        "#00FF00",  # 6 - Verde
+        "#0080FF",  # 7 - Azul claro
+        "#0040BF",  # 8 - Azul medio
+        "#004080"   # 9 - Azul oscuro
+    ]
+}
+
+_CUBOS = {}
+
+
+def colores_paleta(paleta) -> np.ndarray:
+    """
+    Colores de la paleta como array (n, 3) de enteros.
+    • paleta: nombre de una paleta de PALETAS ("basicos", "calidos", ...)
+              o lista de colores "#RRGGBB"
+    """
+    if isinstance(paleta, str):
+        if paleta not in PALETAS:
+            raise ValueError(f"Paleta '{paleta}' no disponible. Opciones: {', '.join(PALETAS)}")
+        paleta = PALETAS[paleta]
+    colores = [color.lstrip("#") for color in paleta]
+    if not colores or len(colores) > 256 or any(len(color) != 6 for color in colores):
+        raise ValueError("La paleta debe tener entre 1 y 256 colores en formato #RRGGBB")
+    return np.array([[int(color[k:k + 2], 16) for k in (0, 2, 4)] for color in colores],
+                    dtype=np.int32)
+
+
+def _construir_cubo(colores: np.ndarray, bits: int) -> np.ndarray:
+    """Índice del color más cercano (distancia euclídea en RGB) para el centro de cada casilla"""
+    lado = 1 << bits
+    paso = 256 // lado
+    centros = np.arange(lado, dtype=np.int32) * paso + (paso - 1) // 2
+    verde = centros[None, :, None]
+    azul = centros[None, None, :]
+    cubo = np.empty((lado, lado, lado), dtype=np.uint8)
+    # Por losas de rojo, para no pasar de ~2 millones de casillas a la vez
+    losa = max(1, (1 << 21) // (lado * lado))
+    for inicio in range(0, lado, losa):
+        rojo = centros[inicio:inicio + losa, None, None]
+        mejor = None
+        for indice, (r, g, b) in enumerate(colores):
+            distancia = (rojo - r) ** 2 + ((verde - g) ** 2 + (azul - b) ** 2)
+            if mejor is None:
+                mejor = distancia
+                indices = np.zeros(distancia.shape, dtype=np.uint8)
+            else:
+                # Con empate gana el índice más bajo
+                mas_cerca = distancia < mejor
+                np.minimum(mejor, distancia, out=mejor)
+                indices[mas_cerca] = indice
+        cubo[inicio:inicio + losa] = indices
+    return cubo
+
+
+def cubo_paleta(paleta, bits: int = 8) -> np.ndarray:
+    """
+    Cubo RGB -> índice de la paleta, de (2**bits)^3 casillas (uint8).
+
+    Con bits=8 (16 MB) el resultado es exacto para cada color. Con menos bits
+    cada casilla agrupa colores vecinos (bits=6: 256 KB, se calcula en ~10 ms);
+    solo cambian los colores que quedan a pocos niveles del límite entre dos
+    colores de la paleta.
+    """
+    if not 1 <= bits <= 8:
+        raise ValueError(f"bits debe estar entre 1 y 8, no {bits}")
+    colores = colores_paleta(paleta)
+    clave = hash_bytes(colores.tobytes() + bytes([bits]))
+    if clave in _CUBOS:
+        return _CUBOS[clave]
+
+    carpeta = os.environ.get("FIGURAS_CACHE")
+    usar_disco = bool(carpeta) and os.environ.get("FIGURAS_SIN_CACHE", "") in ("", "0")
+    ruta = os.path.join(carpeta or "", "paletas", f"{clave}.npy")
+    cubo = None
+    if usar_disco and os.path.isfile(ruta):
+        try:
+            cubo = np.load(ruta, allow_pickle=False)
+            if cubo.shape != (1 << bits,) * 3 or cubo.dtype != np.uint8:
+                cubo = None
+        except (OSError, ValueError):
+            cubo = None
+    if cubo is None:
+        cubo = _construir_cubo(colores, bits)
+        if usar_disco:
+            salida = io.BytesIO()
+            np.save(salida, cubo, allow_pickle=False)
+            try:
+                escribir_atomico(ruta, salida.getvalue())
+            except OSError:
+                pass  # sin permiso de escritura: queda solo en memoria
+    cubo.setflags(write=False)
+    _CUBOS[clave] = cubo
+    return cubo
+
+
+def cuantizar(pix: np.ndarray, paleta, bits: int = 8) -> np.ndarray:
+    """
+    Índice del color de la paleta más cercano para cada píxel.
+    • pix: array (..., 3) uint8 en RGB
+    Da de regreso: array uint8 con la forma de pix sin el último eje
+    """
+    cubo = cubo_paleta(paleta, bits)
+    pix = np.asarray(pix, dtype=np.uint8)
+    corrimiento = 8 - bits
+    # Índice plano en el cubo: r, g, b recortados a 'bits' bits cada uno
+    plano = (pix[..., 0] >> corrimiento).astype(np.intp) << (2 * bits)
+    plano |= (pix[..., 1] >> corrimiento).astype(np.intp) << bits
+    plano |= pix[..., 2] >> corrimiento
+    return cubo.reshape(-1).take(plano)
+
+
+def moda_por_celda(indices: np.ndarray, tamaño: int, cantidad_colores: int) -> np.ndarray:
+    """
+    Índice más frecuente en cada celda de una grilla tamaño x tamaño.
+    • indices: array (tamaño*k, tamaño*k) de índices de la paleta
+    Con empate gana el índice más bajo.
+    """
+    alto, ancho = indices.shape
+    filas = np.arange(alto) * tamaño // alto
+    columnas = np.arange(ancho) * tamaño // ancho
+    celda = (filas[:, None] * tamaño + columnas[None, :]) * cantidad_colores
+    conteos = np.bincount((celda + indices).ravel(),
+                          minlength=tamaño * tamaño * cantidad_colores)
+    return conteos.reshape(tamaño, tamaño, cantidad_colores).argmax(axis=2).astype(np.uint8)
@@ -0,0 +1,220 @@
+"""
+Escritura de matrices como texto, compartida por el detector y el coloreador.
+
+• Filas entre corchetes (lo que lee MatrizAImagen.parsear_matriz), CSV y JSON,
+  generados por bloques de filas en lugar de celda por celda, y escritos por
+  partes a un archivo o stream sin armar todo el texto en memoria.
+• Vista previa para la terminal, con colores ANSI, que se reduce o se recorta
+  cuando la matriz no entra en la ventana.
+
+Ejemplos:
+    escribir_corchetes(matriz, "matriz.txt")
+    escribir_csv(matriz, "matriz.csv")
+    print(vista_previa(matriz))
+"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+
+import numpy as np
+
+_FILAS_POR_BLOQUE = 512
+
+
+@contextlib.contextmanager
+def _abrir_destino(destino):
+    """Acepta una ruta o un objeto de archivo de texto ya abierto"""
+    if isinstance(destino, (str, os.PathLike)):
+        with open(destino, "w", encoding="utf-8", newline="\n") as archivo:
+            yield archivo
+    else:
+        yield destino
+
+
+def _bloques_de_texto(matriz, separador: str, abrir: str, cerrar: str, fin_fila: str,
+                      filas_por_bloque: int = _FILAS_POR_BLOQUE):
+    """
+    Genera el texto de la matriz por bloques de filas.
+    Matrices de un dígito (0-9, el caso de las máscaras y casi todas las paletas):
+    se arma el texto directamente como bytes con numpy. Resto: una plantilla de
+    formato por fila, que Python aplica en C.
+    """
+    matriz = np.asarray(matriz)
+    if matriz.ndim != 2:
+        raise ValueError(f"La matriz debe ser 2D, pero tiene forma {matriz.shape}")
+    filas, columnas = matriz.shape
+    if columnas == 0:
+        for _ in range(0, filas, filas_por_bloque):
+            yield (abrir + cerrar + fin_fila) * min(filas_por_bloque, filas)
+        return
+
+    un_digito = np.issubdtype(matriz.dtype, np.integer) or matriz.dtype == bool
+    un_digito = un_digito and matriz.size and 0 <= matriz.min() and matriz.max() <= 9
+    if un_digito:
+        # Plantilla de una fila: "[d, d, ..., d]\n" con los dígitos en posiciones fijas
+        paso = len(separador) + 1
+        plantilla = (abrir + separador.join(["0"] * columnas) + cerrar + fin_fila).encode("ascii")
+        posiciones = len(abrir) + paso * np.arange(columnas)
+        for inicio in range(0, filas, filas_por_bloque):
+            bloque = matriz[inicio:inicio + filas_por_bloque]
+            texto = np.tile(np.frombuffer(plantilla, dtype=np.uint8), (len(bloque), 1))
+            texto[:, posiciones] = bloque.astype(np.uint8) + ord("0")
+            yield texto.tobytes().decode("ascii")
+        return
+
+    formato = "%d" if np.issubdtype(matriz.dtype, np.integer) or matriz.dtype == bool else "%r"
+    plantilla = abrir + separador.join([formato] * columnas) + cerrar + fin_fila
+    for inicio in range(0, filas, filas_por_bloque):
+        bloque = matriz[inicio:inicio + filas_por_bloque].tolist()
+        yield "".join(plantilla % tuple(fila) for fila in bloque)
+
+
+def matriz_a_texto(matriz: np.ndarray) -> str:
+    """Formato de filas entre corchetes que acepta MatrizAImagen.parsear_matriz"""
+    return "".join(_bloques_de_texto(matriz, ", ", "[", "]", "\n"))
+
+
+def escribir_corchetes(matriz, destino):
+    """Escribe las filas entre corchetes ("[0, 1, 1]" por línea) en una ruta o stream"""
+    with _abrir_destino(destino) as archivo:
+        for bloque in _bloques_de_texto(matriz, ", ", "[", "]", "\n"):
+            archivo.write(bloque)
+
+
+def escribir_csv(matriz, destino):
+    """Escribe la matriz como CSV, sin encabezado (lo lee cargar_matriz del coloreador)"""
+    with _abrir_destino(destino) as archivo:
+        for bloque in _bloques_de_texto(matriz, ",", "", "", "\n"):
+            archivo.write(bloque)
+
+
+def escribir_json(matriz, destino):
+    """Escribe la matriz como lista JSON de filas (también la acepta parsear_matriz)"""
+    with _abrir_destino(destino) as archivo:
+        archivo.write("[\n")
+        primero = True
+        for bloque in _bloques_de_texto(matriz, ", ", "[", "]", ",\n"):
+            if not primero:
+                archivo.write(",\n")
+            archivo.write(bloque[:-2])  # sin la coma de la última fila del bloque
+            primero = False
+        archivo.write("\n]\n")
+
+
+def matriz_a_json(matriz) -> str:
+    salida = io.StringIO()
+    escribir_json(matriz, salida)
+    return salida.getvalue()
+
+
+# === VISTA PREVIA EN TERMINAL ===
+def _usar_color(archivo) -> bool:
+    """Colores ANSI solo en una terminal real y si NO_COLOR no está definido"""
+    if os.environ.get("NO_COLOR"):
+        return False
+    return hasattr(archivo, "isatty") and archivo.isatty()
+
+
+def _hex_a_rgb(color: str):
+    color = color.lstrip("#")
+    return tuple(int(color[k:k + 2], 16) for k in (0, 2, 4))
+
+
+def _reducir(matriz, factor_filas: int, factor_columnas: int, binaria: bool):
+    """Un valor por bloque: mayoría en matrices 0/1, la esquina del bloque en las de paleta"""
+    if not binaria:
+        return matriz[::factor_filas, ::factor_columnas]
+    filas, columnas = matriz.shape
+    alto = -(-filas // factor_filas) * factor_filas
+    ancho = -(-columnas // factor_columnas) * factor_columnas
+    relleno = np.zeros((alto, ancho), dtype=np.float32)
+    cuentas = np.zeros((alto, ancho), dtype=np.float32)
+    relleno[:filas, :columnas] = matriz
+    cuentas[:filas, :columnas] = 1
+    forma = (alto // factor_filas, factor_filas, ancho // factor_columnas, factor_columnas)
+    promedio = relleno.reshape(forma).sum(axis=(1, 3)) / cuentas.reshape(forma).sum(axis=(1, 3))
+    return (promedio >= 0.5).astype(np.uint8)
+
+
+def vista_previa(matriz,
+                 colores: list = None,
+                 ancho_max: int = None,
+                 alto_max: int = None,
+                 modo: str = "reducir",
+                 color: bool = None) -> str:
+    """
+    Vista de la matriz para la terminal: cada celda son 2 caracteres.
+
+    Parámetros:
+    • colores   : lista de colores "#RRGGBB" por valor (por defecto blanco/negro, como el detector)
+    • ancho_max : columnas de texto disponibles (por defecto, el ancho de la terminal)
+    • alto_max  : líneas disponibles (por defecto, el alto de la terminal menos 8)
+    • modo      : "reducir" (muestrea para que entre toda) o "recortar" (esquina superior izquierda)
+    • color     : forzar o desactivar ANSI (por defecto, solo si la salida es una terminal)
+
+    Da de regreso: el texto listo para imprimir
+    """
+    matriz = np.clip(np.asarray(matriz), 0, None).astype(np.int64, copy=False)
+    tamaño_terminal = shutil.get_terminal_size((80, 24))
+    ancho_max = ancho_max or tamaño_terminal.columns
+    alto_max = alto_max or max(4, tamaño_terminal.lines - 8)
+    color = _usar_color(sys.stdout) if color is None else color
+    filas, columnas = matriz.shape
+    binaria = matriz.size == 0 or (matriz.min() >= 0 and matriz.max() <= 1)
+
+    max_columnas = max(1, ancho_max // 2)
+    nota = ""
+    if filas > alto_max or columnas > max_columnas:
+        if modo == "recortar":
+            matriz = matriz[:alto_max, :max_columnas]
+            nota = f"(recortada: se muestran {matriz.shape[0]}x{matriz.shape[1]} de {filas}x{columnas})"
+        elif modo == "reducir":
+            factor_filas = -(-filas // alto_max)
+            factor_columnas = -(-columnas // max_columnas)
+            # Mantener la proporción: mismo factor en ambos ejes
+            factor = max(factor_filas, factor_columnas)
+            matriz = _reducir(matriz, factor, factor, binaria)
+            nota = f"(reducida 1:{factor}: {matriz.shape[0]}x{matriz.shape[1]} de {filas}x{columnas})"
+        else:
+            raise ValueError(f"Modo desconocido: {modo}. Opciones: reducir, recortar")
+
+    if colores is None:
+        colores = ["#FFFFFF", "#000000"]
+
+    if color:
+        # Un bloque de fondo de color por valor, calculado una sola vez
+        celdas = []
+        for valor in range(int(matriz.max()) + 1 if matriz.size else 1):
+            r, g, b = _hex_a_rgb(colores[min(valor, len(colores) - 1)])
+            celdas.append(f"\x1b[48;2;{r};{g};{b}m  ")
+        celdas = np.array(celdas, dtype=object)
+        lineas = ["".join(celdas[fila]) + "\x1b[0m" for fila in matriz]
+    elif binaria:
+        simbolos = np.array(["· ", "██"], dtype=object)
+        lineas = ["".join(simbolos[fila]) for fila in matriz]
+    else:
+        simbolos = np.array([f"{v:<2}"[:2] if v < 100 else "++" for v in range(int(matriz.max()) + 1)],
+                            dtype=object)
+        lineas = ["".join(simbolos[fila]).rstrip() for fila in matriz]
+
+    if nota:
+        lineas.append(nota)
+    return "\n".join(lineas)
+
+
+def imprimir_matriz(matriz, max_celdas: int = 2500, archivo=None, colores: list = None):
+    """
+    Imprime la matriz en filas entre corchetes si es chica (lista para copiar al
+    coloreador); si pasa de max_celdas, una vista previa que entra en la terminal.
+    """
+    archivo = archivo or sys.stdout
+    matriz = np.asarray(matriz)
+    if matriz.size <= max_celdas:
+        for bloque in _bloques_de_texto(matriz, ", ", "[", "]", "\n"):
+            archivo.write(bloque)
+        return
+    archivo.write(vista_previa(matriz, colores, color=_usar_color(archivo)) + "\n")
+    archivo.write(f"Matriz de {matriz.shape[0]}x{matriz.shape[1]}: para copiarla completa, "
+                  f"guardarla con escribir_corchetes(matriz, 'matriz.txt')\n")
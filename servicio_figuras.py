@@ -0,0 +1,414 @@
+"""
+Servicio local de detección de figuras (HTTP sobre TCP o socket Unix).
+
+Mantiene un pool de procesos ya calentado (numpy, PIL y el detector importados),
+así cada solicitud solo paga la detección. Acepta los bytes de la imagen en el
+cuerpo de un POST y los parámetros en la URL.
+
+Rutas:
+• POST /detectar?tamaño=15&metodo=contraste_mejorado&sensibilidad=0.8
+      parámetros opcionales: umbral_blanco, rapido=1, formato=json|npy|png,
+      render=raster|matplotlib (agrega el PNG: en base64 dentro del JSON, o como
+      respuesta directa con formato=png)
+• GET /salud   estado, cola, solicitudes en proceso y percentiles de latencia
+
+Con la cola llena responde 503 (con Retry-After) en lugar de acumular trabajo.
+
+Ejemplos:
+    python servicio_figuras.py --puerto 8765 --workers 4
+    curl --data-binary @gato.jpg "http://127.0.0.1:8765/detectar?tamaño=20"
+    curl http://127.0.0.1:8765/salud
+"""
+import argparse
+import asyncio
+import base64
+import collections
+import contextlib
+import http.client
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Los procesos del servicio nunca abren ventanas
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import numpy as np
+from PIL import Image
+
+import detector_figuras
+
+FORMATOS = ["json", "npy", "png"]
+RENDERIZADORES = ["raster", "matplotlib"]
+_MENSAJES_HTTP = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                  413: "Payload Too Large", 500: "Internal Server Error",
+                  503: "Service Unavailable"}
+# Fallas causadas por la imagen recibida (no se puede decodificar, es demasiado grande,
+# datos inválidos): se responden con 400; cualquier otra es un error del servicio (500)
+_ERRORES_DE_ENTRADA = (OSError, ValueError, Image.DecompressionBombError)
+# Con fork, un proceso nuevo del pool (al reemplazar uno roto en medio de una solicitud)
+# heredaría los sockets de las conexiones abiertas y el cliente nunca vería el cierre.
+# forkserver crea los procesos desde un servidor aparte, sin esos sockets
+_CONTEXTO = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else None)
+
+
+class ErrorSolicitud(Exception):
+    """Solicitud inválida; se responde con el código HTTP indicado"""
+    def __init__(self, codigo: int, mensaje: str):
+        super().__init__(mensaje)
+        self.codigo = codigo
+
+
+def calentar_proceso(con_matplotlib: bool):
+    """Inicializador de cada proceso: importa y ejercita lo que usa una detección"""
+    imagen = io.BytesIO()
+    Image.new("RGB", (32, 32), "white").save(imagen, format="PNG")
+    detector_figuras.detectar_figura_optimizado(io.BytesIO(imagen.getvalue()), 5)
+    if con_matplotlib:
+        from graficos import obtener_pyplot
+        obtener_pyplot()
+
+
+def _detectar_bytes(datos: bytes, parametros: dict) -> dict:
+    """Corre en un proceso del pool: detecta y, si se pidió, renderiza el PNG"""
+    inicio = time.perf_counter()
+    matriz = detector_figuras.detectar_figura_optimizado(
+        io.BytesIO(datos), parametros["tamaño"], parametros["metodo"],
+        umbral_blanco=parametros["umbral_blanco"], sensibilidad=parametros["sensibilidad"],
+        rapido=parametros["rapido"])
+    resultado = {"matriz": matriz, "png": None}
+
+    if parametros["render"]:
+        resultado["png"] = detector_figuras.png_resultado(
+            matriz, f"Detección - {parametros['metodo']}", renderizador=parametros["render"])
+
+    resultado["segundos_proceso"] = time.perf_counter() - inicio
+    return resultado
+
+
+def leer_parametros(consulta: str) -> dict:
+    """Valida los parámetros de la URL de /detectar; lanza ErrorSolicitud(400) si no sirven"""
+    valores = {clave: lista[-1] for clave, lista in urllib.parse.parse_qs(consulta).items()}
+    try:
+        parametros = {
+            "tamaño": int(valores.get("tamaño", valores.get("tamano", 15))),
+            "metodo": valores.get("metodo", "contraste_mejorado"),
+            "sensibilidad": float(valores.get("sensibilidad", 0.8)),
+            "umbral_blanco": int(valores.get("umbral_blanco", 240)),
+            "rapido": valores.get("rapido", "0").lower() in ("1", "true", "si", "sí"),
+            "formato": valores.get("formato", "json"),
+            "render": valores.get("render") or None,
+        }
+    except ValueError as e:
+        raise ErrorSolicitud(400, f"Parámetro inválido: {e}")
+
+    if parametros["metodo"] not in detector_figuras.METODOS:
+        raise ErrorSolicitud(400, f"Método desconocido: {parametros['metodo']}. "
+                                  f"Opciones: {detector_figuras.METODOS}")
+    if not 1 <= parametros["tamaño"] <= 2000:
+        raise ErrorSolicitud(400, "tamaño debe estar entre 1 y 2000")
+    if parametros["formato"] not in FORMATOS:
+        raise ErrorSolicitud(400, f"Formato desconocido: {parametros['formato']}. Opciones: {FORMATOS}")
+    if parametros["render"] is not None and parametros["render"] not in RENDERIZADORES:
+        raise ErrorSolicitud(400, f"Renderizador desconocido: {parametros['render']}. "
+                                  f"Opciones: {RENDERIZADORES}")
+    if parametros["formato"] == "png" and parametros["render"] is None:
+        parametros["render"] = "raster"
+    return parametros
+
+
+class ServicioFiguras:
+    def __init__(self, workers: int = None, concurrencia: int = None, capacidad_cola: int = 64,
+                 max_bytes: int = 64 * 2**20, con_matplotlib: bool = False):
+        """
+        Servicio de detección sobre un pool de procesos precalentado.
+
+        Parámetros:
+        • workers        : procesos del pool (por defecto, todos los núcleos)
+        • concurrencia   : detecciones simultáneas en el pool (por defecto, igual a workers)
+        • capacidad_cola : solicitudes que pueden esperar turno; más allá se responde 503
+        • max_bytes      : tamaño máximo del cuerpo (imagen); más allá se responde 413
+        • con_matplotlib : importar matplotlib al calentar (para render=matplotlib)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.concurrencia = concurrencia or self.workers
+        self.capacidad_cola = capacidad_cola
+        self.max_bytes = max_bytes
+        self.con_matplotlib = con_matplotlib
+        self.pool = None
+        self._servidores = []
+        self._semaforo = None
+        self._en_cola = 0
+        self._en_proceso = 0
+        self._contadores = collections.Counter()
+        self._latencias = collections.deque(maxlen=2000)
+        self._inicio = time.time()
+
+    async def iniciar(self, host: str = "127.0.0.1", puerto: int = 8765, ruta_unix: str = None):
+        """Crea y calienta el pool, y empieza a escuchar en TCP o en un socket Unix"""
+        self._semaforo = asyncio.Semaphore(self.concurrencia)
+        self.pool = self._crear_pool()
+        # Un trabajo vacío por proceso obliga a lanzarlos todos ahora y no en la primera solicitud
+        bucle = asyncio.get_running_loop()
+        await asyncio.gather(*(bucle.run_in_executor(self.pool, time.sleep, 0.05)
+                               for _ in range(self.workers)))
+
+        if ruta_unix:
+            servidor = await asyncio.start_unix_server(self._atender_conexion, path=ruta_unix)
+        else:
+            servidor = await asyncio.start_server(self._atender_conexion, host, puerto)
+        self._servidores.append(servidor)
+        return servidor
+
+    def _crear_pool(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=_CONTEXTO,
+                                   initializer=calentar_proceso, initargs=(self.con_matplotlib,))
+
+    def _reemplazar_pool(self, roto):
+        """
+        Cambia un pool roto (un proceso murió: falta de memoria, kill) por uno nuevo.
+        Si varias solicitudes fallaron con el mismo pool, solo la primera lo reemplaza.
+        """
+        if self.pool is roto:
+            self.pool = self._crear_pool()
+            roto.shutdown(wait=False, cancel_futures=True)
+
+    async def cerrar(self):
+        for servidor in self._servidores:
+            servidor.close()
+            await servidor.wait_closed()
+        self._servidores = []
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+
+    def estadisticas(self) -> dict:
+        """Estado del servicio: cola, trabajos en proceso, contadores y latencias (ms)"""
+        latencias = np.array(self._latencias) * 1000
+        percentiles = ({f"p{p}": round(float(np.percentile(latencias, p)), 2) for p in (50, 90, 99)}
+                       if latencias.size else {"p50": None, "p90": None, "p99": None})
+        return {"estado": "ok",
+                "en_cola": self._en_cola,
+                "en_proceso": self._en_proceso,
+                "capacidad_cola": self.capacidad_cola,
+                "concurrencia": self.concurrencia,
+                "workers": self.workers,
+                "atendidas": self._contadores["atendidas"],
+                "rechazadas": self._contadores["rechazadas"],
+                "errores": self._contadores["errores"],
+                "latencia_ms": percentiles,
+                "muestras_latencia": int(latencias.size),
+                "activo_segundos": round(time.time() - self._inicio, 1)}
+
+    async def detectar(self, datos: bytes, parametros: dict) -> dict:
+        """Espera turno (o rechaza si la cola está llena) y corre la detección en el pool"""
+        if self._en_cola >= self.capacidad_cola:
+            self._contadores["rechazadas"] += 1
+            raise ErrorSolicitud(503, "Cola llena, reintentar más tarde")
+        inicio = time.perf_counter()
+        self._en_cola += 1
+        try:
+            await self._semaforo.acquire()
+        finally:
+            self._en_cola -= 1
+        self._en_proceso += 1
+        pool = self.pool
+        try:
+            bucle = asyncio.get_running_loop()
+            resultado = await bucle.run_in_executor(pool, _detectar_bytes, datos, parametros)
+        except BrokenProcessPool:
+            self._contadores["errores"] += 1
+            self._reemplazar_pool(pool)
+            raise ErrorSolicitud(503, "Se reinició el proceso de detección, reintentar")
+        except _ERRORES_DE_ENTRADA as e:
+            self._contadores["errores"] += 1
+            raise ErrorSolicitud(400, f"No se pudo procesar la imagen: {type(e).__name__}: {e}")
+        finally:
+            self._en_proceso -= 1
+            self._semaforo.release()
+        segundos = time.perf_counter() - inicio
+        self._latencias.append(segundos)
+        self._contadores["atendidas"] += 1
+        resultado["segundos"] = segundos
+        return resultado
+
+    async def _atender_conexion(self, lector, escritor):
+        """Atiende solicitudes HTTP/1.1 en una conexión (con keep-alive)"""
+        try:
+            while True:
+                try:
+                    solicitud = await self._leer_solicitud(lector)
+                except ErrorSolicitud as e:
+                    await self._responder(escritor, e.codigo, _json_bytes({"error": str(e)}),
+                                          cerrar=True)
+                    break
+                if solicitud is None:
+                    break
+                metodo_http, ruta, consulta, cuerpo, seguir = solicitud
+                codigo, tipo, contenido, extra = await self._despachar(metodo_http, ruta,
+                                                                        consulta, cuerpo)
+                await self._responder(escritor, codigo, contenido, tipo, extra, cerrar=not seguir)
+                if not seguir:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+            with contextlib.suppress(ConnectionError):
+                await escritor.wait_closed()
+
+    async def _leer_solicitud(self, lector):
+        """Lee línea de solicitud, encabezados y cuerpo. Da de regreso None si se cerró la conexión"""
+        try:
+            encabezado = await lector.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            raise ErrorSolicitud(400, "Encabezados demasiado largos")
+        lineas = encabezado.decode("latin-1").split("\r\n")
+        try:
+            metodo_http, destino, version = lineas[0].split(" ", 2)
+        except ValueError:
+            raise ErrorSolicitud(400, "Línea de solicitud inválida")
+        campos = {}
+        for linea in lineas[1:]:
+            if ":" in linea:
+                clave, valor = linea.split(":", 1)
+                campos[clave.strip().lower()] = valor.strip()
+
+        try:
+            largo = int(campos.get("content-length", 0) or 0)
+        except ValueError:
+            largo = -1
+        if largo < 0:
+            raise ErrorSolicitud(400, f"Content-Length inválido: {campos['content-length']}")
+        if largo > self.max_bytes:
+            raise ErrorSolicitud(413, f"La imagen supera el máximo de {self.max_bytes} bytes")
+        cuerpo = await lector.readexactly(largo) if largo else b""
+
+        conexion = campos.get("connection", "").lower()
+        seguir = conexion != "close" if version == "HTTP/1.1" else conexion == "keep-alive"
+        partes = urllib.parse.urlsplit(destino)
+        return metodo_http, urllib.parse.unquote(partes.path), partes.query, cuerpo, seguir
+
+    async def _despachar(self, metodo_http, ruta, consulta, cuerpo):
+        """Da de regreso: (código, tipo de contenido, cuerpo, encabezados extra)"""
+        try:
+            if ruta == "/salud":
+                return 200, "application/json", _json_bytes(self.estadisticas()), {}
+            if ruta != "/detectar":
+                raise ErrorSolicitud(404, f"Ruta desconocida: {ruta}")
+            if metodo_http != "POST":
+                raise ErrorSolicitud(405, "Usar POST con la imagen en el cuerpo")
+            if not cuerpo:
+                raise ErrorSolicitud(400, "Falta la imagen en el cuerpo de la solicitud")
+
+            parametros = leer_parametros(consulta)
+            resultado = await self.detectar(cuerpo, parametros)
+            return _formatear_resultado(resultado, parametros)
+        except ErrorSolicitud as e:
+            extra = {"Retry-After": "1"} if e.codigo == 503 else {}
+            return e.codigo, "application/json", _json_bytes({"error": str(e)}), extra
+        except Exception as e:
+            self._contadores["errores"] += 1
+            return 500, "application/json", _json_bytes({"error": f"{type(e).__name__}: {e}"}), {}
+
+    async def _responder(self, escritor, codigo, contenido, tipo="application/json", extra=None,
+                         cerrar=False):
+        encabezados = [f"HTTP/1.1 {codigo} {_MENSAJES_HTTP.get(codigo, '')}",
+                       f"Content-Type: {tipo}",
+                       f"Content-Length: {len(contenido)}",
+                       f"Connection: {'close' if cerrar else 'keep-alive'}"]
+        encabezados += [f"{clave}: {valor}" for clave, valor in (extra or {}).items()]
+        escritor.write(("\r\n".join(encabezados) + "\r\n\r\n").encode("latin-1") + contenido)
+        await escritor.drain()
+
+
+def _json_bytes(datos) -> bytes:
+    return json.dumps(datos, ensure_ascii=False).encode("utf-8")
+
+
+def _formatear_resultado(resultado: dict, parametros: dict):
+    """Convierte el resultado del pool al formato pedido (json, npy o png)"""
+    matriz = resultado["matriz"]
+    extra = {"X-Segundos": f"{resultado['segundos']:.4f}"}
+    if parametros["formato"] == "png":
+        return 200, "image/png", resultado["png"], extra
+    if parametros["formato"] == "npy":
+        salida = io.BytesIO()
+        np.save(salida, matriz)
+        return 200, "application/octet-stream", salida.getvalue(), extra
+
+    datos = {"matriz": matriz.tolist(),
+             "forma": list(matriz.shape),
+             "pixeles_figura": int(np.sum(matriz)),
+             "cobertura": round(float(np.mean(matriz)) * 100, 2),
+             "segundos": round(resultado["segundos"], 4),
+             "segundos_proceso": round(resultado["segundos_proceso"], 4)}
+    if resultado["png"] is not None:
+        datos["png_base64"] = base64.b64encode(resultado["png"]).decode("ascii")
+    return 200, "application/json", _json_bytes(datos), extra
+
+
+def detectar_remoto(datos: bytes, host: str = "127.0.0.1", puerto: int = 8765, **parametros):
+    """
+    Cliente mínimo (bloqueante) para scripts y pruebas contra el servicio local.
+    Ej.: detectar_remoto(open("gato.jpg", "rb").read(), tamaño=20, render="raster")
+    Da de regreso: (código HTTP, encabezados, cuerpo en bytes)
+    """
+    conexion = http.client.HTTPConnection(host, puerto, timeout=300)
+    try:
+        consulta = urllib.parse.urlencode(parametros)
+        conexion.request("POST", f"/detectar?{consulta}", body=datos,
+                         headers={"Content-Type": "application/octet-stream"})
+        respuesta = conexion.getresponse()
+        return respuesta.status, dict(respuesta.getheaders()), respuesta.read()
+    finally:
+        conexion.close()
+
+
+async def _servir(args):
+    servicio = ServicioFiguras(args.workers, args.concurrencia, args.cola,
+                               int(args.max_mb * 2**20), args.matplotlib)
+    servidor = await servicio.iniciar(args.host, args.puerto, args.unix)
+    donde = args.unix or f"http://{args.host}:{args.puerto}"
+    print(f"Servicio de detección escuchando en {donde} ({servicio.workers} procesos)")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        await servicio.cerrar()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servicio local de detección de figuras")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--unix", help="Escuchar en este socket Unix en lugar de TCP")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Procesos del pool (por defecto, todos los núcleos)")
+    parser.add_argument("--concurrencia", type=int, default=None,
+                        help="Detecciones simultáneas (por defecto, igual a --workers)")
+    parser.add_argument("--cola", type=int, default=64,
+                        help="Solicitudes en espera antes de responder 503")
+    parser.add_argument("--max-mb", dest="max_mb", type=float, default=64,
+                        help="Tamaño máximo de la imagen recibida, en MB")
+    parser.add_argument("--matplotlib", action="store_true",
+                        help="Precargar matplotlib en los procesos (para render=matplotlib)")
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(_servir(args))
+    except KeyboardInterrupt:
+        print("\nServicio detenido.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
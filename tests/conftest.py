@@ -0,0 +1,34 @@
+"""
+Configuración común de las pruebas: los módulos del proyecto están en la raíz
+del repositorio (no es un paquete), así que se agrega al path.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+
+def dibujar_figura(ruta, lado: int = 120, semilla: int = 0, formato: str = None):
+    """Guarda una imagen de fondo blanco con una elipse y un rectángulo de colores"""
+    generador = np.random.default_rng(semilla)
+    img = Image.new("RGB", (lado, lado), (255, 255, 255))
+    dibujo = ImageDraw.Draw(img)
+    x0, y0 = generador.integers(lado // 10, lado // 3, size=2)
+    dibujo.ellipse([x0, y0, x0 + lado // 2, y0 + lado // 2],
+                   fill=tuple(int(v) for v in generador.integers(0, 150, size=3)))
+    dibujo.rectangle([lado // 2, lado // 2, lado * 4 // 5, lado * 9 // 10],
+                     fill=tuple(int(v) for v in generador.integers(50, 200, size=3)))
+    img.save(ruta, format=formato)
+    return ruta
+
+
+@pytest.fixture
+def imagen_figura(tmp_path):
+    """Ruta de una imagen PNG de prueba"""
+    return dibujar_figura(str(tmp_path / "figura.png"))
@@ -0,0 +1,57 @@
+"""barrer_parametros y mapas_metrica dan, combinación por combinación, la misma matriz que detectar_figura_optimizado"""
+import numpy as np
+import pytest
+
+import detector_figuras
+from conftest import dibujar_figura
+
+SENSIBILIDADES = np.linspace(0.1, 1.0, 7)
+UMBRALES = [200, 240, 250]
+FORMAS = [(1, 1), (4, 4), (5, 7), (15, 15), (23, 17)]
+
+
+def _grillas():
+    generador = np.random.default_rng(4321)
+    for filas, columnas in FORMAS:
+        forma = (filas, columnas, 3)
+        yield "aleatoria", generador.integers(0, 256, size=forma, dtype=np.uint8)
+        # Pocos niveles: empates y desviaciones exactamente 0
+        yield "cuantizada", (generador.integers(0, 4, size=forma) * 85).astype(np.uint8)
+        # Alrededor de los umbrales de blanco
+        yield "casi_blanca", generador.integers(195, 256, size=forma, dtype=np.uint8)
+
+
+@pytest.mark.parametrize("metodo", detector_figuras.METODOS_POR_DEFECTO)
+def test_mapas_metrica_igual_a_cada_deteccion(metodo):
+    for tipo, pix in _grillas():
+        capas = detector_figuras.umbralizar_mapas(
+            detector_figuras.mapas_metrica(pix, metodo, UMBRALES), metodo, SENSIBILIDADES)
+        assert capas.shape == (len(UMBRALES), len(SENSIBILIDADES)) + pix.shape[:2]
+        for i, umbral in enumerate(UMBRALES):
+            for j, sensibilidad in enumerate(SENSIBILIDADES):
+                esperado = detector_figuras._detectar_en_pix(pix, metodo, umbral, sensibilidad)
+                assert np.array_equal(capas[i, j], esperado.astype(bool)), \
+                    (tipo, pix.shape, umbral, sensibilidad)
+
+
+@pytest.mark.parametrize("metodo", detector_figuras.METODOS_POR_DEFECTO)
+@pytest.mark.parametrize("tamaño", [10, 15])
+def test_barrer_parametros_igual_a_optimizado(tmp_path, metodo, tamaño):
+    ruta = dibujar_figura(str(tmp_path / "figura.png"), lado=200, semilla=tamaño)
+    barrido = detector_figuras.barrer_parametros(ruta, SENSIBILIDADES, UMBRALES, tamaño, metodo)
+    assert barrido["matrices"].shape == (len(UMBRALES), len(SENSIBILIDADES), tamaño, tamaño)
+    for i, umbral in enumerate(UMBRALES):
+        for j, sensibilidad in enumerate(SENSIBILIDADES):
+            esperado = detector_figuras.detectar_figura_optimizado(
+                ruta, tamaño, metodo, umbral_blanco=umbral, sensibilidad=sensibilidad)
+            assert np.array_equal(barrido["matrices"][i, j], esperado.astype(bool)), (umbral, sensibilidad)
+            assert barrido["cobertura"][i, j] == pytest.approx(esperado.mean())
+    sugerencia = barrido["sugerencia"]
+    assert sugerencia["umbral_blanco"] in UMBRALES
+    assert any(np.isclose(sugerencia["sensibilidad"], SENSIBILIDADES))
+
+
+def test_mapas_metrica_rechaza_metodos_registrados_aparte():
+    pix = np.full((3, 3, 3), 255, dtype=np.uint8)
+    with pytest.raises(ValueError):
+        detector_figuras.mapas_metrica(pix, "basico")
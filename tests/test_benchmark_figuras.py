@@ -0,0 +1,63 @@
+"""benchmark_figuras en modo corto: estructura del JSON y detección de regresiones"""
+import json
+
+import pytest
+
+import benchmark_figuras
+import detector_figuras
+
+
+@pytest.fixture(scope="module")
+def corrida_corta():
+    return benchmark_figuras.ejecutar(corto=True, repeticiones=1, etapas=True)
+
+
+def test_casos_del_modo_corto(corrida_corta):
+    casos = corrida_corta["casos"]
+    ancho, alto = benchmark_figuras.RESOLUCIONES[0]
+    for metodo in detector_figuras.METODOS_POR_DEFECTO:
+        for tamaño in benchmark_figuras.TAMAÑOS[:2]:
+            for sensibilidad in benchmark_figuras.SENSIBILIDADES:
+                nombre = f"detectar/{metodo}/{ancho}x{alto}/t{tamaño}/s{sensibilidad}"
+                assert nombre in casos
+                assert "decodificar" in casos[nombre]["etapas"]
+    assert not any(f"{ancho}x{alto}" in n for n in casos for ancho, alto in benchmark_figuras.RESOLUCIONES[1:])
+    for medicion in casos.values():
+        assert medicion["min_s"] <= medicion["mediana_s"]
+        assert medicion["repeticiones"] >= 1
+    assert corrida_corta["entorno"]["corto"] is True
+    # Sin --memoria no se usa tracemalloc
+    etapas = next(iter(casos.values()))["etapas"]
+    assert all(datos["memoria_pico_bytes"] is None for datos in etapas.values())
+
+
+def test_comparar_marca_solo_las_regresiones():
+    base = {"casos": {"a": {"mediana_s": 1.0}, "b": {"mediana_s": 1.0}, "c": {"mediana_s": 0.0}}}
+    actual = {"casos": {"a": {"mediana_s": 1.1}, "b": {"mediana_s": 1.5}, "c": {"mediana_s": 1.0},
+                        "nuevo": {"mediana_s": 9.0}}}
+    regresiones = benchmark_figuras.comparar(actual, base, tolerancia=0.2)
+    assert [r[0] for r in regresiones] == ["b"]
+    assert regresiones[0][3] == pytest.approx(0.5)
+
+
+def test_main_compara_con_la_corrida_anterior(tmp_path, monkeypatch, corrida_corta, capsys):
+    monkeypatch.setattr(benchmark_figuras, "ejecutar", lambda *args, **kwargs: corrida_corta)
+    base = str(tmp_path / "base.json")
+    assert benchmark_figuras.main(["--corto", "--salida", base]) == 0
+    with open(base, encoding="utf-8") as archivo:
+        assert json.load(archivo)["casos"].keys() == corrida_corta["casos"].keys()
+
+    assert benchmark_figuras.main(["--corto", "--salida", str(tmp_path / "igual.json"),
+                                   "--comparar", base]) == 0
+    assert "Sin regresiones." in capsys.readouterr().out
+
+    # Una base el doble de rápida: todo es regresión
+    with open(base, encoding="utf-8") as archivo:
+        rapida = json.load(archivo)
+    for medicion in rapida["casos"].values():
+        medicion["mediana_s"] /= 2
+    with open(base, "w", encoding="utf-8") as archivo:
+        json.dump(rapida, archivo)
+    assert benchmark_figuras.main(["--corto", "--salida", str(tmp_path / "nuevo.json"),
+                                   "--comparar", base]) == 1
+    assert "REGRESIÓN" in capsys.readouterr().out
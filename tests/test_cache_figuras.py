@@ -0,0 +1,125 @@
+"""PNG de CacheFiguras y registro de aciertos"""
+import numpy as np
+import pytest
+
+import detector_figuras
+from cache_figuras import CacheFiguras
+
+
+def test_png_deteccion_es_el_de_png_resultado_y_no_imprime(tmp_path, imagen_figura, capsys):
+    cache = CacheFiguras(str(tmp_path / "cache"))
+
+    datos = cache.png_deteccion(imagen_figura, 12, renderizador="matplotlib")
+
+    assert capsys.readouterr().out == ""
+    matriz = cache.detectar(imagen_figura, 12)
+    esperado = detector_figuras.png_resultado(matriz, "Detección - contraste_mejorado",
+                                              imagen_figura, "matplotlib", dpi=300)
+    assert datos == esperado
+    assert cache.png_deteccion(imagen_figura, 12, renderizador="matplotlib") == datos
+    assert cache.aciertos >= 1
+
+
+def test_png_deteccion_renderizador_desconocido(tmp_path, imagen_figura):
+    with pytest.raises(ValueError):
+        CacheFiguras(str(tmp_path / "cache")).png_deteccion(imagen_figura, 12, renderizador="svg")
+
+
+def test_png_coloreado_vacio_no_se_guarda(tmp_path):
+    import coloreado_figuras
+    cache = CacheFiguras(str(tmp_path / "cache"))
+    conversor = coloreado_figuras.MatrizAImagen()
+    matriz = np.array([[1, 2], [0, 3]])
+
+    # convertir_matriz solo imprime los errores al guardar: simula uno
+    conversor.convertir_matriz = lambda *args, **kwargs: None
+    with pytest.raises(ValueError):
+        cache.png_coloreado(matriz, modo="raster", conversor=conversor)
+    assert cache.estadisticas()["entradas"] == 0
+
+    datos = cache.png_coloreado(matriz, modo="raster")
+    assert datos.startswith(b"\x89PNG")
+    assert cache.png_coloreado(matriz, modo="raster") == datos
+
+
+def _contador(carpeta, nombre):
+    import sqlite3
+    conexion = sqlite3.connect(str(carpeta / "indice.sqlite"))
+    try:
+        fila = conexion.execute("SELECT valor FROM contadores WHERE nombre = ?", (nombre,)).fetchone()
+    finally:
+        conexion.close()
+    return fila[0] if fila else 0
+
+
+def test_aciertos_se_escriben_juntos(tmp_path, monkeypatch):
+    import cache_figuras
+    monkeypatch.setattr(cache_figuras, "SEGUNDOS_PENDIENTES", 3600)
+    carpeta = tmp_path / "cache"
+    cache = CacheFiguras(str(carpeta))
+    cache.guardar("a", b"datos")
+    sentencias = []
+    cache._conectar().set_trace_callback(sentencias.append)
+
+    for _ in range(10):
+        assert cache.obtener("a") == b"datos"
+
+    assert all(s.lstrip().upper().startswith("SELECT") for s in sentencias)
+    assert _contador(carpeta, "aciertos") == 0
+    assert cache.estadisticas()["aciertos_totales"] == 10
+    assert _contador(carpeta, "aciertos") == 10
+
+    for _ in range(cache_figuras.MAX_PENDIENTES):
+        cache.obtener("a")
+    assert _contador(carpeta, "aciertos") == 10 + cache_figuras.MAX_PENDIENTES
+
+
+def test_aciertos_pendientes_cuentan_para_el_desalojo(tmp_path, monkeypatch):
+    import cache_figuras
+    monkeypatch.setattr(cache_figuras, "SEGUNDOS_PENDIENTES", 3600)
+    cache = CacheFiguras(str(tmp_path / "cache"), max_mb=25 / 2**20)
+    cache.guardar("vieja", b"x" * 10)
+    cache.guardar("nueva", b"x" * 10)
+    assert cache.obtener("vieja") is not None
+
+    cache.guardar("otra", b"x" * 10)
+
+    assert cache.obtener("vieja") is not None
+    assert cache.obtener("nueva") is None
+
+
+def test_aciertos_de_los_workers_se_escriben_al_terminar(tmp_path):
+    import lote_figuras
+    from conftest import dibujar_figura
+    entrada = tmp_path / "imgs"
+    entrada.mkdir()
+    for i in range(3):
+        dibujar_figura(str(entrada / f"f{i}.png"), semilla=i)
+    rutas = lote_figuras.listar_imagenes(str(entrada))
+    carpeta = str(tmp_path / "cache")
+
+    lote_figuras.procesar_lote(rutas, str(tmp_path / "out1"), tamaño=12, workers=2,
+                               carpeta_cache=carpeta)
+    manifiesto = lote_figuras.procesar_lote(rutas, str(tmp_path / "out2"), tamaño=12, workers=2,
+                                            carpeta_cache=carpeta)
+
+    assert manifiesto["cache"]["aciertos"] == 3
+    assert manifiesto["cache"]["aciertos_totales"] == 3
+    assert manifiesto["cache"]["fallos_totales"] == 3
+
+
+@pytest.mark.parametrize("sin_cache", [False, True])
+def test_desactivada_no_toca_el_disco(tmp_path, monkeypatch, imagen_figura, sin_cache):
+    carpeta = tmp_path / "cache"
+    if sin_cache:
+        monkeypatch.setenv("FIGURAS_SIN_CACHE", "1")
+    cache = CacheFiguras(str(carpeta), activa=sin_cache)
+    assert not cache.activa
+    matriz = cache.detectar(imagen_figura, 10)
+    assert np.array_equal(matriz, detector_figuras.detectar_figura_optimizado(imagen_figura, 10))
+    estadisticas = cache.estadisticas()
+    assert estadisticas["activa"] is False
+    assert estadisticas["entradas"] == estadisticas["bytes"] == 0
+    assert estadisticas["aciertos_totales"] == estadisticas["fallos_totales"] == 0
+    cache.cerrar()
+    assert not carpeta.exists()
@@ -0,0 +1,42 @@
+"""La carga rápida (rapido=True) queda dentro de la cota documentada frente a la carga normal"""
+import numpy as np
+import pytest
+
+import detector_figuras
+from conftest import dibujar_figura
+
+
+@pytest.fixture(scope="module", params=[("JPEG", "jpg"), ("PNG", "png")], ids=["jpeg", "png"])
+def foto_grande(request, tmp_path_factory):
+    formato, extension = request.param
+    ruta = tmp_path_factory.mktemp("rapida") / f"figura.{extension}"
+    return dibujar_figura(str(ruta), lado=2000, semilla=3, formato=formato)
+
+
+@pytest.mark.parametrize("tamaño", [10, 15, 37])
+def test_imagen_reducida_dentro_de_la_cota(foto_grande, tamaño):
+    normal = detector_figuras._cargar_imagen(foto_grande, tamaño)
+    rapida = detector_figuras._cargar_imagen(foto_grande, tamaño, rapido=True)
+    assert rapida.shape == normal.shape == (tamaño, tamaño, 3)
+    assert rapida.dtype == np.uint8
+    assert np.abs(rapida.astype(int) - normal.astype(int)).max() <= 3
+
+
+@pytest.mark.parametrize("metodo", detector_figuras.METODOS_POR_DEFECTO)
+@pytest.mark.parametrize("tamaño", [10, 15, 37])
+def test_deteccion_rapida_igual_a_optimizado(foto_grande, metodo, tamaño):
+    esperado = detector_figuras.detectar_figura_optimizado(foto_grande, tamaño, metodo)
+    rapido = detector_figuras.detectar_figura_optimizado(foto_grande, tamaño, metodo, rapido=True)
+    # Solo pueden cambiar celdas justo en el límite del umbral
+    assert (rapido != esperado).sum() <= max(1, tamaño * tamaño // 100)
+
+
+@pytest.mark.parametrize("metodo", detector_figuras.METODOS_POR_DEFECTO)
+@pytest.mark.parametrize("tamaño", [10, 15])
+def test_png_chico_identico(tmp_path, metodo, tamaño):
+    # Sin draft (no es JPEG) y sin espacio para Image.reduce: el resultado es el mismo
+    ruta = dibujar_figura(str(tmp_path / "figura.png"), lado=200, semilla=tamaño)
+    esperado = detector_figuras.detectar_figura_optimizado(ruta, tamaño, metodo)
+    rapido = detector_figuras.detectar_figura_optimizado(ruta, tamaño, metodo, rapido=True)
+    assert np.array_equal(rapido, esperado)
+
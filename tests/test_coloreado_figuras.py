@@ -0,0 +1,95 @@
+"""Lectura de matrices del coloreador: texto copiado, arrays y archivos"""
+import numpy as np
+import pytest
+
+from coloreado_figuras import MatrizAImagen
+
+ESPERADA = [[1, 2, 0], [3, 4, 5]]
+
+
+@pytest.fixture
+def conversor():
+    return MatrizAImagen()
+
+
+@pytest.mark.parametrize("texto", [
+    "[1, 2, 0]\n[3, 4, 5]",
+    "[[1, 2, 0], [3, 4, 5]]",
+    "[[1 2 0]\n [3 4 5]]",
+    "array([[1, 2, 0],\n       [3, 4, 5]])",
+    "1, 2, 0\n3, 4, 5",
+    "1 2 0\n3 4 5\n",
+    "[1 2 0\n3 4 5]",
+    "Matriz:\n[1, 2, 0]\n[3, 4, 5]\nfin",
+])
+def test_formatos_de_texto(conversor, texto):
+    matriz = conversor.parsear_matriz(texto)
+    assert matriz.tolist() == ESPERADA
+    assert matriz.dtype == np.uint8
+
+
+def test_fila_larga_partida_por_numpy(conversor):
+    matriz = np.arange(40).reshape(2, 20)
+    assert np.array_equal(conversor.parsear_matriz(np.array2string(matriz, max_line_width=30)), matriz)
+
+
+@pytest.mark.parametrize("texto, mensaje", [
+    ("[[1, 2], [3, 4, 5]]", "fila 2 tiene 3 valores"),
+    ("1 2\n3", "fila 2 tiene 1 valores"),
+    ("[1, -2]\n[3, 4]", "Valor negativo -2 en la fila 1, columna 2"),
+    ("[1, 2.5]", "enteros"),
+    ("[[1, 2]", "'\\[' sin su '\\]'"),
+    ("[1, 2]]", "'\\]' sin su '\\['"),
+    ("", "No se pudo parsear"),
+])
+def test_errores_claros(conversor, texto, mensaje):
+    with pytest.raises(ValueError, match=mensaje):
+        conversor.parsear_matriz(texto)
+
+
+def test_tipo_segun_el_maximo(conversor):
+    assert conversor.parsear_matriz("[0, 255]").dtype == np.uint8
+    assert conversor.parsear_matriz("[0, 256]").dtype == np.uint16
+
+
+@pytest.mark.parametrize("entrada", [
+    np.array(ESPERADA),
+    np.array(ESPERADA, dtype=np.float64),
+    "[1, 2, 0]\n[3, 4, 5]",
+])
+def test_cargar_matriz_en_memoria(conversor, entrada):
+    assert conversor.cargar_matriz(entrada).tolist() == ESPERADA
+
+
+def test_cargar_matriz_booleana_sin_copia(conversor):
+    mascara = np.array([[True, False], [False, True]])
+    matriz = conversor.cargar_matriz(mascara)
+    assert matriz.dtype == np.uint8 and np.shares_memory(matriz, mascara)
+
+
+@pytest.mark.parametrize("entrada, mensaje", [
+    (np.zeros((2, 2, 2)), "2D"),
+    (np.array([[0.5, 1.0]]), "enteros"),
+    (np.array([[1, -1]]), "negativo"),
+])
+def test_cargar_matriz_invalida(conversor, entrada, mensaje):
+    with pytest.raises(ValueError, match=mensaje):
+        conversor.cargar_matriz(entrada)
+
+
+@pytest.mark.parametrize("extension", [".npy", ".csv", ".txt", ".json", ".fig"])
+def test_ida_y_vuelta_por_archivo(conversor, tmp_path, extension):
+    matriz = np.array(ESPERADA, dtype=np.uint8)
+    ruta = conversor.guardar_matriz(matriz, str(tmp_path / f"m{extension}"))
+    leida = conversor.cargar_matriz(ruta)
+    assert np.array_equal(leida, matriz)
+
+
+def test_csv_escrito_a_mano(conversor, tmp_path):
+    ruta = tmp_path / "m.csv"
+    ruta.write_text("1,2,0\n3,4,5\n")
+    assert conversor.cargar_matriz(str(ruta)).tolist() == ESPERADA
+    ruta.write_text("1,2\n3,x\n")
+    with pytest.raises(ValueError, match="CSV"):
+        conversor.cargar_matriz(str(ruta))
+
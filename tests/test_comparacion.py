@@ -0,0 +1,80 @@
+"""El montaje de comparar_metodos y renderizar_comparacion junta los paneles de cada resultado sin cambiarlos"""
+import numpy as np
+import pytest
+from PIL import Image
+
+import detector_figuras
+from componentes_figuras import postprocesar
+from conftest import dibujar_figura
+
+MARGEN = 20
+ALTO_TITULO = 56
+
+
+def _panel_en(imagen, panel, x, y):
+    recorte = imagen.crop((x, y, x + panel.width, y + panel.height))
+    return np.array_equal(np.asarray(recorte), np.asarray(panel))
+
+
+@pytest.fixture
+def imagen(tmp_path):
+    return dibujar_figura(str(tmp_path / "figura.png"), lado=300, semilla=4)
+
+
+@pytest.mark.parametrize("workers", [None, 1])
+def test_comparar_metodos_igual_a_optimizado(imagen, tmp_path, workers):
+    ruta_salida = str(tmp_path / "comparacion.png")
+    resultado = detector_figuras.comparar_metodos(imagen, 12, ruta_salida=ruta_salida, workers=workers)
+    metodos = list(detector_figuras.METODOS_POR_DEFECTO)
+    assert list(resultado["matrices"]) == metodos
+    for metodo in metodos:
+        esperado = detector_figuras.detectar_figura_optimizado(imagen, 12, metodo)
+        assert np.array_equal(resultado["matrices"][metodo], esperado), metodo
+        assert resultado["cobertura"][metodo] == pytest.approx(esperado.mean() * 100)
+        assert resultado["tiempos"][metodo] >= 0
+
+    # Cuatro métodos: grilla de 2x2 con los paneles de renderizar_resultado_raster y su nota
+    montaje = resultado["imagen"]
+    paneles = [detector_figuras.renderizar_resultado_raster(
+        resultado["matrices"][m], f"Método: {m}", "figura.png", tamaño_celda=480 // 12)
+        for m in metodos]
+    ancho, alto = paneles[0].size
+    assert montaje.size == (2 * (ancho + MARGEN) + MARGEN, ALTO_TITULO + 2 * (alto + 24 + MARGEN))
+    for k, panel in enumerate(paneles):
+        fila, columna = divmod(k, 2)
+        x = MARGEN + columna * (ancho + MARGEN)
+        y = ALTO_TITULO + fila * (alto + 24 + MARGEN)
+        assert _panel_en(montaje, panel, x, y), metodos[k]
+    with Image.open(ruta_salida) as guardada:
+        assert np.array_equal(np.asarray(guardada), np.asarray(montaje))
+
+
+def test_comparar_metodos_subconjunto_y_limpieza(imagen):
+    opciones = {"area_minima": 3, "rellenar": True}
+    resultado = detector_figuras.comparar_metodos(imagen, 15, metodos=["bordes_combinados", "basico"],
+                                                  postproceso=opciones)
+    assert list(resultado["matrices"]) == ["bordes_combinados", "basico"]
+    for metodo, matriz in resultado["matrices"].items():
+        esperado = postprocesar(detector_figuras.detectar_figura_optimizado(imagen, 15, metodo),
+                                **opciones)
+        assert np.array_equal(matriz, esperado), metodo
+    with pytest.raises(ValueError):
+        detector_figuras.comparar_metodos(imagen, 15, metodos=["inexistente"])
+
+
+def test_renderizar_comparacion_en_una_fila(imagen, tmp_path):
+    ruta_salida = str(tmp_path / "tamaños.png")
+    matrices = detector_figuras.detectar_multiples_tamaños(imagen, [8, 15, 20], exacto=True,
+                                                           ruta_comparacion=ruta_salida)
+    montaje = detector_figuras.renderizar_comparacion(matrices, "Comparación de tamaños - contraste_mejorado",
+                                                      imagen)
+    with Image.open(ruta_salida) as guardada:
+        assert np.array_equal(np.asarray(guardada), np.asarray(montaje))
+
+    x = MARGEN
+    for tamaño, matriz in matrices.items():
+        panel = detector_figuras.renderizar_resultado_raster(
+            matriz, f"Tamaño {tamaño}x{tamaño}", imagen, tamaño_celda=480 // tamaño)
+        assert _panel_en(montaje, panel, x, ALTO_TITULO), tamaño
+        x += panel.width + MARGEN
+    assert montaje.width == x
@@ -0,0 +1,51 @@
+"""La versión vectorizada de contraste_mejorado da la misma matriz que la original celda por celda"""
+import numpy as np
+import pytest
+
+import detector_figuras
+
+SENSIBILIDADES = [0.1, 0.35, 0.8, 1.0]
+FORMAS = [(1, 1), (2, 3), (4, 4), (5, 7), (15, 15), (23, 17)]
+
+
+def _grillas():
+    generador = np.random.default_rng(1234)
+    for filas, columnas in FORMAS:
+        forma = (filas, columnas, 3)
+        # Valores cualesquiera
+        yield "aleatoria", generador.integers(0, 256, size=forma, dtype=np.uint8)
+        # Pocos niveles: muchas ventanas con desviación exactamente 0 o empates
+        yield "cuantizada", (generador.integers(0, 4, size=forma) * 85).astype(np.uint8)
+        # Casi blanca: valores alrededor del umbral de blanco
+        yield "casi_blanca", generador.integers(230, 256, size=forma, dtype=np.uint8)
+
+
+@pytest.mark.parametrize("sensibilidad", SENSIBILIDADES)
+@pytest.mark.parametrize("umbral_blanco", [200, 240])
+def test_vectorizado_igual_al_bucle(sensibilidad, umbral_blanco):
+    for tipo, pix in _grillas():
+        esperado = detector_figuras._detectar_por_contraste_mejorado_bucle(
+            pix, umbral_blanco, sensibilidad)
+        obtenido = detector_figuras._detectar_por_contraste_mejorado(
+            pix, umbral_blanco, sensibilidad)
+        assert np.array_equal(obtenido, esperado), (tipo, pix.shape)
+
+
+def test_bloques_pequeños_no_cambian_el_resultado():
+    generador = np.random.default_rng(7)
+    pix = generador.integers(0, 256, size=(20, 20, 3), dtype=np.uint8)
+    completo = detector_figuras._detectar_por_contraste_mejorado(pix, 240, 0.8)
+    for bloque in (1, 7, 64):
+        por_bloques = detector_figuras._detectar_por_contraste_mejorado(pix, 240, 0.8, bloque=bloque)
+        assert np.array_equal(por_bloques, completo)
+
+
+def test_mapas_contraste_con_celdas_igual_a_completo():
+    generador = np.random.default_rng(3)
+    pix = generador.integers(0, 256, size=(12, 9, 3), dtype=np.uint8)
+    celdas = generador.random((12, 9)) < 0.3
+    std_completo, diferencia_completa = detector_figuras._mapas_contraste(pix)
+    std_parcial, diferencia_parcial = detector_figuras._mapas_contraste(pix, celdas=celdas)
+    assert np.array_equal(std_parcial[celdas], std_completo[celdas])
+    assert np.array_equal(diferencia_parcial[celdas], diferencia_completa[celdas])
+    assert not std_parcial[~celdas].any() and not diferencia_parcial[~celdas].any()
@@ -0,0 +1,124 @@
+"""El editor del coloreador pinta, deshace y exporta la matriz, y lo pintado llega a la pantalla"""
+import numpy as np
+import pytest
+
+pytest.importorskip("matplotlib")
+from matplotlib.backend_bases import KeyEvent, MouseEvent
+
+from coloreado_figuras import MatrizAImagen
+from graficos import obtener_pyplot
+
+
+@pytest.fixture
+def editor():
+    conversor = MatrizAImagen()
+    original = np.zeros((12, 16), dtype=np.uint8)
+    editor = conversor.editar_matriz(original, mostrar_imagen=False)
+    editor.figura.canvas.draw()  # guarda la pantalla para el blitting
+    editor.original = original
+    yield editor
+    obtener_pyplot().close(editor.figura)
+
+
+def _posicion(ax, fila, columna):
+    return ax.transData.transform((columna, fila))
+
+
+def _raton(editor, nombre, fila, columna, boton=1, ax=None):
+    x, y = _posicion(ax or editor.ax, fila, columna)
+    canvas = editor.figura.canvas
+    canvas.callbacks.process(nombre, MouseEvent(nombre, canvas, x, y, button=boton))
+
+
+def _tecla(editor, tecla):
+    canvas = editor.figura.canvas
+    canvas.callbacks.process("key_press_event", KeyEvent("key_press_event", canvas, tecla))
+
+
+def _color_en_pantalla(editor, fila, columna):
+    canvas = editor.figura.canvas
+    x, y = _posicion(editor.ax, fila, columna)
+    buffer = np.asarray(canvas.buffer_rgba())
+    return tuple(buffer[buffer.shape[0] - int(round(y)), int(round(x)), :3])
+
+
+def test_arrastrar_pinta_la_linea_y_deshacer(editor):
+    assert editor._fondo is not None
+    _raton(editor, "button_press_event", 2, 3)
+    _raton(editor, "motion_notify_event", 2, 9)  # salta celdas: se completa la línea
+    _raton(editor, "motion_notify_event", 6, 9)
+    _raton(editor, "button_release_event", 6, 9)
+    esperado = np.zeros((12, 16), dtype=np.uint8)
+    esperado[2, 3:10] = 1
+    esperado[2:7, 9] = 1
+    assert np.array_equal(editor.matriz, esperado)
+    assert not editor.original.any()  # el editor trabaja sobre una copia
+
+    # Lo pintado se copió a la pantalla (blitting), sin redibujar todo
+    color_uno = tuple(int(c) for c in editor._rgb[1])
+    color_cero = tuple(int(c) for c in editor._rgb[0])
+    assert _color_en_pantalla(editor, 2, 5) == color_uno
+    assert _color_en_pantalla(editor, 4, 9) == color_uno
+    assert _color_en_pantalla(editor, 8, 2) == color_cero
+
+    _tecla(editor, "u")
+    assert not editor.matriz.any()
+    assert _color_en_pantalla(editor, 2, 5) == color_cero
+    _tecla(editor, "u")  # sin historial: no hace nada
+    assert not editor.matriz.any()
+
+
+def test_valor_elegido_y_boton_derecho(editor):
+    _tecla(editor, "3")
+    assert editor.valor == 3
+    _raton(editor, "button_press_event", 0, 0)
+    _raton(editor, "button_release_event", 0, 0)
+    assert editor.matriz[0, 0] == 3
+
+    # Clic en la paleta elige el valor
+    _raton(editor, "button_press_event", 0, 7, ax=editor.ax_paleta)
+    assert editor.valor == 7
+    _raton(editor, "button_press_event", 5, 5)
+    _raton(editor, "button_release_event", 5, 5)
+    assert editor.matriz[5, 5] == 7
+
+    # Clic derecho borra (pinta 0)
+    _raton(editor, "button_press_event", 0, 0, boton=3)
+    _raton(editor, "button_release_event", 0, 0, boton=3)
+    assert editor.matriz[0, 0] == 0
+    _tecla(editor, "u")
+    assert editor.matriz[0, 0] == 3
+    assert editor._describir_celda(5, 5) == "fila 5, columna 5: 7"
+    assert editor._describir_celda(99, 99) == ""
+
+
+def test_pintar_valor_grande_cambia_el_tipo(editor):
+    editor.pintar([1], [1], 300)
+    assert editor.matriz[1, 1] == 300
+    assert np.iinfo(editor.matriz.dtype).max >= 300
+
+
+def test_exportar(editor, tmp_path, capsys):
+    editor.pintar([0, 1], [0, 1], 2)
+    ruta = str(tmp_path / "editada.npy")
+    assert editor.exportar(ruta) == ruta
+    assert np.array_equal(np.load(ruta), editor.matriz)
+
+    pila = str(tmp_path / "editadas.figs")
+    assert editor.exportar(pila) == f"{pila}#0"
+    assert np.array_equal(editor.conversor.cargar_matriz(f"{pila}#0"), editor.matriz)
+
+    capsys.readouterr()
+    assert editor.exportar() is None  # sin ruta: se imprime
+    salida = capsys.readouterr().out
+    assert salida.splitlines()[0] == "[2, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]"
+
+    editor.guardar_como = str(tmp_path / "tecla.txt")
+    _tecla(editor, "e")
+    assert np.array_equal(editor.conversor.cargar_matriz(editor.guardar_como), editor.matriz)
+
+
+def test_paleta_desconocida():
+    with pytest.raises(ValueError):
+        MatrizAImagen().editar_matriz(np.zeros((2, 2), dtype=np.uint8), paleta="inexistente",
+                                      mostrar_imagen=False)
@@ -0,0 +1,145 @@
+"""Ida y vuelta del formato compacto: .fig, pilas .figs y "pila.figs#n" en el coloreador"""
+import os
+
+import numpy as np
+import pytest
+
+import formato_figuras
+from coloreado_figuras import MatrizAImagen
+from formato_figuras import PilaMatrices
+
+
+def _matrices():
+    generador = np.random.default_rng(17)
+    yield "binaria", (generador.random((23, 17)) < 0.3).astype(np.uint8)
+    yield "paleta", generador.integers(0, 256, size=(9, 31), dtype=np.uint8)
+    yield "una_celda", np.ones((1, 1), dtype=np.uint8)
+    # Bloques grandes de un mismo valor: "auto" elige RLE
+    tramos = np.zeros((64, 64), dtype=np.uint8)
+    tramos[10:40, 5:60] = 1
+    yield "tramos", tramos
+    yield "tramos_paleta", tramos * 7
+    yield "vacia", np.zeros((0, 5), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("rle", [False, True, "auto"])
+def test_codificar_y_decodificar(rle):
+    for nombre, matriz in _matrices():
+        tipo, con_rle, datos = formato_figuras.codificar(matriz, rle)
+        assert tipo == (formato_figuras.TIPO_UINT8 if matriz.size and matriz.max() > 1
+                        else formato_figuras.TIPO_BITS), nombre
+        if rle != "auto":
+            assert con_rle is rle
+        obtenida = formato_figuras.decodificar(datos, *matriz.shape, tipo, con_rle)
+        assert obtenida.dtype == np.uint8
+        assert np.array_equal(obtenida, matriz), nombre
+
+
+def test_auto_elige_lo_mas_chico():
+    for nombre, matriz in _matrices():
+        _, _, auto = formato_figuras.codificar(matriz, "auto")
+        _, _, directo = formato_figuras.codificar(matriz, False)
+        _, _, por_tramos = formato_figuras.codificar(matriz, True)
+        assert len(auto) == min(len(directo), len(por_tramos)), nombre
+    _, _, binaria = formato_figuras.codificar(np.ones((8, 8), dtype=np.int64), False)
+    assert len(binaria) == 8  # 1 bit por celda
+
+
+@pytest.mark.parametrize("rle", [False, True, "auto"])
+def test_archivo_fig(tmp_path, rle):
+    for nombre, matriz in _matrices():
+        ruta = str(tmp_path / f"{nombre}.fig")
+        formato_figuras.escribir_matriz(ruta, matriz.astype(np.int64), rle)
+        assert formato_figuras.es_archivo_compacto(ruta)
+        leida = formato_figuras.leer_matriz(ruta)
+        assert leida.dtype == np.uint8 and np.array_equal(leida, matriz), nombre
+    assert not [n for n in os.listdir(tmp_path) if n.startswith(".tmp_")]
+
+
+def test_valores_invalidos(tmp_path):
+    with pytest.raises(ValueError):
+        formato_figuras.escribir_matriz(str(tmp_path / "a.fig"), np.array([[0, 256]]))
+    with pytest.raises(ValueError):
+        formato_figuras.escribir_matriz(str(tmp_path / "a.fig"), np.array([[-1, 0]]))
+    with pytest.raises(ValueError):
+        formato_figuras.escribir_matriz(str(tmp_path / "a.fig"), np.zeros((2, 2, 2)))
+    assert not os.path.exists(tmp_path / "a.fig")
+    (tmp_path / "texto.fig").write_text("[0, 1]")
+    assert not formato_figuras.es_archivo_compacto(str(tmp_path / "texto.fig"))
+    with pytest.raises(ValueError):
+        PilaMatrices(str(tmp_path / "texto.fig"))
+
+
+def test_pila_agregar_leer_y_reabrir(tmp_path):
+    ruta = str(tmp_path / "matrices.figs")
+    matrices = [matriz for _, matriz in _matrices()]
+    with PilaMatrices(ruta, "a") as pila:
+        assert [pila.agregar(m) for m in matrices[:3]] == [0, 1, 2]
+    with PilaMatrices(ruta, "a") as pila:
+        pila.extender(matrices[3:])
+        assert len(pila) == len(matrices)
+
+    with PilaMatrices(ruta) as pila:
+        assert len(pila) == len(matrices)
+        for i, matriz in enumerate(matrices):
+            assert np.array_equal(pila[i], matriz), i
+            assert pila.contar_figura(i) == np.count_nonzero(matriz)
+            info = pila.info(i)
+            assert (info["filas"], info["columnas"]) == matriz.shape
+        assert np.array_equal(pila[-1], matrices[-1])
+        assert all(np.array_equal(a, b) for a, b in zip(pila[1:3], matrices[1:3]))
+        assert all(np.array_equal(a, b) for a, b in zip(pila, matrices))
+        with pytest.raises(ValueError):
+            pila.agregar(matrices[0])
+    for i, matriz in enumerate(matrices):
+        assert np.array_equal(formato_figuras.leer_matriz(ruta, i), matriz)
+
+
+def test_pila_apilar(tmp_path):
+    ruta = str(tmp_path / "mascaras.figs")
+    generador = np.random.default_rng(5)
+    mascaras = (generador.random((6, 12, 10)) < 0.5).astype(np.uint8)
+    with PilaMatrices(ruta, "a") as pila:
+        pila.extender(mascaras)
+        assert np.array_equal(pila.apilar(), mascaras)
+    with PilaMatrices(str(tmp_path / "vacia.figs"), "a") as vacia:
+        assert len(vacia) == 0 and vacia.apilar().shape == (0, 0, 0)
+
+
+def test_pila_reconstruye_el_indice(tmp_path):
+    ruta = str(tmp_path / "matrices.figs")
+    matrices = [matriz for _, matriz in _matrices()]
+    with PilaMatrices(ruta, "a") as pila:
+        pila.extender(matrices)
+    tamaño_completo = os.path.getsize(ruta)
+
+    # Sin índice: se recorre la pila
+    os.remove(ruta + ".idx")
+    with PilaMatrices(ruta) as pila:
+        assert all(np.array_equal(a, b) for a, b in zip(pila, matrices))
+
+    # Un registro a medias al final (corte durante una escritura) se ignora al leer
+    # y se descarta al abrir para agregar
+    with open(ruta, "ab") as archivo:
+        archivo.write(b"RM\x00\x00" + bytes(10))
+    with PilaMatrices(ruta) as pila:
+        assert len(pila) == len(matrices)
+    with PilaMatrices(ruta, "a") as pila:
+        assert os.path.getsize(ruta) == tamaño_completo
+        assert pila.agregar(matrices[0]) == len(matrices)
+    with PilaMatrices(ruta) as pila:
+        assert np.array_equal(pila[len(matrices)], matrices[0])
+
+
+def test_coloreador_pila_con_numero(tmp_path):
+    conversor = MatrizAImagen()
+    ruta = str(tmp_path / "pila.figs")
+    matrices = [np.eye(4, dtype=np.int64), np.arange(12).reshape(3, 4), np.zeros((2, 2), np.int64)]
+    referencias = [conversor.guardar_matriz(m, ruta) for m in matrices]
+    assert referencias == [f"{ruta}#{i}" for i in range(len(matrices))]
+    for referencia, matriz in zip(referencias, matrices):
+        assert np.array_equal(conversor.cargar_matriz(referencia), matriz)
+    # Sin "#n", la primera
+    assert np.array_equal(conversor.cargar_matriz(ruta), matrices[0])
+    assert conversor.guardar_matriz(matrices[1], str(tmp_path / "una.fig")) == str(tmp_path / "una.fig")
+    assert np.array_equal(conversor.cargar_matriz(str(tmp_path / "una.fig")), matrices[1])
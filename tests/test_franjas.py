@@ -0,0 +1,54 @@
+"""La lectura por franjas con poca memoria da lo mismo que la carga normal, dentro de la tolerancia documentada"""
+import warnings
+
+import numpy as np
+import pytest
+
+import detector_figuras
+from conftest import dibujar_figura
+
+# Presupuesto pequeño: franjas de unas 100 filas en una imagen de 1200 px de lado
+MEMORIA_MB = 2
+LADO = 1200
+
+
+@pytest.mark.parametrize("formato,extension", [("BMP", "bmp"), ("TIFF", "tif"),
+                                               ("PNG", "png"), ("JPEG", "jpg")])
+@pytest.mark.parametrize("tamaño", [10, 15, 37])
+def test_franjas_igual_a_optimizado(tmp_path, formato, extension, tamaño):
+    ruta = dibujar_figura(str(tmp_path / f"figura.{extension}"), lado=LADO, semilla=tamaño,
+                          formato=formato)
+    normal = detector_figuras._cargar_imagen(ruta, tamaño)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        por_franjas = detector_figuras._cargar_imagen_por_franjas(ruta, tamaño, MEMORIA_MB)
+    assert por_franjas.shape == normal.shape == (tamaño, tamaño, 3)
+    assert np.abs(por_franjas.astype(int) - normal.astype(int)).max() <= 3
+    
+    for metodo in detector_figuras.METODOS_POR_DEFECTO:
+        esperado = detector_figuras.detectar_figura_optimizado(ruta, tamaño, metodo=metodo)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            obtenido = detector_figuras.detectar_figura_por_franjas(
+                ruta, tamaño, metodo=metodo, memoria_max_mb=MEMORIA_MB)
+        # Solo pueden cambiar celdas justo en el límite del umbral
+        assert (obtenido != esperado).sum() <= max(1, tamaño * tamaño // 100), metodo
+
+
+def test_sin_compresion_no_avisa(tmp_path):
+    ruta = dibujar_figura(str(tmp_path / "figura.bmp"), lado=LADO, formato="BMP")
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", RuntimeWarning)
+        detector_figuras.detectar_figura_por_franjas(ruta, 15, memoria_max_mb=MEMORIA_MB)
+
+
+def test_png_fuera_de_presupuesto_avisa(tmp_path):
+    ruta = dibujar_figura(str(tmp_path / "figura.png"), lado=LADO)
+    with pytest.warns(RuntimeWarning, match="no se puede leer por franjas"):
+        detector_figuras.detectar_figura_por_franjas(ruta, 15, memoria_max_mb=MEMORIA_MB)
+
+
+def test_metodo_invalido_antes_de_abrir(tmp_path):
+    with pytest.raises(ValueError):
+        detector_figuras.detectar_figura_por_franjas(str(tmp_path / "no_existe.tif"), 15,
+                                                     metodo="inexistente")
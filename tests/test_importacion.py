@@ -0,0 +1,38 @@
+"""El camino de detección, del render raster y de lectura de matrices no importa matplotlib ni scipy"""
+import os
+import subprocess
+import sys
+
+from conftest import RAIZ
+
+_CODIGO = """
+import sys
+import detector_figuras
+import coloreado_figuras
+
+resultados = detector_figuras.detectar_todos_metodos(sys.argv[1], tamaño=12)
+detector_figuras.detectar_figura_optimizado(sys.argv[1], 12, rapido=True)
+detector_figuras.renderizar_resultado_raster(resultados["contraste_mejorado"], mostrar_numeros=True)
+assert detector_figuras.cargar_fuente(14) is detector_figuras.cargar_fuente(14)
+matriz = coloreado_figuras.MatrizAImagen().parsear_matriz("[0, 1, 2]\\n[2, 1, 0]")
+assert matriz.shape == (2, 3), matriz.shape
+assert len(resultados) == len(detector_figuras.METODOS_POR_DEFECTO)
+print(" ".join(sorted(m for m in ("matplotlib", "scipy") if m in sys.modules)) or "ninguno")
+"""
+
+
+def test_detectar_renderizar_y_parsear_sin_matplotlib_ni_scipy(imagen_figura):
+    entorno = dict(os.environ, PYTHONPATH=RAIZ)
+    entorno.pop("MPLBACKEND", None)
+    resultado = subprocess.run([sys.executable, "-c", _CODIGO, imagen_figura],
+                               cwd=RAIZ, env=entorno, capture_output=True, text=True, timeout=120)
+    assert resultado.returncode == 0, resultado.stderr
+    assert resultado.stdout.strip().splitlines()[-1] == "ninguno"
+
+
+def test_fuente_de_matplotlib_sin_importarlo():
+    import graficos
+    ruta = graficos._ruta_fuente_matplotlib()
+    if ruta is not None:
+        assert ruta.endswith(os.path.join("mpl-data", "fonts", "ttf", "DejaVuSans-Bold.ttf"))
+        assert os.path.isfile(ruta)
@@ -0,0 +1,44 @@
+"""Medidor mide solo tiempos por defecto; tracemalloc solo se usa con memoria=True"""
+import tracemalloc
+
+import numpy as np
+
+import detector_figuras
+from instrumentacion import Medidor
+
+
+def test_solo_tiempos_por_defecto(imagen_figura):
+    medidor = Medidor()
+    detector_figuras.detectar_figura_optimizado(imagen_figura, 12, medidor=medidor)
+    assert not tracemalloc.is_tracing()
+    etapas = [registro["etapa"] for registro in medidor.registros]
+    assert "decodificar" in etapas and "deteccion:contraste_mejorado" in etapas
+    for registro in medidor.registros:
+        assert registro["segundos"] >= 0
+        assert registro["memoria_pico_bytes"] is None
+    assert all(datos["memoria_pico_bytes"] is None for datos in medidor.resumen().values())
+
+
+def test_memoria_opcional():
+    medidor = Medidor(memoria=True)
+    try:
+        with medidor.etapa("externa"):
+            with medidor.etapa("interna"):
+                bloque = np.ones(2**20, dtype=np.uint8)
+            del bloque
+        assert tracemalloc.is_tracing()
+    finally:
+        medidor.cerrar()
+    assert not tracemalloc.is_tracing()
+    picos = {registro["etapa"]: registro["memoria_pico_bytes"] for registro in medidor.registros}
+    assert picos["interna"] >= 2**20
+    assert picos["externa"] >= picos["interna"]
+
+
+def test_registros_al_callback():
+    recibidos = []
+    medidor = Medidor(callback=recibidos.append)
+    with medidor.etapa("prueba", tamaño=5):
+        pass
+    assert recibidos == medidor.registros
+    assert recibidos[0]["etapa"] == "prueba" and recibidos[0]["tamaño"] == 5
@@ -0,0 +1,62 @@
+"""Nombres de salida y manifiesto de lote_figuras"""
+import json
+import os
+
+import numpy as np
+
+import lote_figuras
+from conftest import dibujar_figura
+
+
+def test_misma_base_con_distinta_extension_no_se_pisan(tmp_path):
+    entrada = tmp_path / "imgs"
+    entrada.mkdir()
+    dibujar_figura(str(entrada / "f0.jpg"), semilla=1)
+    dibujar_figura(str(entrada / "f0.png"), semilla=2)
+    salida = tmp_path / "out"
+
+    manifiesto = lote_figuras.procesar_lote(lote_figuras.listar_imagenes(str(entrada)),
+                                            str(salida), tamaño=12, workers=1)
+
+    salidas = [registro["salida"] for registro in manifiesto["resultados"]]
+    assert manifiesto["correctas"] == 2
+    assert sorted(os.path.basename(ruta) for ruta in salidas) == ["f0.jpg.txt", "f0.png.txt"]
+    assert all(os.path.isfile(ruta) for ruta in salidas)
+
+
+def test_subcarpetas_de_un_glob_recursivo(tmp_path):
+    for carpeta in ("a", "b"):
+        (tmp_path / "imgs" / carpeta).mkdir(parents=True)
+        dibujar_figura(str(tmp_path / "imgs" / carpeta / "f0.png"))
+    salida = tmp_path / "out"
+
+    rutas = lote_figuras.listar_imagenes(str(tmp_path / "imgs" / "**" / "*.png"))
+    manifiesto = lote_figuras.procesar_lote(rutas, str(salida), tamaño=12, workers=1, formato="npy")
+
+    assert manifiesto["correctas"] == 2
+    assert (salida / "a" / "f0.png.npy").is_file() and (salida / "b" / "f0.png.npy").is_file()
+    guardado = json.loads((salida / "manifiesto.json").read_text(encoding="utf-8"))
+    assert len({registro["salida"] for registro in guardado["resultados"]}) == 2
+
+
+def test_escribir_resultado_formatos(tmp_path):
+    matriz = np.eye(4, dtype=np.uint8)
+    for formato in ("txt", "csv", "json", "npy", "fig"):
+        ruta = lote_figuras.escribir_resultado(matriz, "x/gato.png", str(tmp_path), formato)
+        assert ruta == os.path.join(str(tmp_path), "gato.png." + formato)
+        assert os.path.getsize(ruta) > 0
+    assert not [nombre for nombre in os.listdir(tmp_path) if nombre.startswith(".tmp_")]
+
+
+def test_componentes_solo_con_postproceso(tmp_path):
+    entrada = tmp_path / "imgs"
+    entrada.mkdir()
+    dibujar_figura(str(entrada / "f0.png"))
+    rutas = lote_figuras.listar_imagenes(str(entrada))
+
+    sin_limpieza = lote_figuras.procesar_lote(rutas, str(tmp_path / "a"), tamaño=12, workers=1)
+    con_limpieza = lote_figuras.procesar_lote(rutas, str(tmp_path / "b"), tamaño=12, workers=1,
+                                              postproceso={"area_minima": 2})
+
+    assert "componentes" not in sin_limpieza["resultados"][0]
+    assert con_limpieza["resultados"][0]["componentes"] >= 1
@@ -0,0 +1,67 @@
+"""
+Pico de memoria de los intermedios calculados en el lugar, medido con tracemalloc.
+
+Los límites se expresan en "planos": un array float64 del tamaño de la imagen
+reducida (filas x columnas). Antes, la distancia de color y los bordes armaban
+temporales de (filas, columnas, 3) o varios planos a la vez.
+"""
+import tracemalloc
+
+import numpy as np
+import pytest
+
+import detector_figuras
+
+LADO = 300
+PLANO = LADO * LADO * 8
+
+
+@pytest.fixture(scope="module")
+def pix():
+    generador = np.random.default_rng(0)
+    pix = np.full((LADO, LADO, 3), 255, dtype=np.uint8)
+    pix[60:240, 40:260] = generador.integers(0, 256, size=(180, 220, 3), dtype=np.uint8)
+    return pix
+
+
+def _pico_en_planos(funcion, *args, **kwargs):
+    """Memoria máxima reservada durante la llamada (sin contar lo que ya existía), en planos"""
+    # Una llamada previa, para no medir imports ni cachés de la primera vez
+    funcion(*args, **kwargs)
+    tracemalloc.start()
+    try:
+        inicial = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        resultado = funcion(*args, **kwargs)
+        pico = tracemalloc.get_traced_memory()[1] - inicial
+    finally:
+        tracemalloc.stop()
+    return resultado, pico / PLANO
+
+
+def test_luminancia(pix):
+    # El resultado más un solo plano de trabajo
+    luminancia, planos = _pico_en_planos(detector_figuras._luminancia, pix)
+    assert luminancia.shape == (LADO, LADO)
+    assert planos <= 2.25
+
+
+def test_mapa_bordes(pix):
+    gris = np.mean(pix, axis=2)
+    # Resultado, derivada con borde y un plano del otro eje a la vez
+    (bordes, _), planos = _pico_en_planos(detector_figuras._mapa_bordes, gris)
+    assert bordes.shape == (LADO, LADO)
+    assert planos <= 3.5
+
+
+@pytest.mark.parametrize("metodo, limite", [("diferencia_adaptativa", 2.25),
+                                            ("luminancia_precisa", 2.25),
+                                            ("bordes_combinados", 4.5),
+                                            ("basico", 0.5)])
+def test_ejecutar_metodo_en_out(pix, metodo, limite):
+    salida = np.empty((LADO, LADO), dtype=np.uint8)
+    resultado, planos = _pico_en_planos(detector_figuras.ejecutar_metodo, metodo, pix,
+                                        backend="numpy", out=salida)
+    assert resultado is salida
+    assert np.array_equal(salida, detector_figuras.ejecutar_metodo(metodo, pix, backend="numpy"))
+    assert planos <= limite
@@ -0,0 +1,243 @@
+"""Métodos del registro de detección"""
+import numpy as np
+import pytest
+
+import detector_figuras
+
+
+def _pix(semilla=0, lado=16):
+    generador = np.random.default_rng(semilla)
+    pix = np.full((lado, lado, 3), 255, dtype=np.uint8)
+    pix[3:11, 4:13] = generador.integers(0, 256, size=(8, 9, 3), dtype=np.uint8)
+    pix[12:, :3] = 245
+    return pix
+
+
+def pix_referencia(filas=12, columnas=14):
+    """Imagen reducida fija: rectángulo oscuro, elipse con degradé y bordes casi blancos"""
+    i, j = np.mgrid[0:filas, 0:columnas]
+    pix = np.full((filas, columnas, 3), 255, dtype=np.uint8)
+    pix[2:6, 2:7] = (30, 60, 200)
+    elipse = ((i - 7.5) / 3.2) ** 2 + ((j - 9.5) / 3.6) ** 2 <= 1
+    pix[elipse, 0] = (40 + 12 * j[elipse]).astype(np.uint8)
+    pix[elipse, 1] = (200 - 10 * i[elipse]).astype(np.uint8)
+    pix[elipse, 2] = 90
+    pix[-1, :] = 236
+    pix[:, 0] = (250 - 3 * i[:, 0]).astype(np.uint8)[:, None]
+    return pix
+
+
+# Matrices de referencia de pix_referencia(), calculadas con las implementaciones
+# originales de cada método (celda por celda, resultado int)
+REFERENCIAS = {
+    ("contraste_mejorado", 240, 0.8): """
+        00000000000000
+        00000000000000
+        00111110000000
+        00111110000000
+        00111110000000
+        00111110111100
+        00000001111110
+        10000011111111
+        10000011111111
+        10000001111110
+        10000000111100
+        11000001111110
+    """,
+    ("contraste_mejorado", 200, 0.35): """
+        00000000000000
+        00000000000000
+        00111110000000
+        00111110000000
+        00111110000000
+        00111110111100
+        00000001111110
+        00000011111111
+        00000011111111
+        00000001111110
+        00000000111100
+        00000000000000
+    """,
+    ("diferencia_adaptativa", 240, 0.8): """
+        00000000000000
+        00000000000000
+        00111110000000
+        00111110000000
+        00111110000000
+        00111110111100
+        00000001111110
+        10000011111111
+        10000011111111
+        10000001111110
+        10000000111100
+        10000000000000
+    """,
+    ("diferencia_adaptativa", 200, 0.35): """
+        11111111111111
+        01111111111111
+        01111111111111
+        01111111111111
+        01111111111111
+        11111111111111
+        11111111111111
+        11111111111111
+        11111111111111
+        11111111111111
+        11111111111111
+        10000000000000
+    """,
+    ("luminancia_precisa", 240, 0.8): """
+        00000000000000
+        00000000000000
+        00111110000000
+        00111110000000
+        00111110000000
+        00111110111100
+        00000001111110
+        00000011111111
+        00000011111111
+        00000001111110
+        00000000111100
+        00000000000000
+    """,
+    ("luminancia_precisa", 200, 0.35): """
+        00000000000000
+        00000000000000
+        00111110000000
+        00111110000000
+        00111110000000
+        00111110111100
+        00000001111110
+        00000011111111
+        10000011111111
+        10000001111110
+        10000000111100
+        10000000000000
+    """,
+    ("bordes_combinados", 240, 0.8): """
+        00000000000000
+        01111111000000
+        01111111000000
+        11111111000000
+        11111111111110
+        11111111111111
+        11111111111111
+        11000111111111
+        11000111111111
+        11000111111111
+        11111111111111
+        11111111111111
+    """,
+    ("bordes_combinados", 200, 0.35): """
+        10000000000000
+        11111111000000
+        11111111000000
+        11111111000000
+        11111111111110
+        11111111111111
+        11111111111111
+        11000111111111
+        11000111111111
+        11000111111111
+        11111111111111
+        11111111111111
+    """,
+    ("basico", 240, 0.8): """
+        00000000000000
+        00000000000000
+        00111110000000
+        00111110000000
+        10111110000000
+        10111110111100
+        10000001111110
+        10000011111111
+        10000011111111
+        10000001111110
+        10000000111100
+        11111111111111
+    """,
+    ("basico", 200, 0.35): """
+        00000000000000
+        00000000000000
+        00111110000000
+        00111110000000
+        00111110000000
+        00111110111100
+        00000001111110
+        00000011111111
+        00000011111111
+        00000001111110
+        00000000111100
+        00000000000000
+    """,
+}
+
+
+def _como_array(texto):
+    return np.array([[int(v) for v in fila] for fila in texto.split()], dtype=np.uint8)
+
+
+@pytest.mark.parametrize("metodo, umbral_blanco, sensibilidad", sorted(REFERENCIAS))
+def test_matriz_de_referencia(metodo, umbral_blanco, sensibilidad):
+    esperado = _como_array(REFERENCIAS[metodo, umbral_blanco, sensibilidad])
+    pix = pix_referencia()
+
+    matriz = detector_figuras.ejecutar_metodo(metodo, pix, umbral_blanco, sensibilidad,
+                                              backend="numpy")
+    assert matriz.dtype == np.uint8
+    assert np.array_equal(matriz, esperado)
+
+    # En una capa de una pila ya reservada, sin tocar las demás
+    pila = np.full((3,) + esperado.shape, 7, dtype=np.uint8)
+    resultado = detector_figuras.ejecutar_metodo(metodo, pix, umbral_blanco, sensibilidad,
+                                                 backend="numpy", out=pila[1])
+    assert np.shares_memory(resultado, pila)
+    assert np.array_equal(pila[1], esperado)
+    assert (pila[0] == 7).all() and (pila[2] == 7).all()
+
+
+def test_todos_los_metodos_tienen_referencia():
+    assert {metodo for metodo, _, _ in REFERENCIAS} == set(detector_figuras.METODOS)
+
+
+def test_basico_solo_si_se_pide(imagen_figura):
+    assert detector_figuras.METODOS_POR_DEFECTO == (
+        "contraste_mejorado", "diferencia_adaptativa", "luminancia_precisa", "bordes_combinados")
+    todos = detector_figuras.detectar_todos_metodos(imagen_figura, 12)
+    assert tuple(todos) == detector_figuras.METODOS_POR_DEFECTO
+    comparacion = detector_figuras.comparar_metodos(imagen_figura, 12, workers=1)
+    assert tuple(comparacion["matrices"]) == detector_figuras.METODOS_POR_DEFECTO
+
+
+def test_basico_marca_los_pixeles_no_blancos():
+    pix = _pix()
+    assert "basico" in detector_figuras.METODOS
+    for umbral in (200, 240, 250):
+        # Como el _detectar_basico original
+        fondo = (pix[:, :, 0] >= umbral) & (pix[:, :, 1] >= umbral) & (pix[:, :, 2] >= umbral)
+        matriz = detector_figuras.ejecutar_metodo("basico", pix, umbral)
+        assert matriz.dtype == np.uint8
+        assert np.array_equal(matriz, (~fondo).astype(int))
+
+
+def test_basico_desde_una_imagen(imagen_figura):
+    pedido = detector_figuras.detectar_todos_metodos(imagen_figura, 12, metodos=["basico"])
+    matriz = detector_figuras.detectar_figura_optimizado(imagen_figura, 12, "basico")
+    assert np.array_equal(pedido["basico"], matriz)
+    assert matriz.any() and not matriz.all()
+
+
+def test_resultado_etiqueta_una_sola_vez(monkeypatch):
+    llamadas = []
+    original = detector_figuras.estadisticas_componentes
+
+    def contar(*args, **kwargs):
+        llamadas.append(1)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(detector_figuras, "estadisticas_componentes", contar)
+    matriz = detector_figuras.ejecutar_metodo("basico", _pix())
+    for renderizador in ("raster", "matplotlib"):
+        llamadas.clear()
+        detector_figuras.png_resultado(matriz, renderizador=renderizador)
+        assert len(llamadas) == 1
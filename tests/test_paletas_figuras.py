@@ -0,0 +1,54 @@
+"""Tabla de paletas y caché en disco de los cubos de paletas_figuras"""
+import subprocess
+import sys
+
+import numpy as np
+
+import paletas_figuras
+from conftest import RAIZ
+
+
+def test_colores_paleta_no_importa_el_coloreador():
+    codigo = ("import sys, paletas_figuras\n"
+              "paletas_figuras.colores_paleta('calidos')\n"
+              "print('coloreado_figuras' in sys.modules)\n")
+    salida = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True,
+                            text=True, check=True).stdout
+    assert salida.strip() == "False"
+
+
+def test_el_coloreador_usa_la_misma_tabla():
+    from coloreado_figuras import MatrizAImagen
+    conversor = MatrizAImagen()
+    assert conversor.paletas == paletas_figuras.PALETAS
+    conversor.paletas["basicos"][0] = "#123456"
+    assert paletas_figuras.PALETAS["basicos"][0] == "#FFFFFF"
+
+
+def _cubo_nuevo(monkeypatch):
+    # Sin los cubos ya calculados en memoria por otras pruebas
+    monkeypatch.setattr(paletas_figuras, "_CUBOS", {})
+    return paletas_figuras.cubo_paleta(["#000000", "#FFFFFF", "#FF0000"], bits=5)
+
+
+def test_sin_figuras_cache_no_escribe_en_disco(tmp_path, monkeypatch):
+    monkeypatch.delenv("FIGURAS_CACHE", raising=False)
+    monkeypatch.delenv("FIGURAS_SIN_CACHE", raising=False)
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+
+    cubo = _cubo_nuevo(monkeypatch)
+
+    assert cubo.shape == (32, 32, 32)
+    assert list(tmp_path.rglob("*")) == []
+
+
+def test_con_figuras_cache_guarda_y_reutiliza_el_cubo(tmp_path, monkeypatch):
+    monkeypatch.setenv("FIGURAS_CACHE", str(tmp_path))
+    monkeypatch.delenv("FIGURAS_SIN_CACHE", raising=False)
+
+    cubo = _cubo_nuevo(monkeypatch)
+    guardados = list((tmp_path / "paletas").glob("*.npy"))
+    assert len(guardados) == 1
+
+    assert np.array_equal(_cubo_nuevo(monkeypatch), cubo)
@@ -0,0 +1,60 @@
+"""PiramideImagen y detectar_multiples_tamaños con exacto=True dan la misma matriz que detectar_figura_optimizado"""
+import numpy as np
+import pytest
+from PIL import Image
+
+import detector_figuras
+from conftest import dibujar_figura
+
+TAMAÑOS = [5, 10, 15, 23, 40]
+
+
+@pytest.fixture
+def imagen_grande(tmp_path):
+    # Lo bastante grande para que la pirámide tenga varios niveles
+    return dibujar_figura(str(tmp_path / "figura.png"), lado=1500, semilla=3)
+
+
+@pytest.mark.parametrize("metodo", detector_figuras.METODOS_POR_DEFECTO)
+@pytest.mark.parametrize("sensibilidad", [0.35, 0.8])
+def test_exacto_igual_a_optimizado(imagen_grande, metodo, sensibilidad):
+    resultados = detector_figuras.detectar_multiples_tamaños(
+        imagen_grande, TAMAÑOS, metodo, sensibilidad=sensibilidad, exacto=True)
+    assert list(resultados) == TAMAÑOS
+    for tamaño, matriz in resultados.items():
+        esperado = detector_figuras.detectar_figura_optimizado(
+            imagen_grande, tamaño, metodo, sensibilidad=sensibilidad)
+        assert np.array_equal(matriz, esperado), tamaño
+
+
+def test_pix_exacto_igual_a_cargar_imagen(imagen_grande):
+    piramide = detector_figuras.PiramideImagen(imagen_grande)
+    for tamaño in TAMAÑOS:
+        normal = detector_figuras._cargar_imagen(imagen_grande, tamaño)
+        assert np.array_equal(piramide.pix(tamaño, exacto=True), normal)
+        # Desde un nivel reducido: bordes duros de la imagen generada, algo más que en fotos
+        diferencia = np.abs(piramide.pix(tamaño).astype(int) - normal.astype(int))
+        assert diferencia.max() <= 3, tamaño
+    assert len(piramide.niveles) > 1
+
+
+def test_piramide_reutilizada_y_en_cache(imagen_grande):
+    piramide = detector_figuras.PiramideImagen(imagen_grande)
+    primera = detector_figuras.detectar_multiples_tamaños(piramide, TAMAÑOS, exacto=True)
+    niveles = len(piramide.niveles)
+    segunda = detector_figuras.detectar_multiples_tamaños(piramide, TAMAÑOS[::-1], exacto=True)
+    assert list(segunda) == TAMAÑOS[::-1]
+    assert all(np.array_equal(primera[t], segunda[t]) for t in TAMAÑOS)
+    assert len(piramide.niveles) == niveles
+    assert piramide.pix(15) is piramide.pix(15)
+
+
+def test_imagen_pil_igual_a_ruta(imagen_grande):
+    desde_ruta = detector_figuras.detectar_multiples_tamaños(imagen_grande, [15, 20], exacto=True)
+    with Image.open(imagen_grande) as imagen:
+        desde_pil = detector_figuras.detectar_multiples_tamaños(imagen, [15, 20], exacto=True)
+    assert all(np.array_equal(desde_ruta[t], desde_pil[t]) for t in (15, 20))
+
+
+def test_sin_tamaños(imagen_grande):
+    assert detector_figuras.detectar_multiples_tamaños(imagen_grande, []) == {}
@@ -0,0 +1,92 @@
+"""Los renderizadores raster pintan cada celda del color y tamaño esperados"""
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import coloreado_figuras
+import detector_figuras
+
+
+def _rgb(color_hex):
+    return tuple(int(color_hex.lstrip("#")[k:k + 2], 16) for k in (0, 2, 4))
+
+
+@pytest.fixture
+def conversor():
+    return coloreado_figuras.MatrizAImagen()
+
+
+@pytest.mark.parametrize("paleta", ["basicos", "frios"])
+@pytest.mark.parametrize("tamaño_pixel", [4, 8, 20])
+def test_coloreado_raster_celda_por_celda(conversor, paleta, tamaño_pixel):
+    colores = conversor.paletas[paleta]
+    generador = np.random.default_rng(tamaño_pixel)
+    # Incluye valores mayores que la paleta: usan el último color
+    matriz = generador.integers(0, len(colores) + 3, size=(7, 9))
+    imagen = conversor.renderizar_raster(matriz, paleta, tamaño_pixel, mostrar_numeros=False)
+    assert imagen.mode == "RGB"
+    assert imagen.size == (9 * tamaño_pixel, 7 * tamaño_pixel)
+    pixeles = np.asarray(imagen)
+    centro = tamaño_pixel // 2
+    for i in range(7):
+        for j in range(9):
+            esperado = _rgb(colores[min(matriz[i, j], len(colores) - 1)])
+            assert tuple(pixeles[i * tamaño_pixel + centro, j * tamaño_pixel + centro]) == esperado
+    # Borde negro de 1 píxel en cada celda y alrededor de la imagen
+    assert not pixeles[::tamaño_pixel].any() and not pixeles[:, ::tamaño_pixel].any()
+    assert not pixeles[-1].any() and not pixeles[:, -1].any()
+
+
+def test_coloreado_raster_numeros_no_tapan_el_color(conversor):
+    matriz = np.array([[0, 1], [2, 3]])
+    con = np.asarray(conversor.renderizar_raster(matriz, tamaño_pixel=30, mostrar_numeros=True))
+    sin = np.asarray(conversor.renderizar_raster(matriz, tamaño_pixel=30, mostrar_numeros=False))
+    assert con.shape == sin.shape and not np.array_equal(con, sin)
+    assert tuple(con[3, 3]) == tuple(sin[3, 3])
+
+
+def test_convertir_matriz_raster_guarda_el_png(conversor, tmp_path):
+    ruta = tmp_path / "sub" / "matriz.png"
+    imagen, matriz = conversor.convertir_matriz("[0, 1, 2]\n[2, 1, 0]", tamaño_pixel=10,
+                                                guardar_como=str(ruta), mostrar_imagen=False,
+                                                modo="raster")
+    assert matriz.shape == (2, 3)
+    assert imagen.size == (30, 20)
+    with Image.open(ruta) as guardada:
+        assert np.array_equal(np.asarray(guardada.convert("RGB")), np.asarray(imagen))
+
+
+@pytest.mark.parametrize("forma", [(1, 1), (5, 8), (15, 15), (60, 40)])
+def test_resultado_raster_cuadricula(tmp_path, forma):
+    filas, columnas = forma
+    matriz = (np.random.default_rng(filas).random(forma) < 0.4).astype(np.uint8)
+    ruta = tmp_path / "resultado.png"
+    imagen = detector_figuras.renderizar_resultado_raster(matriz, "Prueba", "fotos/gato.jpg",
+                                                          ruta_salida=str(ruta),
+                                                          mostrar_numeros=False)
+    celda = int(np.clip(1600 // max(filas, columnas), 2, 40))
+    ancho_cuadricula, alto_cuadricula = columnas * celda + 1, filas * celda + 1
+    assert imagen.width == max(ancho_cuadricula + 40, 420)
+
+    # La cuadrícula va centrada, a 20 píxeles del borde inferior
+    x0 = (imagen.width - ancho_cuadricula) // 2
+    y0 = imagen.height - 20 - alto_cuadricula
+    pixeles = np.asarray(imagen)
+    centro = celda // 2
+    for i in range(filas):
+        for j in range(columnas):
+            color = pixeles[y0 + i * celda + centro, x0 + j * celda + centro]
+            assert tuple(color) == ((0, 0, 0) if matriz[i, j] else (255, 255, 255)), (i, j)
+
+    with Image.open(ruta) as guardada:
+        assert np.array_equal(np.asarray(guardada), pixeles)
+    png = detector_figuras.png_resultado(matriz, "Prueba", "fotos/gato.jpg")
+    with Image.open(io.BytesIO(png)) as desde_bytes:
+        assert desde_bytes.size == imagen.size
+
+
+def test_png_resultado_renderizador_desconocido():
+    with pytest.raises(ValueError):
+        detector_figuras.png_resultado(np.zeros((2, 2), dtype=np.uint8), renderizador="svg")
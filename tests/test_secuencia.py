@@ -0,0 +1,60 @@
+"""detectar_secuencia con tolerancia=0 da la misma matriz que detectar cada fotograma por separado"""
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+import detector_figuras
+
+TAMAÑO = 20
+
+
+def _fotogramas():
+    """Fotogramas con cambios locales, en el borde, sin cambios y completos"""
+    generador = np.random.default_rng(5)
+    fotogramas = []
+    base = Image.new("RGB", (80, 80), (255, 255, 255))
+    ImageDraw.Draw(base).ellipse([15, 20, 55, 60], fill=(40, 90, 160))
+    fotogramas.append(base)
+    for paso in range(4):  # un cuadrado que se mueve por el interior
+        fotograma = base.copy()
+        ImageDraw.Draw(fotograma).rectangle([30 + 4 * paso, 30, 40 + 4 * paso, 40], fill=(200, 30, 30))
+        fotogramas.append(fotograma)
+    fotogramas.append(fotogramas[-1].copy())  # sin cambios
+    esquina = fotogramas[-1].copy()  # cambia una esquina (fondo estimado y borde)
+    ImageDraw.Draw(esquina).rectangle([0, 0, 6, 6], fill=(10, 10, 10))
+    fotogramas.append(esquina)
+    ruido = generador.integers(0, 256, size=(80, 80, 3), dtype=np.uint8)
+    fotogramas.append(Image.fromarray(ruido))  # cambia todo
+    fotogramas.append(base.copy())
+    return fotogramas
+
+
+# El fotograma de ruido no tiene borde casi blanco: luminancia_precisa avisa (mediana vacía)
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+@pytest.mark.parametrize("metodo", ["contraste_mejorado", "diferencia_adaptativa",
+                                    "luminancia_precisa", "bordes_combinados"])
+def test_secuencia_igual_a_cada_fotograma(metodo):
+    fotogramas = _fotogramas()
+    matrices = list(detector_figuras.detectar_secuencia(fotogramas, TAMAÑO, metodo, sensibilidad=0.5))
+    assert len(matrices) == len(fotogramas)
+    for indice, (fotograma, matriz) in enumerate(zip(fotogramas, matrices)):
+        pix = np.asarray(fotograma.resize((TAMAÑO, TAMAÑO), Image.Resampling.LANCZOS), dtype=np.uint8)
+        esperada = detector_figuras.ejecutar_metodo(metodo, pix, 240, 0.5)
+        assert matriz.dtype == np.uint8
+        assert np.array_equal(matriz, esperada), (metodo, indice)
+
+
+def test_caja_de_celdas():
+    celdas = np.zeros((6, 5), dtype=bool)
+    assert detector_figuras._caja(celdas) is None
+    celdas[1, 3] = celdas[4, 2] = True
+    assert detector_figuras._caja(celdas) == (slice(1, 5), slice(2, 4))
+
+
+def test_sobel_de_un_recorte_igual_al_de_la_imagen():
+    gris = np.random.default_rng(2).random((9, 11)) * 255
+    completo = detector_figuras._magnitud_bordes(gris)
+    # Recorte interior con sus vecinos, y recorte que toca los bordes de arriba y de la derecha
+    assert np.array_equal(detector_figuras._magnitud_bordes(gris[2:7, 3:9], 0), completo[3:6, 4:8])
+    assert np.array_equal(detector_figuras._magnitud_bordes(gris[0:5, 6:11], ((1, 0), (0, 1))),
+                          completo[0:4, 7:11])
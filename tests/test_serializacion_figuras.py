@@ -0,0 +1,110 @@
+"""Los escritores de texto por bloques dan el mismo texto que celda por celda, e imprimir_matriz recorta lo grande"""
+import io
+import json
+
+import numpy as np
+import pytest
+
+import serializacion_figuras
+from coloreado_figuras import MatrizAImagen
+
+
+def _referencia(matriz, separador, abrir, cerrar):
+    """Texto armado celda por celda, como lo hacía el código original"""
+    return "".join(abrir + separador.join(str(v) for v in fila) + cerrar + "\n"
+                   for fila in np.asarray(matriz).tolist())
+
+
+def _matrices():
+    generador = np.random.default_rng(8)
+    yield "binaria", (generador.random((37, 11)) < 0.4).astype(np.uint8)
+    yield "bool", generador.random((5, 6)) < 0.5
+    yield "un_digito", generador.integers(0, 10, size=(13, 9))
+    yield "varios_digitos", generador.integers(0, 1000, size=(7, 8)).astype(np.int32)
+    yield "negativos", generador.integers(-50, 50, size=(4, 5))
+    yield "una_celda", np.array([[7]])
+    yield "sin_columnas", np.zeros((3, 0), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("filas_por_bloque", [1, 4, 512])
+def test_bloques_igual_a_celda_por_celda(monkeypatch, filas_por_bloque):
+    monkeypatch.setattr(serializacion_figuras, "_FILAS_POR_BLOQUE", filas_por_bloque)
+    for nombre, matriz in _matrices():
+        enteros = np.asarray(matriz, dtype=np.int64)
+        corchetes = "".join(serializacion_figuras._bloques_de_texto(
+            matriz, ", ", "[", "]", "\n", filas_por_bloque))
+        assert corchetes == _referencia(enteros, ", ", "[", "]"), nombre
+        csv = io.StringIO()
+        serializacion_figuras.escribir_csv(matriz, csv)
+        assert csv.getvalue() == _referencia(enteros, ",", "", ""), nombre
+
+
+def test_json_y_corchetes_vuelven_a_leerse(tmp_path):
+    conversor = MatrizAImagen()
+    for nombre, matriz in _matrices():
+        if nombre in ("negativos", "sin_columnas"):
+            continue  # el coloreador no los acepta
+        esperado = np.asarray(matriz, dtype=np.int64)
+        assert json.loads(serializacion_figuras.matriz_a_json(matriz)) == esperado.tolist(), nombre
+        texto = serializacion_figuras.matriz_a_texto(matriz)
+        assert np.array_equal(conversor.parsear_matriz(texto), esperado), nombre
+        for extension, escritor in ((".txt", serializacion_figuras.escribir_corchetes),
+                                    (".csv", serializacion_figuras.escribir_csv),
+                                    (".json", serializacion_figuras.escribir_json)):
+            ruta = str(tmp_path / f"{nombre}{extension}")
+            escritor(matriz, ruta)
+            assert np.array_equal(conversor.cargar_matriz(ruta), esperado), (nombre, extension)
+
+
+def test_json_de_varios_bloques(monkeypatch):
+    monkeypatch.setattr(serializacion_figuras, "_FILAS_POR_BLOQUE", 3)
+    matriz = np.arange(40).reshape(10, 4) % 7
+    assert json.loads(serializacion_figuras.matriz_a_json(matriz)) == matriz.tolist()
+
+
+def test_matriz_no_2d():
+    with pytest.raises(ValueError):
+        serializacion_figuras.matriz_a_texto(np.zeros((2, 2, 2), dtype=np.uint8))
+
+
+def test_imprimir_matriz_chica_en_corchetes():
+    matriz = np.array([[0, 1], [1, 0]])
+    salida = io.StringIO()
+    serializacion_figuras.imprimir_matriz(matriz, archivo=salida)
+    assert salida.getvalue() == "[0, 1]\n[1, 0]\n"
+
+
+def test_imprimir_matriz_grande_entra_en_la_terminal(monkeypatch):
+    monkeypatch.setenv("COLUMNS", "60")
+    monkeypatch.setenv("LINES", "30")
+    matriz = (np.random.default_rng(2).random((300, 200)) < 0.5).astype(np.uint8)
+    salida = io.StringIO()
+    serializacion_figuras.imprimir_matriz(matriz, archivo=salida)
+    lineas = salida.getvalue().splitlines()
+    assert "[" not in lineas[0]  # vista previa, no la matriz completa
+    assert any("reducida" in linea and "300x200" in linea for linea in lineas)
+    assert "escribir_corchetes" in lineas[-1]
+    vista = [linea for linea in lineas if "reducida" not in linea][:-1]
+    assert len(vista) <= 30 - 8
+    assert all(len(linea) <= 60 for linea in vista)
+    assert "\x1b[" not in salida.getvalue()  # StringIO no es una terminal
+
+
+def test_vista_previa_modos():
+    matriz = np.zeros((40, 40), dtype=np.uint8)
+    matriz[:20] = 1
+    recortada = serializacion_figuras.vista_previa(matriz, ancho_max=20, alto_max=5,
+                                                   modo="recortar", color=False).splitlines()
+    assert recortada[:5] == ["█" * 20] * 5
+    assert "recortada" in recortada[-1] and "5x10" in recortada[-1]
+
+    reducida = serializacion_figuras.vista_previa(matriz, ancho_max=20, alto_max=10,
+                                                  color=False).splitlines()
+    # Factor 4 en ambos ejes: mitad superior de figura, mitad inferior de fondo
+    assert reducida[:10] == ["█" * 20] * 5 + ["· " * 10] * 5
+    assert "1:4" in reducida[-1]
+
+    con_color = serializacion_figuras.vista_previa(np.array([[0, 1]]), color=True)
+    assert "\x1b[48;2;255;255;255m" in con_color and "\x1b[48;2;0;0;0m" in con_color
+    with pytest.raises(ValueError):
+        serializacion_figuras.vista_previa(matriz, ancho_max=20, alto_max=5, modo="otro")
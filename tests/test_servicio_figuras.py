@@ -0,0 +1,111 @@
+"""Servicio de detección: solicitudes HTTP reales contra un servidor local en un puerto libre"""
+import asyncio
+import json
+import os
+import signal
+import time
+
+import numpy as np
+import pytest
+
+import servicio_figuras
+from conftest import dibujar_figura
+
+
+async def _pedir(puerto, metodo="GET", ruta="/salud", cuerpo=b"", encabezados=None):
+    """Envía una solicitud HTTP/1.1 con Connection: close. Da de regreso: (código, cuerpo)"""
+    lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+    if encabezados is None:
+        encabezados = {"Content-Length": str(len(cuerpo))}
+    lineas = [f"{metodo} {ruta} HTTP/1.1", "Host: prueba", "Connection: close"]
+    lineas += [f"{clave}: {valor}" for clave, valor in encabezados.items()]
+    escritor.write(("\r\n".join(lineas) + "\r\n\r\n").encode("latin-1") + cuerpo)
+    await escritor.drain()
+    respuesta = await lector.read()
+    escritor.close()
+    encabezado, _, contenido = respuesta.partition(b"\r\n\r\n")
+    return int(encabezado.split(b" ", 2)[1]), contenido
+
+
+def _con_servicio(prueba, **opciones):
+    """Corre la corrutina prueba(servicio, puerto) con un servicio de 1 proceso"""
+    async def correr():
+        servicio = servicio_figuras.ServicioFiguras(workers=1, **opciones)
+        servidor = await servicio.iniciar("127.0.0.1", 0)
+        try:
+            await prueba(servicio, servidor.sockets[0].getsockname()[1])
+        finally:
+            await servicio.cerrar()
+    asyncio.run(correr())
+
+
+@pytest.fixture
+def imagen_bytes(tmp_path):
+    with open(dibujar_figura(str(tmp_path / "figura.png")), "rb") as archivo:
+        return archivo.read()
+
+
+def test_detectar_y_salud(imagen_bytes):
+    async def prueba(servicio, puerto):
+        codigo, cuerpo = await _pedir(puerto, "POST", "/detectar?tamano=12", imagen_bytes)
+        assert codigo == 200
+        datos = json.loads(cuerpo)
+        assert datos["forma"] == [12, 12] and 0 < datos["cobertura"] < 100
+        matriz = np.array(datos["matriz"])
+        assert set(np.unique(matriz)) <= {0, 1}
+
+        codigo, cuerpo = await _pedir(puerto)
+        assert codigo == 200 and json.loads(cuerpo)["atendidas"] == 1
+    _con_servicio(prueba)
+
+
+def test_errores_de_la_solicitud_son_400(imagen_bytes):
+    async def prueba(servicio, puerto):
+        codigo, _ = await _pedir(puerto, "POST", "/detectar", b"no es una imagen")
+        assert codigo == 400
+        codigo, _ = await _pedir(puerto, "POST", "/detectar?metodo=otro", imagen_bytes)
+        assert codigo == 400
+        codigo, _ = await _pedir(puerto, "POST", "/detectar?tamano=abc", imagen_bytes)
+        assert codigo == 400
+        codigo, _ = await _pedir(puerto, "GET", "/detectar")
+        assert codigo == 405
+        codigo, _ = await _pedir(puerto, "GET", "/otra")
+        assert codigo == 404
+    _con_servicio(prueba)
+
+
+def test_imagen_demasiado_grande_es_413(imagen_bytes):
+    async def prueba(servicio, puerto):
+        codigo, _ = await _pedir(puerto, "POST", "/detectar", imagen_bytes)
+        assert codigo == 413
+    _con_servicio(prueba, max_bytes=100)
+
+
+def test_pool_roto_responde_503_y_se_reemplaza(imagen_bytes):
+    async def prueba(servicio, puerto):
+        pool = servicio.pool
+        for pid in list(pool._processes):
+            os.kill(pid, signal.SIGKILL)
+        limite = time.monotonic() + 10
+        while not pool._broken and time.monotonic() < limite:
+            await asyncio.sleep(0.05)
+
+        codigo, cuerpo = await _pedir(puerto, "POST", "/detectar?tamano=8", imagen_bytes)
+        assert codigo == 503, cuerpo
+        assert servicio.pool is not pool
+        codigo, _ = await _pedir(puerto, "POST", "/detectar?tamano=8", imagen_bytes)
+        assert codigo == 200
+    _con_servicio(prueba)
+
+
+@pytest.mark.parametrize("largo", ["abc", "-5", "1.5"])
+def test_content_length_invalido_es_400(largo):
+    async def prueba(servicio, puerto):
+        codigo, cuerpo = await asyncio.wait_for(
+            _pedir(puerto, "POST", "/detectar", encabezados={"Content-Length": largo}), 10)
+        assert codigo == 400
+        assert "Content-Length" in json.loads(cuerpo)["error"]
+        # El servicio sigue atendiendo
+        codigo, _ = await _pedir(puerto)
+        assert codigo == 200
+    _con_servicio(prueba)
@@ -0,0 +1,43 @@
+"""detectar_todos_metodos, que comparte la carga y los intermedios, da lo mismo que cada método por separado"""
+import numpy as np
+import pytest
+
+import detector_figuras
+from conftest import dibujar_figura
+
+
+@pytest.fixture(scope="module")
+def imagen(tmp_path_factory):
+    return dibujar_figura(str(tmp_path_factory.mktemp("todos") / "figura.jpg"), lado=800,
+                          semilla=11, formato="JPEG")
+
+
+@pytest.mark.parametrize("tamaño", [1, 7, 15, 40])
+@pytest.mark.parametrize("umbral_blanco", [200, 240])
+@pytest.mark.parametrize("sensibilidad", [0.1, 0.5, 0.8, 1.0])
+def test_igual_a_cada_metodo(imagen, tamaño, umbral_blanco, sensibilidad):
+    resultados = detector_figuras.detectar_todos_metodos(
+        imagen, tamaño, metodos=detector_figuras.METODOS,
+        umbral_blanco=umbral_blanco, sensibilidad=sensibilidad)
+    assert list(resultados) == detector_figuras.METODOS
+    for metodo, matriz in resultados.items():
+        esperado = detector_figuras.detectar_figura_optimizado(
+            imagen, tamaño, metodo, umbral_blanco=umbral_blanco, sensibilidad=sensibilidad)
+        assert matriz.dtype == esperado.dtype
+        assert np.array_equal(matriz, esperado), metodo
+
+
+@pytest.mark.parametrize("rapido", [False, True])
+def test_carga_rapida_y_subconjunto(imagen, rapido):
+    metodos = ["luminancia_precisa", "contraste_mejorado"]
+    resultados = detector_figuras.detectar_todos_metodos(imagen, 20, metodos=metodos, rapido=rapido)
+    assert list(resultados) == metodos
+    for metodo in metodos:
+        esperado = detector_figuras.detectar_figura_optimizado(imagen, 20, metodo, rapido=rapido)
+        assert np.array_equal(resultados[metodo], esperado), metodo
+
+
+def test_metodo_desconocido_antes_de_abrir(tmp_path):
+    with pytest.raises(ValueError):
+        detector_figuras.detectar_todos_metodos(str(tmp_path / "no_existe.png"),
+                                                metodos=["contraste_mejorado", "inexistente"])
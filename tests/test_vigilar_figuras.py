@@ -0,0 +1,132 @@
+"""Archivos nuevos, sin cambios y modificados en vigilar_figuras"""
+import json
+import os
+import signal
+import time
+
+import numpy as np
+
+from conftest import dibujar_figura
+from vigilar_figuras import NOMBRE_MANIFIESTO, VigilanteFiguras
+
+
+def _vigilante(tmp_path, **opciones):
+    opciones = {"tamaño": 12, "workers": 1, "espera": 0, **opciones}
+    return VigilanteFiguras(str(tmp_path / "entrada"), str(tmp_path / "salida"), **opciones)
+
+
+def _cambiar_fecha(ruta, segundos):
+    # Hacia atrás: una fecha futura se toma como copia en curso y se espera
+    estado = os.stat(ruta)
+    os.utime(ruta, ns=(estado.st_atime_ns, estado.st_mtime_ns + segundos * 10**9))
+
+
+def _por_imagen(registros):
+    return {registro["imagen"]: registro for registro in registros}
+
+
+def test_nuevo_sin_cambios_y_modificado(tmp_path):
+    entrada = tmp_path / "entrada"
+    entrada.mkdir()
+    dibujar_figura(str(entrada / "a.png"), semilla=1)
+    dibujar_figura(str(entrada / "a.jpg"), semilla=2)
+    salida = tmp_path / "salida"
+
+    with _vigilante(tmp_path, png="raster") as vigilante:
+        # Nuevos: cada imagen con su propia salida, aunque compartan el nombre base
+        registros = _por_imagen(vigilante.ciclo())
+        assert {r["estado"] for r in registros.values()} == {"ok"}
+        assert registros["a.png"]["salida"] == str(salida / "a.png.txt")
+        assert registros["a.jpg"]["salida"] == str(salida / "a.jpg.txt")
+        assert (salida / "a.png.png").is_file() and (salida / "a.jpg.png").is_file()
+        primera = (salida / "a.png.txt").read_text()
+
+        # Misma fecha y tamaño: ni se abre
+        assert vigilante.ciclo() == []
+
+        # Otra fecha, mismo contenido: se reconoce por el hash y no se vuelve a detectar
+        fecha_salida = os.stat(salida / "a.png.txt").st_mtime_ns
+        _cambiar_fecha(entrada / "a.png", -5)
+        assert [r["estado"] for r in vigilante.ciclo()] == ["sin_cambios"]
+        assert os.stat(salida / "a.png.txt").st_mtime_ns == fecha_salida
+
+        # Otro contenido: se detecta de nuevo y se reemplaza la salida
+        dibujar_figura(str(entrada / "a.png"), lado=90, semilla=3)
+        _cambiar_fecha(entrada / "a.png", -10)
+        registros = vigilante.ciclo()
+        assert [(r["imagen"], r["estado"]) for r in registros] == [("a.png", "ok")]
+        assert (salida / "a.png.txt").read_text() != primera
+
+    manifiesto = json.loads((salida / NOMBRE_MANIFIESTO).read_text(encoding="utf-8"))
+    assert sorted(manifiesto["archivos"]) == ["a.jpg", "a.png"]
+    assert manifiesto["archivos"]["a.png"]["hash"] == registros[0]["hash"]
+
+
+def test_error_no_se_reintenta_hasta_que_cambie(tmp_path):
+    entrada = tmp_path / "entrada"
+    entrada.mkdir()
+    (entrada / "roto.png").write_bytes(b"no es una imagen")
+
+    with _vigilante(tmp_path) as vigilante:
+        assert [r["estado"] for r in vigilante.ciclo()] == ["error"]
+        assert vigilante.ciclo() == []
+
+        dibujar_figura(str(entrada / "roto.png"))
+        _cambiar_fecha(entrada / "roto.png", -5)
+        assert [r["estado"] for r in vigilante.ciclo()] == ["ok"]
+
+
+def test_reinicio_y_archivos_borrados(tmp_path):
+    entrada = tmp_path / "entrada"
+    entrada.mkdir()
+    dibujar_figura(str(entrada / "a.png"))
+    dibujar_figura(str(entrada / "b.png"), semilla=1)
+    with _vigilante(tmp_path) as vigilante:
+        assert len(vigilante.ciclo()) == 2
+
+    # Con los mismos parámetros, lo ya hecho se salta; con otros, se procesa todo
+    with _vigilante(tmp_path) as vigilante:
+        assert vigilante.ciclo() == []
+        os.remove(entrada / "b.png")
+        assert vigilante.ciclo() == []
+        assert list(vigilante.archivos) == ["a.png"]
+    with _vigilante(tmp_path, tamaño=8) as vigilante:
+        registros = vigilante.ciclo()
+        assert [r["imagen"] for r in registros] == ["a.png"]
+        assert registros[0]["forma"] == [8, 8]
+
+
+def test_con_pool_de_procesos(tmp_path):
+    entrada = tmp_path / "entrada"
+    entrada.mkdir()
+    for i in range(3):
+        dibujar_figura(str(entrada / f"f{i}.png"), semilla=i)
+
+    with _vigilante(tmp_path, workers=2, formato="npy") as vigilante:
+        registros = _por_imagen(vigilante.ciclo(esperar=True))
+
+    assert sorted(registros) == ["f0.png", "f1.png", "f2.png"]
+    for nombre, registro in registros.items():
+        assert registro["estado"] == "ok"
+        matriz = np.load(tmp_path / "salida" / f"{nombre}.npy")
+        assert matriz.shape == (12, 12) and matriz.dtype == np.uint8
+
+
+def test_pool_roto_se_cierra_y_se_reemplaza(tmp_path):
+    entrada = tmp_path / "entrada"
+    entrada.mkdir()
+    dibujar_figura(str(entrada / "f0.png"))
+
+    with _vigilante(tmp_path, workers=2) as vigilante:
+        pool = vigilante._obtener_pool()
+        pool.submit(int).result()  # arranca los procesos
+        for pid in list(pool._processes):
+            os.kill(pid, signal.SIGKILL)
+        limite = time.monotonic() + 10
+        while not pool._broken and time.monotonic() < limite:
+            time.sleep(0.05)
+
+        registros = _por_imagen(vigilante.ciclo(esperar=True))
+        assert registros["f0.png"]["estado"] == "ok"
+        assert vigilante._pool is not pool
+        assert pool._shutdown_thread
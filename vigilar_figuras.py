@@ -0,0 +1,366 @@
+"""
+Modo vigilancia: detecta la figura de cada imagen que llega a una carpeta.
+
+Revisa la carpeta cada `intervalo` segundos (con os.scandir, sin dependencias
+extra) y manda cada imagen nueva o modificada a un pool de procesos que queda
+abierto y calentado entre archivos, así solo se paga la detección.
+
+Por cada imagen, el manifiesto (vigilancia.json, en la carpeta de salida)
+guarda la fecha de modificación, el tamaño y el hash del contenido. Al
+reiniciar, las imágenes con la misma fecha y tamaño se saltan sin abrirlas, y
+las que solo cambiaron de fecha (copiadas de nuevo, touch) se reconocen por el
+hash sin volver a detectar. Si cambian los parámetros de detección, se procesa
+todo de nuevo. Matrices, PNG y manifiesto se escriben en un temporal que luego
+se renombra: nunca quedan archivos a medias.
+
+Una imagen se procesa cuando lleva `espera` segundos sin modificarse, para no
+leer archivos que todavía se están copiando. Si falla, el error queda en el
+manifiesto y no se reintenta hasta que el archivo cambie.
+
+Ejemplo:
+    python vigilar_figuras.py entrada --salida resultados --tamaño 20 --png raster
+    python vigilar_figuras.py entrada --una-vez     # procesa lo que haya y termina
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+# Nunca abrir ventanas en los procesos de la vigilancia
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import numpy as np
+
+import detector_figuras
+from cache_figuras import escribir_atomico, hash_bytes
+from componentes_figuras import etiquetar, postprocesar
+from lote_figuras import EXTENSIONES_IMAGEN, escribir_resultado, nombre_salida
+from servicio_figuras import calentar_proceso
+
+FORMATOS = ["txt", "csv", "json", "npy", "fig"]
+RENDERIZADORES = ["raster", "matplotlib"]
+NOMBRE_MANIFIESTO = "vigilancia.json"
+
+
+def _procesar_archivo(tarea):
+    """
+    Procesa una imagen en un proceso del pool; nunca lanza excepciones.
+    Lee el archivo una sola vez: con esos bytes calcula el hash y, si difiere
+    de hash_anterior, detecta.
+    """
+    ruta_imagen, carpeta_salida, parametros, hash_anterior = tarea
+    registro = {}
+    inicio = time.perf_counter()
+    try:
+        with open(ruta_imagen, "rb") as archivo:
+            datos = archivo.read()
+        registro["hash"] = hash_bytes(datos)
+        if registro["hash"] == hash_anterior:
+            registro["estado"] = "sin_cambios"
+            return registro
+
+        matriz = detector_figuras.detectar_figura_optimizado(
+            io.BytesIO(datos), parametros["tamaño"], parametros["metodo"],
+            umbral_blanco=parametros["umbral_blanco"], sensibilidad=parametros["sensibilidad"],
+            rapido=parametros["rapido"])
+        if parametros["postproceso"]:
+            matriz = postprocesar(matriz, **parametros["postproceso"])
+
+        registro["salida"] = escribir_resultado(matriz, ruta_imagen, carpeta_salida,
+                                                parametros["formato"])
+        if parametros["png"]:
+            ruta_png = nombre_salida(ruta_imagen, carpeta_salida, ".png")
+            titulo = f"Detección - {parametros['metodo']}"
+            escribir_atomico(ruta_png, detector_figuras.png_resultado(
+                matriz, titulo, os.path.basename(ruta_imagen), parametros["png"]))
+            registro["png"] = ruta_png
+        registro.update(estado="ok",
+                        forma=list(matriz.shape),
+                        pixeles_figura=int(np.sum(matriz)),
+                        cobertura=round(float(np.mean(matriz)) * 100, 2))
+        # Contar componentes cuesta un etiquetado por imagen: solo si se pidió limpieza
+        if parametros["postproceso"]:
+            registro["componentes"] = etiquetar(matriz)[1]
+    except Exception as e:
+        registro.update(estado="error", error=f"{type(e).__name__}: {e}")
+    registro["segundos"] = round(time.perf_counter() - inicio, 4)
+    return registro
+
+
+class VigilanteFiguras:
+    def __init__(self, carpeta: str,
+                 carpeta_salida: str = "resultados_vigilancia",
+                 tamaño: int = 15,
+                 metodo: str = "contraste_mejorado",
+                 umbral_blanco: int = 240,
+                 sensibilidad: float = 0.8,
+                 formato: str = "txt",
+                 png: str = None,
+                 rapido: bool = False,
+                 postproceso: dict = None,
+                 workers: int = None,
+                 intervalo: float = 1.0,
+                 espera: float = 1.0):
+        """
+        Vigila una carpeta y detecta las imágenes nuevas o modificadas.
+
+        Parámetros:
+        • carpeta        : carpeta a vigilar (solo su primer nivel)
+        • carpeta_salida : donde van las matrices, los PNG y vigilancia.json; debe ser otra carpeta
+        • formato        : txt, csv, json, npy o fig (ver lote_figuras.escribir_resultado)
+        • png            : None, "raster" o "matplotlib" para guardar también el PNG del resultado
+        • postproceso    : opciones de componentes_figuras.postprocesar (opcional)
+        • workers        : procesos del pool (por defecto, todos los núcleos; con 1, en este proceso)
+        • intervalo      : segundos entre revisiones de la carpeta
+        • espera         : segundos sin cambios antes de procesar un archivo
+        (el resto, igual que en detectar_figura_optimizado)
+
+        Uso:
+            with VigilanteFiguras("entrada", "resultados", tamaño=20) as vigilante:
+                vigilante.ejecutar()              # hasta Ctrl+C
+            # o, paso a paso: registros = vigilante.ciclo(esperar=True)
+        """
+        detector_figuras.obtener_metodo(metodo)
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato desconocido: {formato}. Opciones: {', '.join(FORMATOS)}")
+        if png is not None and png not in RENDERIZADORES:
+            raise ValueError(f"Renderizador desconocido: {png}. Opciones: {', '.join(RENDERIZADORES)}")
+        if not os.path.isdir(carpeta):
+            raise ValueError(f"No existe la carpeta a vigilar: {carpeta}")
+        if os.path.abspath(carpeta) == os.path.abspath(carpeta_salida):
+            raise ValueError("La carpeta de salida debe ser distinta de la carpeta vigilada")
+
+        self.carpeta = carpeta
+        self.carpeta_salida = carpeta_salida
+        self.parametros = {"tamaño": tamaño, "metodo": metodo, "umbral_blanco": umbral_blanco,
+                           "sensibilidad": sensibilidad, "rapido": rapido, "formato": formato,
+                           "png": png, "postproceso": postproceso or {}}
+        self.workers = workers or os.cpu_count() or 1
+        self.intervalo = intervalo
+        self.espera = espera
+        self.ruta_manifiesto = os.path.join(carpeta_salida, NOMBRE_MANIFIESTO)
+        os.makedirs(carpeta_salida, exist_ok=True)
+
+        self.archivos = self._cargar_manifiesto()
+        self._en_curso = {}
+        self._pool = None
+
+    def _cargar_manifiesto(self) -> dict:
+        """Entradas del manifiesto anterior, o {} si no existe o era con otros parámetros"""
+        try:
+            with open(self.ruta_manifiesto, encoding="utf-8") as archivo:
+                manifiesto = json.load(archivo)
+        except (OSError, ValueError):
+            return {}
+        if manifiesto.get("parametros") != self.parametros:
+            return {}
+        return manifiesto.get("archivos", {})
+
+    def _guardar_manifiesto(self):
+        manifiesto = {"parametros": self.parametros, "archivos": self.archivos}
+        escribir_atomico(self.ruta_manifiesto,
+                         json.dumps(manifiesto, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    def _obtener_pool(self):
+        """Pool de procesos abierto una sola vez y reutilizado en todos los ciclos"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=calentar_proceso,
+                                             initargs=(self.parametros["png"] == "matplotlib",))
+        return self._pool
+
+    def _descartar_pool(self):
+        """Cierra un pool roto sin esperar a sus procesos; el próximo envío crea otro"""
+        roto, self._pool = self._pool, None
+        if roto is not None:
+            roto.shutdown(wait=False, cancel_futures=True)
+
+    def _pendientes(self):
+        """
+        Revisa la carpeta. Da de regreso: (imágenes para procesar como
+        (nombre, ruta, firma, hash anterior), nombres que ya no están)
+        """
+        ahora = time.time()
+        pendientes = []
+        vistos = set()
+        with os.scandir(self.carpeta) as entradas:
+            for entrada in entradas:
+                # Los nombres con punto inicial suelen ser temporales de una copia en curso
+                if entrada.name.startswith(".") or not entrada.name.lower().endswith(EXTENSIONES_IMAGEN):
+                    continue
+                try:
+                    if not entrada.is_file():
+                        continue
+                    estado = entrada.stat()
+                except OSError:
+                    continue  # borrada entre el listado y el stat
+                vistos.add(entrada.name)
+                firma = {"mtime_ns": estado.st_mtime_ns, "bytes": estado.st_size}
+                anterior = self.archivos.get(entrada.name, {})
+                if entrada.name in self._en_curso or ahora - estado.st_mtime < self.espera:
+                    continue
+                if anterior.get("mtime_ns") == firma["mtime_ns"] and anterior.get("bytes") == firma["bytes"]:
+                    continue
+                pendientes.append((entrada.name, entrada.path, firma, anterior.get("hash")))
+        return sorted(pendientes), sorted(set(self.archivos) - vistos)
+
+    def _registrar(self, nombre: str, firma: dict, resultado: dict) -> dict:
+        """Anota el resultado en el manifiesto (en memoria) y lo devuelve con el nombre"""
+        if resultado["estado"] == "sin_cambios":
+            entrada = {**self.archivos.get(nombre, {}), **firma, "hash": resultado["hash"]}
+        else:
+            entrada = {**firma, **resultado}
+        self.archivos[nombre] = entrada
+        return {"imagen": nombre, **entrada, "estado": resultado["estado"]}
+
+    def ciclo(self, esperar: bool = False) -> list:
+        """
+        Una revisión de la carpeta: manda a procesar lo nuevo y recoge lo que ya terminó.
+        • esperar: True para esperar a que termine todo lo enviado (útil en scripts y pruebas)
+        Da de regreso: lista de registros terminados en este ciclo; estado "ok", "error"
+        o "sin_cambios" (mismo contenido con otra fecha)
+        """
+        pendientes, eliminados = self._pendientes()
+        for nombre in eliminados:
+            del self.archivos[nombre]
+
+        registros = []
+        for nombre, ruta, firma, hash_anterior in pendientes:
+            tarea = (ruta, self.carpeta_salida, self.parametros, hash_anterior)
+            if self.workers == 1:
+                registros.append(self._registrar(nombre, firma, _procesar_archivo(tarea)))
+            else:
+                try:
+                    futuro = self._obtener_pool().submit(_procesar_archivo, tarea)
+                except BrokenProcessPool:
+                    # Un proceso murió mientras el pool esperaba trabajo
+                    self._descartar_pool()
+                    futuro = self._obtener_pool().submit(_procesar_archivo, tarea)
+                self._en_curso[nombre] = (futuro, firma)
+
+        registros += self._recoger(esperar)
+        if registros or eliminados:
+            self._guardar_manifiesto()
+        return registros
+
+    def _recoger(self, esperar: bool = False) -> list:
+        """Registra los resultados del pool que ya terminaron (o todos, con esperar)"""
+        if esperar and self._en_curso:
+            wait([futuro for futuro, _ in self._en_curso.values()])
+        registros = []
+        for nombre, (futuro, firma) in list(self._en_curso.items()):
+            if not futuro.done():
+                continue
+            del self._en_curso[nombre]
+            try:
+                resultado = futuro.result()
+            except BrokenProcessPool as e:
+                # Un proceso murió (p. ej. sin memoria): el próximo envío crea otro pool
+                self._descartar_pool()
+                resultado = {"estado": "error", "error": f"{type(e).__name__}: {e}"}
+            registros.append(self._registrar(nombre, firma, resultado))
+        return registros
+
+    def ejecutar(self, ciclos: int = None, al_terminar=None):
+        """
+        Revisa la carpeta cada `intervalo` segundos hasta Ctrl+C (o `ciclos` veces).
+        • al_terminar: función que recibe cada registro terminado (por defecto, lo imprime)
+        """
+        al_terminar = al_terminar or _imprimir_registro
+        hechos = 0
+        try:
+            while ciclos is None or hechos < ciclos:
+                for registro in self.ciclo():
+                    al_terminar(registro)
+                hechos += 1
+                if self._en_curso:
+                    # Despertar apenas termine algo, sin pasar del intervalo
+                    wait([futuro for futuro, _ in self._en_curso.values()],
+                         timeout=self.intervalo, return_when=FIRST_COMPLETED)
+                elif ciclos is None or hechos < ciclos:
+                    time.sleep(self.intervalo)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            # Terminar lo ya enviado, sin tomar archivos nuevos
+            registros = self._recoger(esperar=True)
+            for registro in registros:
+                al_terminar(registro)
+            if registros:
+                self._guardar_manifiesto()
+
+    def cerrar(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+
+def _imprimir_registro(registro: dict):
+    if registro["estado"] == "ok":
+        print(f"{registro['imagen']} -> {registro['salida']} "
+              f"(cobertura {registro['cobertura']}%, {registro['segundos']} s)")
+    elif registro["estado"] == "sin_cambios":
+        print(f"{registro['imagen']}: mismo contenido, sin cambios")
+    else:
+        print(f"Error con {registro['imagen']}: {registro['error']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Detección de figuras al llegar imágenes a una carpeta")
+    parser.add_argument("carpeta", help="Carpeta a vigilar")
+    parser.add_argument("--salida", default="resultados_vigilancia", help="Carpeta de resultados")
+    parser.add_argument("--tamaño", "--tamano", dest="tamaño", type=int, default=15)
+    parser.add_argument("--metodo", default="contraste_mejorado", choices=detector_figuras.METODOS)
+    parser.add_argument("--umbral-blanco", dest="umbral_blanco", type=int, default=240)
+    parser.add_argument("--sensibilidad", type=float, default=0.8)
+    parser.add_argument("--formato", choices=FORMATOS, default="txt")
+    parser.add_argument("--png", choices=RENDERIZADORES, default=None,
+                        help="Guardar también el PNG del resultado con ese renderizador")
+    parser.add_argument("--rapido", action="store_true",
+                        help="Decodificación reducida para fotos grandes (JPEG draft + reduce)")
+    parser.add_argument("--area-minima", dest="area_minima", type=int, default=0,
+                        help="Quitar manchas de menos celdas que esto")
+    parser.add_argument("--rellenar", action="store_true",
+                        help="Rellenar los huecos encerrados por la figura")
+    parser.add_argument("--solo-mayor", dest="solo_mayor", action="store_true",
+                        help="Dejar solo el componente más grande")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Procesos en paralelo (por defecto, todos los núcleos)")
+    parser.add_argument("--intervalo", type=float, default=1.0,
+                        help="Segundos entre revisiones de la carpeta")
+    parser.add_argument("--espera", type=float, default=1.0,
+                        help="Segundos sin cambios antes de procesar un archivo")
+    parser.add_argument("--una-vez", dest="una_vez", action="store_true",
+                        help="Procesar lo que haya en la carpeta y terminar")
+    args = parser.parse_args(argv)
+    postproceso = {clave: valor for clave, valor in (("area_minima", args.area_minima),
+                                                     ("rellenar", args.rellenar),
+                                                     ("solo_mayor", args.solo_mayor)) if valor}
+
+    with VigilanteFiguras(args.carpeta, args.salida, args.tamaño, args.metodo, args.umbral_blanco,
+                          args.sensibilidad, args.formato, args.png, args.rapido, postproceso,
+                          args.workers, args.intervalo, 0 if args.una_vez else args.espera) as vigilante:
+        if args.una_vez:
+            registros = vigilante.ciclo(esperar=True)
+            for registro in registros:
+                _imprimir_registro(registro)
+            print(f"Procesadas: {len(registros)} ({len(vigilante.archivos)} en el manifiesto)")
+            return 0 if all(r["estado"] != "error" for r in registros) else 2
+        print(f"Vigilando {args.carpeta} cada {args.intervalo} s con {vigilante.workers} procesos "
+              f"(Ctrl+C para terminar)...")
+        vigilante.ejecutar()
+    print(f"Manifiesto: {vigilante.ruta_manifiesto}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())